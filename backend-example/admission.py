@@ -0,0 +1,167 @@
+"""
+Admission control for the recognition pipeline
+Bounded in-flight work and a bounded, per-client fair queue; overflow is shed fast
+"""
+
+import os
+import time
+import asyncio
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Deque, Dict
+
+# Recognitions running at once per worker
+RECOGNITION_MAX_IN_FLIGHT = int(os.getenv("RECOGNITION_MAX_IN_FLIGHT", "2"))
+# Inference pool threads per admitted recognition: liveness and embedding run side by side
+INFERENCE_THREADS_PER_RECOGNITION = 2
+# Recognitions allowed to wait for a slot per worker; more are rejected with 503
+RECOGNITION_MAX_QUEUE = int(os.getenv("RECOGNITION_MAX_QUEUE", "16"))
+# Waiting requests from one client (kiosk) at a time
+RECOGNITION_MAX_QUEUED_PER_CLIENT = int(os.getenv("RECOGNITION_MAX_QUEUED_PER_CLIENT", "2"))
+# A request still waiting after this long is shed: the kiosk has likely given up on it
+RECOGNITION_QUEUE_TIMEOUT_SECONDS = float(os.getenv("RECOGNITION_QUEUE_TIMEOUT_SECONDS", "5"))
+RECOGNITION_RETRY_AFTER_SECONDS = int(os.getenv("RECOGNITION_RETRY_AFTER_SECONDS", "2"))
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed; reply 503 with Retry-After"""
+
+    def __init__(self, reason: str, retry_after: int = RECOGNITION_RETRY_AFTER_SECONDS):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+class AdmissionController:
+    """
+    Admits at most max_in_flight requests at a time.
+
+    Requests beyond that wait in one FIFO per client. When a slot frees up the
+    clients with waiters are served round-robin, so a kiosk retrying in a loop
+    gets one slot per turn like every other kiosk instead of filling the queue.
+    A request is rejected immediately when the whole queue or its client's
+    share is full, and shed when it has waited longer than queue_timeout.
+    Runs on the event loop; no locking needed.
+    """
+
+    def __init__(
+        self,
+        max_in_flight: int = RECOGNITION_MAX_IN_FLIGHT,
+        max_queue: int = RECOGNITION_MAX_QUEUE,
+        max_queued_per_client: int = RECOGNITION_MAX_QUEUED_PER_CLIENT,
+        queue_timeout: float = RECOGNITION_QUEUE_TIMEOUT_SECONDS
+    ):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.max_queued_per_client = max_queued_per_client
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.queued = 0
+        self._waiters: Dict[str, Deque[asyncio.Future]] = {}
+        self._turns: Deque[str] = deque()  # clients with waiters, in round-robin order
+        self.metrics = {
+            "admitted": 0,
+            "admitted_after_wait": 0,
+            "rejected_queue_full": 0,
+            "rejected_client_limit": 0,
+            "shed_timeout": 0,
+            "last_wait_ms": 0.0,
+            "max_wait_ms": 0.0,
+        }
+
+    def _reject(self, metric: str, reason: str):
+        self.metrics[metric] += 1
+        raise AdmissionRejected(reason)
+
+    async def acquire(self, client: str):
+        """Wait for a slot, or raise AdmissionRejected"""
+        if self.in_flight < self.max_in_flight and not self.queued:
+            self.in_flight += 1
+            self.metrics["admitted"] += 1
+            return
+
+        if self.queued >= self.max_queue:
+            self._reject("rejected_queue_full", "Recognition queue is full")
+        waiters = self._waiters.get(client)
+        if waiters and len(waiters) >= self.max_queued_per_client:
+            self._reject("rejected_client_limit", "Too many pending recognitions from this client")
+
+        future = asyncio.get_running_loop().create_future()
+        if not waiters:
+            waiters = self._waiters[client] = deque()
+            self._turns.append(client)
+        waiters.append(future)
+        self.queued += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(asyncio.shield(future), self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if future.done() and not future.cancelled():
+                # Granted just as we gave up: hand the slot on
+                self.release()
+            else:
+                future.cancel()
+                self._discard(client, future)
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject("shed_timeout", "Timed out waiting in the recognition queue")
+            raise
+
+        wait_ms = (time.perf_counter() - started) * 1000
+        self.metrics["admitted"] += 1
+        self.metrics["admitted_after_wait"] += 1
+        self.metrics["last_wait_ms"] = round(wait_ms, 1)
+        self.metrics["max_wait_ms"] = round(max(self.metrics["max_wait_ms"], wait_ms), 1)
+
+    def _discard(self, client: str, future: asyncio.Future):
+        waiters = self._waiters.get(client)
+        if waiters and future in waiters:
+            waiters.remove(future)
+            self.queued -= 1
+            if not waiters:
+                del self._waiters[client]
+                self._turns.remove(client)
+
+    def release(self):
+        """Free a slot and grant it to the next client in turn"""
+        self.in_flight -= 1
+        self._dispatch()
+
+    def resize(self, max_in_flight: int):
+        """Change the in-flight limit; growing admits waiters at once, shrinking takes effect as slots free up"""
+        self.max_in_flight = max_in_flight
+        self._dispatch()
+
+    def _dispatch(self):
+        while self.in_flight < self.max_in_flight and self._turns:
+            client = self._turns.popleft()
+            waiters = self._waiters[client]
+            future = waiters.popleft()
+            self.queued -= 1
+            if waiters:
+                self._turns.append(client)
+            else:
+                del self._waiters[client]
+            if not future.done():
+                future.set_result(True)
+                self.in_flight += 1
+
+    @asynccontextmanager
+    async def admit(self, client: str):
+        await self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release()
+
+    def load(self) -> Dict[str, Any]:
+        """Current depth, for load balancers and autoscaling"""
+        capacity = self.max_in_flight + self.max_queue
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_in_flight": self.max_in_flight,
+            "max_queue": self.max_queue,
+            "clients_waiting": len(self._waiters),
+            "saturation": round((self.in_flight + self.queued) / capacity, 3) if capacity else 1.0,
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        return {**self.load(), **self.metrics}
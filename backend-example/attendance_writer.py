@@ -0,0 +1,134 @@
+"""
+Group-commit write buffer for attendance records
+Coalesces records from concurrent requests into insert_many batches
+"""
+
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Records per insert_many and how long the first record of a batch may wait for company
+ATTENDANCE_BATCH_SIZE = int(os.getenv("ATTENDANCE_BATCH_SIZE", "64"))
+ATTENDANCE_FLUSH_INTERVAL_MS = float(os.getenv("ATTENDANCE_FLUSH_INTERVAL_MS", "10"))
+# Submissions beyond this many queued records wait for room (backpressure)
+ATTENDANCE_MAX_PENDING = int(os.getenv("ATTENDANCE_MAX_PENDING", "1024"))
+
+class AttendanceWriteBuffer:
+    """
+    Group commit for attendance inserts.
+
+    Callers submit one document and await its acknowledgement. A single flush
+    loop takes whatever is queued, waits at most flush_interval for the batch to
+    fill up to max_batch_size, then hands the whole batch to write_batch in a
+    worker thread. Each caller is resolved only after its batch was written, so
+    an acknowledged record is as durable as one written with insert_one.
+
+    write_batch(documents) must insert the documents (setting their _id) and
+    return a dict mapping the index of each failed document to its exception;
+    raising fails the whole batch.
+    """
+
+    def __init__(
+        self,
+        write_batch: Callable[[List[Dict[str, Any]]], Dict[int, Exception]],
+        max_batch_size: int = ATTENDANCE_BATCH_SIZE,
+        flush_interval: float = ATTENDANCE_FLUSH_INTERVAL_MS / 1000,
+        max_pending: int = ATTENDANCE_MAX_PENDING
+    ):
+        self.write_batch = write_batch
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        self.metrics = {
+            "batches_written": 0,
+            "records_written": 0,
+            "records_failed": 0,
+            "largest_batch": 0,
+            "last_batch_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self):
+        """Start the flush loop on the running event loop"""
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_pending)
+        self._task = asyncio.create_task(self._flush_loop())
+        logging.info(f"✅ Attendance write buffer started (batch={self.max_batch_size}, interval={self.flush_interval * 1000:.0f}ms)")
+
+    async def stop(self):
+        """Flush everything already submitted, then stop the flush loop"""
+        if not self.running:
+            return
+        await self._queue.join()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def submit(self, document: Dict[str, Any]) -> Dict[str, Any]:
+        """Queue a document and wait until its batch has been written"""
+        if not self.running:
+            raise RuntimeError("Attendance write buffer is not running")
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((document, future))
+        return await future
+
+    def stats(self) -> Dict[str, Any]:
+        batches = self.metrics["batches_written"]
+        return {
+            **self.metrics,
+            "pending": self._queue.qsize() if self._queue else 0,
+            "avg_batch_size": round(self.metrics["records_written"] / batches, 2) if batches else 0.0,
+        }
+
+    async def _collect_batch(self) -> List[Tuple[Dict[str, Any], asyncio.Future]]:
+        batch = [await self._queue.get()]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            # Drain what is already queued without waiting
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - time.monotonic()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _flush_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect_batch()
+            documents = [document for document, _ in batch]
+            started = time.perf_counter()
+            try:
+                failures = await loop.run_in_executor(None, self.write_batch, documents)
+            except Exception as e:
+                logging.error(f"❌ Attendance batch write failed ({len(batch)} records): {e}")
+                failures = {index: e for index in range(len(batch))}
+
+            self.metrics["batches_written"] += 1
+            self.metrics["records_written"] += len(batch) - len(failures)
+            self.metrics["records_failed"] += len(failures)
+            self.metrics["largest_batch"] = max(self.metrics["largest_batch"], len(batch))
+            self.metrics["last_batch_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+            for index, (document, future) in enumerate(batch):
+                if not future.done():
+                    if index in failures:
+                        future.set_exception(failures[index])
+                    else:
+                        future.set_result(document)
+                self._queue.task_done()
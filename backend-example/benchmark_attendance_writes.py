@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+Attendance Write Benchmark for ITScence
+Measures attendance writes per second against a local mongod, comparing
+one insert_one + find_one read-back per record (the old path) with the
+group-commit write buffer under concurrent submitters.
+
+Run with: python benchmark_attendance_writes.py --records 2000 --concurrency 64
+Uses MONGODB_URL (default mongodb://localhost:27017) and a throwaway database.
+"""
+
+import os
+import sys
+import time
+import json
+import uuid
+import asyncio
+import argparse
+
+from pymongo import MongoClient
+
+from attendance_writer import AttendanceWriteBuffer
+from timezone_utils import get_local_now
+
+MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
+
+def make_record(i: int) -> dict:
+    return {
+        "attendance_id": str(uuid.uuid4()),
+        "employee_id": f"EMP{i % 500:03d}",
+        "employee_name": f"Benchmark Employee {i % 500}",
+        "type": "check-in",
+        "timestamp": get_local_now(),
+        "confidence": 0.93,
+        "image_id": None,
+        "created_at": get_local_now(),
+    }
+
+async def bench_sequential(collection, records: int, concurrency: int) -> float:
+    """Old path: insert_one then find_one per record, serialized on the event loop"""
+    async def one(i):
+        result = collection.insert_one(make_record(i))
+        collection.find_one({"_id": result.inserted_id})
+
+    started = time.perf_counter()
+    for start in range(0, records, concurrency):
+        await asyncio.gather(*[one(i) for i in range(start, min(start + concurrency, records))])
+    return time.perf_counter() - started
+
+async def bench_buffered(collection, records: int, concurrency: int, batch_size: int, interval_ms: float) -> tuple:
+    """Group commit: concurrent submitters share insert_many batches"""
+    def write_batch(documents):
+        collection.insert_many(documents, ordered=False)
+        return {}
+
+    buffer = AttendanceWriteBuffer(write_batch, max_batch_size=batch_size, flush_interval=interval_ms / 1000)
+    await buffer.start()
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i):
+        async with semaphore:
+            await buffer.submit(make_record(i))
+
+    started = time.perf_counter()
+    await asyncio.gather(*[one(i) for i in range(records)])
+    elapsed = time.perf_counter() - started
+    await buffer.stop()
+    return elapsed, buffer.stats()
+
+async def run(args) -> dict:
+    client = MongoClient(MONGODB_URL, serverSelectionTimeoutMS=5000)
+    client.admin.command("ping")
+    database_name = f"itscence_bench_{uuid.uuid4().hex[:8]}"
+    collection = client[database_name]["attendance"]
+    collection.create_index([("employee_id", 1), ("timestamp", -1)])
+
+    try:
+        sequential = await bench_sequential(collection, args.records, args.concurrency)
+        collection.delete_many({})
+        buffered, stats = await bench_buffered(
+            collection, args.records, args.concurrency, args.batch_size, args.interval_ms
+        )
+    finally:
+        client.drop_database(database_name)
+        client.close()
+
+    return {
+        "mongodb_url": MONGODB_URL.split("@")[-1],
+        "records": args.records,
+        "concurrency": args.concurrency,
+        "batch_size": args.batch_size,
+        "flush_interval_ms": args.interval_ms,
+        "sequential_writes_per_sec": round(args.records / sequential, 1),
+        "buffered_writes_per_sec": round(args.records / buffered, 1),
+        "speedup": round(sequential / buffered, 2),
+        "buffer_stats": stats,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark attendance write throughput")
+    parser.add_argument("--records", type=int, default=2000, help="Records to write per mode")
+    parser.add_argument("--concurrency", type=int, default=64, help="Concurrent submitters")
+    parser.add_argument("--batch-size", type=int, default=64, help="Write buffer max batch size")
+    parser.add_argument("--interval-ms", type=float, default=10, help="Write buffer flush interval")
+    parser.add_argument("--output", type=str, help="Also write the results to this JSON file")
+    args = parser.parse_args()
+
+    try:
+        results = asyncio.run(run(args))
+    except Exception as e:
+        print(f"❌ Benchmark failed: {e}")
+        sys.exit(1)
+
+    print(f"📊 insert_one + read-back: {results['sequential_writes_per_sec']} writes/s")
+    print(f"📊 group commit:           {results['buffered_writes_per_sec']} writes/s "
+          f"(avg batch {results['buffer_stats']['avg_batch_size']})")
+    print(f"🚀 Speedup: {results['speedup']}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
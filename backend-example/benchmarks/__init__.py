@@ -0,0 +1,10 @@
+"""
+Offline benchmark suite for ITScence
+Times the recognition hot path, attendance rules and database operations without
+a running stack or network access.
+
+Run from backend-example with: python -m benchmarks --output results.json
+Compare against a stored run:  python -m benchmarks --compare baseline.json
+"""
+
+from benchmarks.harness import Benchmark, SkipBenchmark, run_benchmark, compare_results, load_results, write_results
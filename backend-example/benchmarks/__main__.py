@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Offline Benchmark Runner for ITScence
+Run from backend-example with: python -m benchmarks [--output results.json] [--compare baseline.json]
+"""
+
+import os
+import sys
+import asyncio
+import logging
+import argparse
+
+from benchmarks.harness import (
+    RESULTS_FORMAT_VERSION, SkipBenchmark, run_benchmark, environment_info,
+    write_results, load_results, compare_results
+)
+from benchmarks import cases
+
+def parse_sizes(value: str):
+    return [int(size) for size in value.split(",") if size.strip()]
+
+def build_cases(args, app):
+    """All benchmarks selected by the arguments, plus a cleanup callable and skipped-group notes"""
+    selected = []
+    skipped = {}
+    cleanup = lambda: None
+
+    if "recognition" in args.groups:
+        selected += cases.recognition_cases(app, args.image_path)
+    if "matching" in args.groups:
+        selected += cases.matching_cases(args.gallery_sizes, args.dimension, app.config.distance_metric)
+    if "attendance" in args.groups:
+        selected += cases.attendance_rule_cases(app)
+    if "database" in args.groups:
+        try:
+            manager, cleanup = cases.connect_database(args.db, args.mongodb_url)
+            print(f"🗄️ Seeding {args.db} with {args.db_employees} employees and {args.db_records} attendance records...")
+            employee_ids = cases.seed_database(manager, args.db_employees, args.db_records, args.dimension, app.config.model_name)
+            selected += cases.database_cases(manager, employee_ids, app.config.model_name)
+        except SkipBenchmark as e:
+            skipped["database"] = str(e)
+        except Exception as e:
+            skipped["database"] = f"database unavailable: {e}"
+
+    if args.only:
+        selected = [benchmark for benchmark in selected if any(pattern in benchmark.name for pattern in args.only)]
+    return selected, cleanup, skipped
+
+def print_comparison(comparison, current, baseline):
+    print(f"\n📊 Comparison against baseline (tolerance {comparison['tolerance']:.0%})")
+    for key, value in current["environment"].items():
+        if key != "created_at" and baseline["environment"].get(key) != value:
+            print(f"⚠️ Environment differs from baseline: {key} {baseline['environment'].get(key)} → {value}")
+    icons = {"regression": "❌", "improvement": "🚀", "unchanged": "  "}
+    for row in comparison["rows"]:
+        print(f"{icons[row['verdict']]} {row['name']:<60} {row['baseline_ms']:>10.3f} → {row['current_ms']:>10.3f} ms  x{row['ratio']}")
+    if comparison["not_compared"]:
+        print(f"ℹ️ Not compared (missing, skipped or failed in one run): {', '.join(comparison['not_compared'])}")
+    if comparison["new"]:
+        print(f"ℹ️ New cases: {', '.join(comparison['new'])}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmarks for the recognition hot path")
+    parser.add_argument("--groups", type=lambda v: v.split(","), default=["recognition", "matching", "attendance", "database"],
+                        help="Comma-separated groups: recognition, matching, attendance, database")
+    parser.add_argument("--only", action="append", help="Only run cases whose name contains this text (repeatable)")
+    parser.add_argument("--image", type=str, help="Frame for liveness/detection/embedding (default: synthetic 640x480)")
+    parser.add_argument("--gallery-sizes", type=parse_sizes, default=[1000, 10000, 100000], help="Synthetic gallery sizes")
+    parser.add_argument("--dimension", type=int, default=512, help="Synthetic embedding dimension")
+    parser.add_argument("--db", choices=["mongomock", "mongodb"], default="mongomock",
+                        help="In-memory stand-in or a real server at --mongodb-url (a throwaway database is used)")
+    parser.add_argument("--mongodb-url", type=str, default=os.getenv("MONGODB_URL", "mongodb://localhost:27017"))
+    parser.add_argument("--db-employees", type=int, default=500, help="Employees to seed")
+    parser.add_argument("--db-records", type=int, default=20000, help="Attendance records to seed")
+    parser.add_argument("--output", type=str, help="Write results JSON here")
+    parser.add_argument("--compare", type=str, help="Baseline results JSON; exit 1 if any case regressed")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown before a case counts as a regression")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    baseline = load_results(args.compare) if args.compare else None
+
+    import main as app
+
+    args.image_path = cases.write_frame(args.image, 640, 480)
+    loop = asyncio.new_event_loop()
+    selected, cleanup, skipped = build_cases(args, app)
+    results = {}
+    try:
+        for benchmark in selected:
+            result = run_benchmark(benchmark, loop)
+            results[benchmark.name] = result
+            if result["status"] == "ok":
+                print(f"⏱️ {benchmark.name:<60} median {result['median_ms']:>10.3f} ms  p95 {result['p95_ms']:>10.3f} ms  ({result['runs']} runs)")
+            else:
+                print(f"⚠️ {benchmark.name:<60} {result['status']}: {result['reason']}")
+    finally:
+        cleanup()
+        loop.close()
+        if not args.image:
+            os.remove(args.image_path)
+
+    for group, reason in skipped.items():
+        print(f"⚠️ {group} group skipped: {reason}")
+
+    output = {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "environment": environment_info({
+            "deepface_available": app.DEEPFACE_AVAILABLE,
+            "model_name": app.config.model_name,
+            "detector_backend": app.config.detector_backend,
+            "distance_metric": app.config.distance_metric,
+            "image": args.image or "synthetic-640x480",
+            "db": args.db if "database" in args.groups else None,
+            "db_employees": args.db_employees,
+            "db_records": args.db_records,
+        }),
+        "benchmarks": results,
+        "skipped_groups": skipped,
+    }
+
+    if args.output:
+        write_results(args.output, output)
+        print(f"✅ Results written to {args.output}")
+
+    if baseline:
+        comparison = compare_results(output, baseline, args.tolerance)
+        print_comparison(comparison, output, baseline)
+        if comparison["regressions"]:
+            print(f"❌ {len(comparison['regressions'])} regression(s)")
+            sys.exit(1)
+        print("✅ No regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""
+Benchmark cases for the recognition hot path, attendance rules and DatabaseManager
+"""
+
+import os
+import uuid
+import random
+import tempfile
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from benchmarks.harness import Benchmark, SkipBenchmark
+
+def synthetic_frame(width: int = 640, height: int = 480, seed: int = 0) -> np.ndarray:
+    """Deterministic webcam-like BGR frame: lit background, skin-toned face ellipse, sensor noise"""
+    rng = np.random.default_rng(seed)
+    gradient = np.linspace(60, 200, width, dtype=np.float32)[None, :, None]
+    img = np.broadcast_to(gradient, (height, width, 3)).copy()
+    center = (width // 2, height // 2)
+    axes = (width // 7, height // 4)
+    cv2.ellipse(img, center, axes, 0, 0, 360, (120, 150, 200), -1)
+    cv2.circle(img, (center[0] - axes[0] // 2, center[1] - axes[1] // 4), axes[0] // 6, (40, 40, 40), -1)
+    cv2.circle(img, (center[0] + axes[0] // 2, center[1] - axes[1] // 4), axes[0] // 6, (40, 40, 40), -1)
+    img += rng.normal(0, 8, img.shape).astype(np.float32)
+    return np.clip(img, 0, 255).astype(np.uint8)
+
+def recognition_cases(app, image_path: str) -> List[Benchmark]:
+    """Liveness, detection and embedding on one frame, using the app's current config"""
+    features = app.detect_liveness_features(image_path)
+    frame = cv2.imread(image_path)
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    detectors: Dict[str, Any] = {}
+
+    def load_cascade():
+        # OpenCV 5 builds without objdetect's Haar cascades
+        if not hasattr(cv2, "CascadeClassifier"):
+            raise SkipBenchmark(f"OpenCV {cv2.__version__} has no Haar cascade support")
+        detectors["haar"] = cv2.CascadeClassifier(os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml"))
+
+    def require_deepface():
+        if not app.DEEPFACE_AVAILABLE:
+            raise SkipBenchmark("DeepFace is not installed")
+
+    def extract_faces():
+        require_deepface()
+        return app.DeepFace.extract_faces(
+            img_path=frame, detector_backend=app.config.detector_backend, enforce_detection=False
+        )
+
+    def compute_embedding():
+        require_deepface()
+        try:
+            return app.compute_embedding(frame)
+        except Exception as e:
+            # Missing model weights (no network) or no face in the synthetic frame
+            raise SkipBenchmark(f"embedding unavailable: {e}")
+
+    return [
+        # The pure-Python texture loop makes this one slow; a few runs are enough
+        Benchmark("liveness.detect_liveness_features", "liveness", lambda: app.detect_liveness_features(image_path), min_runs=3, min_time=0),
+        Benchmark("liveness.calculate_liveness_score", "liveness", lambda: app.calculate_liveness_score(features)),
+        Benchmark("detection.haar_cascade", "detection", lambda: detectors["haar"].detectMultiScale(gray, 1.1, 5, minSize=(30, 30)), setup=load_cascade),
+        Benchmark(f"detection.deepface[{app.config.detector_backend}]", "detection", extract_faces, setup=require_deepface),
+        Benchmark(f"embedding.deepface[{app.config.model_name}]", "embedding", compute_embedding, setup=compute_embedding, min_runs=3),
+    ]
+
+def matching_cases(gallery_sizes: List[int], dimension: int, distance_metric: str) -> List[Benchmark]:
+    """Best-match lookup against synthetic galleries of each size"""
+    from gallery import FaceGallery
+
+    cases = []
+    for size in gallery_sizes:
+        state: Dict[str, Any] = {}
+
+        def setup(size=size, state=state):
+            rng = np.random.default_rng(size)
+            gallery = FaceGallery("benchmark", distance_metric)
+            matrix = rng.standard_normal((size, dimension), dtype=np.float32)
+            gallery.load_arrays([f"EMP{i:06d}" for i in range(size)], [""] * size, gallery._prepare(matrix), 0)
+            state["gallery"] = gallery
+            state["probe"] = matrix[size // 2] + rng.normal(0, 0.1, dimension).astype(np.float32)
+
+        cases.append(Benchmark(
+            f"matching.gallery_match[{size}x{dimension},{distance_metric}]", "matching",
+            lambda state=state: state["gallery"].match(state["probe"]),
+            setup=setup
+        ))
+    return cases
+
+def attendance_rule_cases(app) -> List[Benchmark]:
+    minutes = iter(range(10 ** 9))
+    return [
+        Benchmark("attendance.determine_attendance_mode", "attendance", lambda: app.determine_attendance_mode(next(minutes) % 1440)),
+    ]
+
+def make_attendance_record(employee_id: str, attendance_type: str, timestamp: datetime) -> Dict[str, Any]:
+    return {
+        "attendance_id": str(uuid.uuid4()),
+        "employee_id": employee_id,
+        "employee_name": f"Benchmark {employee_id}",
+        "type": attendance_type,
+        "timestamp": timestamp,
+        "confidence": 0.93,
+        "image_id": None,
+        "created_at": timestamp,
+    }
+
+def seed_database(manager, employees: int, records: int, dimension: int, model_name: str):
+    """Bulk-load employees, raw attendance over the last 30 days, their daily summaries and embeddings"""
+    from database import (
+        EMPLOYEES_COLLECTION, ATTENDANCE_COLLECTION, ATTENDANCE_SUMMARY_COLLECTION, summarize_attendance
+    )
+
+    rng = random.Random(0)
+    employee_ids = [f"EMP{i:03d}" for i in range(1, employees + 1)]
+    manager.db[EMPLOYEES_COLLECTION].insert_many([
+        {"employee_id": employee_id, "name": f"Benchmark {employee_id}", "face_enrolled": True}
+        for employee_id in employee_ids
+    ])
+
+    now = datetime.utcnow()
+    batch = []
+    for i in range(records):
+        timestamp = now - timedelta(minutes=rng.randrange(30 * 24 * 60))
+        batch.append(make_attendance_record(rng.choice(employee_ids), rng.choice(["check-in", "check-out"]), timestamp))
+        if len(batch) == 5000 or i == records - 1:
+            manager.db[ATTENDANCE_COLLECTION].insert_many(batch)
+            # Summaries are seeded directly; the pipeline upsert path is what write_attendance_batch times
+            summaries = summarize_attendance(batch)
+            for summary in summaries:
+                manager.db[ATTENDANCE_SUMMARY_COLLECTION].update_one(
+                    {"date": summary["date"], "employee_id": summary["employee_id"]},
+                    {"$set": summary},
+                    upsert=True
+                )
+            batch = []
+
+    embeddings = np.random.default_rng(0).standard_normal((employees, dimension), dtype=np.float32)
+    for employee_id, embedding in zip(employee_ids, embeddings):
+        manager.store_face_embedding(employee_id, f"Benchmark {employee_id}", model_name, embedding.tolist())
+    manager.seed_employee_id_counter()
+    return employee_ids
+
+def database_cases(manager, employee_ids: List[str], model_name: str, write_batch_size: int = 64) -> List[Benchmark]:
+    from timezone_utils import get_local_now
+
+    rng = random.Random(1)
+    today = get_local_now().date()
+    week_ago = (today - timedelta(days=6)).isoformat()
+
+    def write_batch():
+        now = datetime.utcnow()
+        documents = [
+            make_attendance_record(rng.choice(employee_ids), "check-in", now)
+            for _ in range(write_batch_size)
+        ]
+        failures = manager.write_attendance_batch(documents)
+        if failures:
+            raise next(iter(failures.values()))
+
+    def require_bulk_write():
+        # write_attendance_batch only logs a failed summary bulk_write, so check support up front
+        from pymongo import UpdateOne
+        try:
+            manager.db["benchmark_probe"].bulk_write([UpdateOne({"_id": 1}, {"$set": {"ok": True}}, upsert=True)])
+        except Exception as e:
+            raise SkipBenchmark(f"bulk_write unsupported by this backend: {e}")
+        finally:
+            manager.db["benchmark_probe"].drop()
+
+    return [
+        Benchmark(f"db.write_attendance_batch[{write_batch_size}]", "database", write_batch, setup=require_bulk_write),
+        Benchmark("db.get_attendance_page[50]", "database", lambda: manager.get_attendance_page(limit=50)),
+        Benchmark(
+            "db.get_attendance_page[employee,50]", "database",
+            lambda: manager.get_attendance_page(limit=50, employee_id=rng.choice(employee_ids))
+        ),
+        Benchmark("db.get_attendance_summaries[7d]", "database", lambda: manager.get_attendance_summaries(week_ago, today.isoformat())),
+        Benchmark("db.collect_stats", "database", manager._collect_stats),
+        Benchmark("db.load_presence", "database", manager.load_presence),
+        Benchmark("db.allocate_employee_id", "database", manager.allocate_employee_id),
+        Benchmark(f"db.get_face_embeddings[{len(employee_ids)}]", "database", lambda: manager.get_face_embeddings(model_name)),
+    ]
+
+def connect_database(backend: str, mongodb_url: Optional[str]):
+    """
+    A DatabaseManager on a throwaway database: "mongodb" uses a real server,
+    "mongomock" the in-memory stand-in (whose bulk_write may not support the
+    installed pymongo; the write case is skipped then).
+    Returns (manager, cleanup).
+    """
+    from database import DatabaseManager
+
+    manager = DatabaseManager()
+    database_name = f"itscence_bench_{uuid.uuid4().hex[:8]}"
+    if backend == "mongomock":
+        try:
+            import mongomock
+            from mongomock.gridfs import enable_gridfs_integration
+        except ImportError:
+            raise SkipBenchmark("mongomock is not installed (pip install mongomock, or use --db mongodb)")
+        enable_gridfs_integration()
+        manager.attach(mongomock.MongoClient(), database_name)
+        return manager, lambda: None
+
+    from pymongo import MongoClient
+    client = MongoClient(mongodb_url, serverSelectionTimeoutMS=5000)
+    client.admin.command("ping")
+    manager.attach(client, database_name)
+
+    def cleanup():
+        client.drop_database(database_name)
+        client.close()
+
+    return manager, cleanup
+
+def write_frame(path: Optional[str], width: int, height: int) -> str:
+    """Use the given image, or write a synthetic frame to a temp file"""
+    if path:
+        if cv2.imread(path) is None:
+            raise ValueError(f"Could not read image {path}")
+        return path
+    fd, temp_path = tempfile.mkstemp(suffix=".jpg", prefix="benchmark_")
+    os.close(fd)
+    cv2.imwrite(temp_path, synthetic_frame(width, height))
+    return temp_path
@@ -0,0 +1,162 @@
+"""
+Timing, result files and baseline comparison for the offline benchmarks
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import inspect
+import platform
+import statistics
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Default adaptive sampling: keep timing a case until both limits are met
+MIN_RUNS = 5
+MIN_TIME_SECONDS = 1.0
+MAX_RUNS = 1000
+# Regressions smaller than this are treated as timer noise
+NOISE_FLOOR_MS = 0.05
+
+RESULTS_FORMAT_VERSION = 1
+
+class Benchmark:
+    """One timed case: fn is called (or awaited) once per run; setup runs once before timing"""
+
+    def __init__(
+        self,
+        name: str,
+        group: str,
+        fn: Callable[[], Any],
+        setup: Optional[Callable[[], Any]] = None,
+        min_runs: int = MIN_RUNS,
+        min_time: float = MIN_TIME_SECONDS,
+        max_runs: int = MAX_RUNS
+    ):
+        self.name = name
+        self.group = group
+        self.fn = fn
+        self.setup = setup
+        self.min_runs = min_runs
+        self.min_time = min_time
+        self.max_runs = max_runs
+
+class SkipBenchmark(Exception):
+    """Raised by a case (or its setup) when it cannot run here, e.g. DeepFace weights are missing"""
+
+def _call(fn: Callable[[], Any], loop: asyncio.AbstractEventLoop):
+    result = fn()
+    if inspect.isawaitable(result):
+        result = loop.run_until_complete(result)
+    return result
+
+def summarize_timings(timings_ms: List[float]) -> Dict[str, Any]:
+    ordered = sorted(timings_ms)
+    p95_index = min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))
+    median = statistics.median(ordered)
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0], 4),
+        "median_ms": round(median, 4),
+        "mean_ms": round(statistics.fmean(ordered), 4),
+        "p95_ms": round(ordered[p95_index], 4),
+        "max_ms": round(ordered[-1], 4),
+        "ops_per_sec": round(1000.0 / median, 2) if median > 0 else None,
+    }
+
+def run_benchmark(benchmark: Benchmark, loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
+    """Warm up once, then time runs until min_runs and min_time are both reached (capped at max_runs)"""
+    result: Dict[str, Any] = {"group": benchmark.group}
+    try:
+        if benchmark.setup:
+            _call(benchmark.setup, loop)
+        _call(benchmark.fn, loop)
+
+        timings = []
+        started = time.perf_counter()
+        while len(timings) < benchmark.max_runs:
+            run_started = time.perf_counter()
+            _call(benchmark.fn, loop)
+            timings.append((time.perf_counter() - run_started) * 1000)
+            if len(timings) >= benchmark.min_runs and time.perf_counter() - started >= benchmark.min_time:
+                break
+        result.update({"status": "ok", **summarize_timings(timings)})
+    except SkipBenchmark as e:
+        result.update({"status": "skipped", "reason": str(e)})
+    except Exception as e:
+        result.update({"status": "error", "reason": f"{type(e).__name__}: {e}"})
+    return result
+
+def environment_info(extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    import numpy
+    import cv2
+    info = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": numpy.__version__,
+        "opencv": cv2.__version__,
+    }
+    info.update(extra or {})
+    return info
+
+def write_results(path: str, results: Dict[str, Any]):
+    with open(path, "w") as f:
+        json.dump(results, f, indent=2, sort_keys=False)
+
+def load_results(path: str) -> Dict[str, Any]:
+    with open(path) as f:
+        results = json.load(f)
+    if results.get("format_version") != RESULTS_FORMAT_VERSION:
+        raise ValueError(f"{path} is not a benchmark results file (format {results.get('format_version')})")
+    return results
+
+def compare_results(
+    current: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float = 0.2,
+    noise_floor_ms: float = NOISE_FLOOR_MS
+) -> Dict[str, Any]:
+    """
+    Compare median timings case by case.
+
+    A case regresses when its median grows by more than `tolerance` (0.2 =
+    20%) and by more than noise_floor_ms in absolute terms; it improves on the
+    mirror condition. Cases that ran in only one of the two files are listed
+    separately and never count as regressions.
+    """
+    rows = []
+    missing = []
+    for name, base in baseline["benchmarks"].items():
+        now = current["benchmarks"].get(name)
+        if not now or now.get("status") != "ok" or base.get("status") != "ok":
+            missing.append(name)
+            continue
+        delta = now["median_ms"] - base["median_ms"]
+        ratio = now["median_ms"] / base["median_ms"] if base["median_ms"] > 0 else float("inf")
+        if ratio > 1 + tolerance and delta > noise_floor_ms:
+            verdict = "regression"
+        elif ratio < 1 / (1 + tolerance) and -delta > noise_floor_ms:
+            verdict = "improvement"
+        else:
+            verdict = "unchanged"
+        rows.append({
+            "name": name,
+            "baseline_ms": base["median_ms"],
+            "current_ms": now["median_ms"],
+            "ratio": round(ratio, 3),
+            "verdict": verdict,
+        })
+    new = [name for name, now in current["benchmarks"].items() if name not in baseline["benchmarks"] and now.get("status") == "ok"]
+    return {
+        "tolerance": tolerance,
+        "rows": rows,
+        "regressions": [row["name"] for row in rows if row["verdict"] == "regression"],
+        "improvements": [row["name"] for row in rows if row["verdict"] == "improvement"],
+        "not_compared": missing,
+        "new": new,
+    }
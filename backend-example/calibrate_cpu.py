@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+CPU Thread Calibration for ITScence
+Benchmarks combinations of TensorFlow intra/inter-op, OpenCV and BLAS thread
+counts and recognition concurrency on this host, with as many worker
+processes as production runs, and writes the best as the profile that
+cpu_tuning applies at startup.
+
+Run with: python calibrate_cpu.py --processes 2 --seconds 5
+          python calibrate_cpu.py --processes 4 --concurrency 1,2 --max-p95-ms 800
+Each combination runs in fresh processes, since TensorFlow fixes its thread
+pools when it starts. Without DeepFace installed only the OpenCV/numpy stages
+(decode, liveness-style filters, gallery matching) are measured.
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import subprocess
+from datetime import datetime
+from itertools import product
+
+from cpu_tuning import available_cpus, plan_threads, BLAS_THREAD_VARS, CPU_PROFILE_FILE
+
+DEFAULT_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "laporan", "foto.jpg")
+CONFIG_FILE = "deepface_config.json"
+
+def thread_options(limit: int):
+    """1, 2, 4, ... up to limit, always including limit"""
+    options, value = [], 1
+    while value < limit:
+        options.append(value)
+        value *= 2
+    return options + [limit]
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))] if ordered else 0.0
+
+def run_worker(settings: dict):
+    """One benchmark process: the thread env is already set by the parent"""
+    import threading
+    import cv2
+    import numpy as np
+    from image_ingest import decode_image
+    from gallery import FaceGallery
+
+    cv2.setNumThreads(settings["opencv"])
+    with open(settings["image"], "rb") as f:
+        data = f.read()
+
+    represent = None
+    if settings["deepface"]:
+        try:
+            from deepface import DeepFace
+            model = settings["model_name"]
+            detector = settings["detector_backend"]
+            represent = lambda image: DeepFace.represent(img_path=image, model_name=model, detector_backend=detector, enforce_detection=False)
+            represent(decode_image(data)[0])  # load the model outside the timed loop
+        except ImportError:
+            represent = None
+
+    rng = np.random.default_rng(0)
+    gallery = FaceGallery("calibration", "cosine")
+    gallery.load_arrays(
+        [str(row) for row in range(settings["gallery_size"])], [""] * settings["gallery_size"],
+        gallery._prepare(rng.normal(size=(settings["gallery_size"], 512)).astype(np.float32)), 1
+    )
+    probe = rng.normal(size=512).astype(np.float32)
+
+    def recognize_once():
+        image, _ = decode_image(data)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+        # The same kinds of filters the liveness check runs
+        cv2.Canny(gray, 50, 150)
+        np.abs(np.fft.fftshift(np.fft.fft2(gray)))
+        cv2.cvtColor(image, cv2.COLOR_BGR2HSV)
+        cv2.Laplacian(gray, cv2.CV_64F).var()
+        if represent is not None:
+            represent(image)
+        gallery.match(probe)
+
+    latencies = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + settings["seconds"]
+
+    def loop():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            recognize_once()
+            with lock:
+                latencies.append((time.perf_counter() - started) * 1000)
+
+    threads = [threading.Thread(target=loop) for _ in range(settings["concurrency"])]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    print(json.dumps({"count": len(latencies), "elapsed": elapsed, "latencies": latencies}))
+
+def run_combination(settings: dict, processes: int) -> dict:
+    """Run `processes` benchmark workers at once with the given thread settings"""
+    env = dict(os.environ, CPU_TUNING="off")
+    env["TF_NUM_INTRAOP_THREADS"] = str(settings["tf_intra_op"])
+    env["TF_NUM_INTEROP_THREADS"] = str(settings["tf_inter_op"])
+    env["TF_CPP_MIN_LOG_LEVEL"] = "3"
+    for var in BLAS_THREAD_VARS:
+        env[var] = str(settings["blas"])
+    workers = [
+        subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--worker", json.dumps(settings)],
+            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, env=env, text=True
+        )
+        for _ in range(processes)
+    ]
+    outputs = []
+    for worker in workers:
+        stdout, _ = worker.communicate()
+        lines = [line for line in stdout.splitlines() if line.startswith("{")]
+        if worker.returncode != 0 or not lines:
+            raise RuntimeError(f"benchmark worker failed (exit {worker.returncode})")
+        outputs.append(json.loads(lines[-1]))
+
+    latencies = [value for output in outputs for value in output["latencies"]]
+    throughput = sum(output["count"] / output["elapsed"] for output in outputs)
+    return {
+        **{key: settings[key] for key in ("tf_intra_op", "tf_inter_op", "opencv", "blas", "concurrency")},
+        "throughput_per_second": round(throughput, 2),
+        "p50_ms": round(percentile(latencies, 0.5), 1),
+        "p95_ms": round(percentile(latencies, 0.95), 1),
+    }
+
+def pick_best(results, max_p95_ms=None):
+    """Highest throughput (within 3%, the lower p95 wins); runs over max_p95_ms are skipped when possible"""
+    eligible = [result for result in results if max_p95_ms is None or result["p95_ms"] <= max_p95_ms] or results
+    top = max(result["throughput_per_second"] for result in eligible)
+    close = [result for result in eligible if result["throughput_per_second"] >= 0.97 * top]
+    return min(close, key=lambda result: result["p95_ms"])
+
+def load_model_settings():
+    try:
+        with open(CONFIG_FILE) as f:
+            data = json.load(f)
+        return data.get("model_name", "VGG-Face"), data.get("detector_backend", "opencv")
+    except (OSError, ValueError):
+        return "VGG-Face", "opencv"
+
+def main():
+    parser = argparse.ArgumentParser(description="Calibrate inference thread counts for this host")
+    parser.add_argument("--processes", type=int, default=int(os.getenv("CPU_WORKER_PROCESSES") or os.getenv("WORKERS") or "1"),
+                        help="Worker processes that will share the CPUs in production")
+    parser.add_argument("--concurrency", default="1,2", help="Comma-separated recognitions in flight per process to try")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Measurement time per combination")
+    parser.add_argument("--image", default=DEFAULT_IMAGE, help="Sample face image")
+    parser.add_argument("--gallery-size", type=int, default=10000, help="Synthetic gallery rows to match against")
+    parser.add_argument("--max-p95-ms", type=float, help="Prefer combinations with p95 latency under this")
+    parser.add_argument("--no-deepface", action="store_true", help="Skip the DeepFace embedding stage")
+    parser.add_argument("--out", default=CPU_PROFILE_FILE, help="Profile file to write")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        run_worker(json.loads(args.worker))
+        return
+
+    try:
+        import deepface  # noqa: F401
+        use_deepface = not args.no_deepface
+    except ImportError:
+        use_deepface = False
+    model_name, detector_backend = load_model_settings()
+
+    cpus = available_cpus()
+    baseline = plan_threads(cpus["effective"], args.processes)
+    per_process = baseline["cpus_per_process"]
+    print(f"🧵 {cpus['effective']} usable CPU(s) (affinity {cpus['affinity']}, quota {cpus['quota']}), "
+          f"{args.processes} process(es) -> {per_process} CPU(s) per process")
+    print(f"   Workload: {'DeepFace ' + model_name + '/' + detector_backend + ' + ' if use_deepface else ''}decode, filters, gallery match")
+
+    # TensorFlow settings only matter when the DeepFace stage runs
+    intra_options = thread_options(per_process) if use_deepface else [per_process]
+    inter_options = [1, 2] if use_deepface and per_process > 1 else [1]
+    concurrency_options = sorted({int(value) for value in args.concurrency.split(",") if value.strip()})
+    combinations = [
+        {"tf_intra_op": intra, "tf_inter_op": inter, "opencv": threads, "blas": threads, "concurrency": concurrency}
+        for intra, inter, threads, concurrency in product(intra_options, inter_options, thread_options(per_process), concurrency_options)
+    ]
+
+    results = []
+    for number, combination in enumerate(combinations, 1):
+        settings = dict(
+            combination, image=args.image, seconds=args.seconds, gallery_size=args.gallery_size,
+            deepface=use_deepface, model_name=model_name, detector_backend=detector_backend
+        )
+        try:
+            result = run_combination(settings, args.processes)
+        except RuntimeError as e:
+            print(f"❌ [{number}/{len(combinations)}] {combination}: {e}")
+            continue
+        results.append(result)
+        print(f"   [{number}/{len(combinations)}] TF {result['tf_intra_op']}/{result['tf_inter_op']} "
+              f"OpenCV/BLAS {result['opencv']} x{result['concurrency']}: "
+              f"{result['throughput_per_second']:.1f}/s, p50 {result['p50_ms']:.0f}ms, p95 {result['p95_ms']:.0f}ms")
+
+    if not results:
+        print("❌ No combination completed")
+        sys.exit(1)
+
+    best = pick_best(results, args.max_p95_ms)
+    profile = {
+        "cpus": cpus["effective"],
+        "processes": args.processes,
+        "cpus_per_process": per_process,
+        "tf_intra_op": best["tf_intra_op"],
+        "tf_inter_op": best["tf_inter_op"],
+        "opencv": best["opencv"],
+        "blas": best["blas"],
+        "inference_threads": best["concurrency"],
+        "throughput_per_second": best["throughput_per_second"],
+        "p50_ms": best["p50_ms"],
+        "p95_ms": best["p95_ms"],
+        "workload": f"deepface {model_name}/{detector_backend}" if use_deepface else "opencv+numpy",
+        "calibrated_at": datetime.now().isoformat(timespec="seconds"),
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(profile, f, indent=2)
+    print(f"✅ Best: TF {best['tf_intra_op']}/{best['tf_inter_op']}, OpenCV/BLAS {best['opencv']}, "
+          f"{best['concurrency']} in flight -> {best['throughput_per_second']:.1f}/s (p95 {best['p95_ms']:.0f}ms)")
+    print(f"   Profile written to {args.out}; set RECOGNITION_MAX_IN_FLIGHT={best['concurrency']} to match")
+
+if __name__ == "__main__":
+    main()
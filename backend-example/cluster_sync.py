@@ -0,0 +1,217 @@
+"""
+Cross-node configuration and gallery invalidation for ITScence
+Keeps every worker's config and face gallery in step through MongoDB
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from database import CLUSTER_STATE_COLLECTION, GALLERY_CHANGES_COLLECTION
+
+# Version poll interval when change streams are unavailable (standalone mongod)
+CLUSTER_POLL_SECONDS = float(os.getenv("CLUSTER_POLL_SECONDS", "5"))
+# Safety re-check interval while change streams are active
+CLUSTER_RECHECK_SECONDS = float(os.getenv("CLUSTER_RECHECK_SECONDS", "60"))
+CLUSTER_USE_CHANGE_STREAMS = os.getenv("CLUSTER_USE_CHANGE_STREAMS", "true").lower() == "true"
+# A hole in the gallery change sequence older than this triggers a full gallery reload
+GALLERY_GAP_TIMEOUT_SECONDS = float(os.getenv("GALLERY_GAP_TIMEOUT_SECONDS", "30"))
+
+class ClusterSync:
+    """
+    Watches the cluster-wide config version and gallery change log.
+
+    Config lives in one versioned cluster_state document; POST /api/config
+    publishes a new version there. Gallery edits append to gallery_changes with
+    a sequence number from the counters collection, and a worker's gallery
+    version is the last sequence number it applied.
+
+    A background thread tails a change stream on those collections and wakes
+    the sync loop on every event. Without a replica set the thread exits and
+    the loop falls back to polling two small documents every
+    CLUSTER_POLL_SECONDS. On wake-up a newer config is handed to on_config,
+    and gallery changes are applied to the current gallery incrementally
+    (upserts fetch only the affected embeddings). A full reload through
+    on_gallery_reload happens only when changes are missing from the log.
+    """
+
+    def __init__(
+        self,
+        db_manager,
+        get_gallery: Callable[[], Any],
+        on_config: Callable[[Dict[str, Any]], Awaitable[None]],
+        on_gallery_reload: Callable[[], Awaitable[None]]
+    ):
+        self.db_manager = db_manager
+        self.get_gallery = get_gallery
+        self.on_config = on_config
+        self.on_gallery_reload = on_gallery_reload
+        self.config_version = 0
+        self.mode = "stopped"
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = threading.Event()
+        self._gap_since: Optional[float] = None
+        self.metrics = {
+            "checks": 0,
+            "config_reloads": 0,
+            "gallery_changes_applied": 0,
+            "gallery_full_reloads": 0,
+            "last_check_ms": 0.0,
+            "errors": 0,
+        }
+
+    async def start(self):
+        loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping.clear()
+        self.mode = "poll"
+        if CLUSTER_USE_CHANGE_STREAMS:
+            self.mode = "change_stream"
+            threading.Thread(target=self._watch, args=(loop,), name="cluster-sync-watch", daemon=True).start()
+        self._task = asyncio.create_task(self._run())
+        logging.info(f"✅ Cluster sync started ({self.mode})")
+
+    async def stop(self):
+        self._stopping.set()
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self.mode = "stopped"
+
+    def wakeup(self):
+        """Ask the sync loop to check for changes now"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def publish_config(self, config: Dict[str, Any]) -> int:
+        """Publish a new cluster-wide config; this worker already has it applied"""
+        loop = asyncio.get_running_loop()
+        version = await loop.run_in_executor(None, self.db_manager.publish_cluster_config, config)
+        self.config_version = max(self.config_version, version)
+        return version
+
+    async def publish_gallery_change(self, op: str, employee_id: str) -> int:
+        """Record a gallery 'upsert' or 'delete' for every worker (including this one) to apply"""
+        loop = asyncio.get_running_loop()
+        seq = await loop.run_in_executor(None, self.db_manager.record_gallery_change, op, employee_id)
+        self.wakeup()
+        return seq
+
+    def stats(self) -> Dict[str, Any]:
+        gallery = self.get_gallery()
+        return {
+            **self.metrics,
+            "mode": self.mode,
+            "config_version": self.config_version,
+            "gallery_version": gallery.version if gallery else None,
+        }
+
+    def _watch(self, loop):
+        pipeline = [{"$match": {"ns.coll": {"$in": [CLUSTER_STATE_COLLECTION, GALLERY_CHANGES_COLLECTION]}}}]
+        try:
+            with self.db_manager.db.watch(pipeline, max_await_time_ms=1000) as stream:
+                while not self._stopping.is_set() and stream.alive:
+                    if stream.try_next() is not None:
+                        loop.call_soon_threadsafe(self._wakeup.set)
+        except Exception as e:
+            if not self._stopping.is_set():
+                logging.warning(f"⚠️ Change streams unavailable ({e}); polling every {CLUSTER_POLL_SECONDS}s")
+                self.mode = "poll"
+                loop.call_soon_threadsafe(self._wakeup.set)
+
+    async def _run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                self.metrics["errors"] += 1
+                logging.error(f"❌ Cluster sync check failed: {e}")
+            timeout = CLUSTER_POLL_SECONDS if self.mode == "poll" else CLUSTER_RECHECK_SECONDS
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+
+    async def check(self):
+        """Apply any config or gallery changes published since the last check"""
+        loop = asyncio.get_running_loop()
+        started = time.perf_counter()
+        self.metrics["checks"] += 1
+
+        config_version = await loop.run_in_executor(None, self.db_manager.get_cluster_config_version)
+        if config_version > self.config_version:
+            state = await loop.run_in_executor(None, self.db_manager.get_cluster_config)
+            if state and state.get("config"):
+                self.config_version = state["version"]
+                await self.on_config(state["config"])
+                self.metrics["config_reloads"] += 1
+                logging.info(f"🔄 Cluster config v{state['version']} applied")
+
+        gallery = self.get_gallery()
+        if gallery is not None:
+            latest = await loop.run_in_executor(None, self.db_manager.get_gallery_version)
+            if latest > gallery.version:
+                await self._sync_gallery(gallery, latest)
+
+        self.metrics["last_check_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+    async def _sync_gallery(self, gallery, latest: int):
+        loop = asyncio.get_running_loop()
+        changes = await loop.run_in_executor(None, self.db_manager.get_gallery_changes, gallery.version)
+
+        # Only apply the contiguous run of changes; a hole is either a writer that has
+        # bumped the sequence but not yet logged the change, or a trimmed log
+        contiguous = []
+        expected = gallery.version + 1
+        for change in changes:
+            if change["seq"] != expected:
+                break
+            contiguous.append(change)
+            expected += 1
+
+        if contiguous:
+            applied = await loop.run_in_executor(None, self._apply_gallery_changes, gallery, contiguous)
+            self.metrics["gallery_changes_applied"] += applied
+            self._gap_since = None
+            if gallery.version < latest:
+                self.wakeup()
+            return
+
+        if self._gap_since is None:
+            self._gap_since = time.monotonic()
+        elif time.monotonic() - self._gap_since > GALLERY_GAP_TIMEOUT_SECONDS:
+            logging.warning(f"⚠️ Gallery change log has a gap after v{gallery.version}; reloading gallery")
+            self._gap_since = None
+            await self.on_gallery_reload()
+            self.metrics["gallery_full_reloads"] += 1
+
+    def _apply_gallery_changes(self, gallery, changes: List[Dict[str, Any]]) -> int:
+        # Last operation per employee wins
+        final_ops: Dict[str, str] = {}
+        for change in changes:
+            final_ops[change["employee_id"]] = change["op"]
+
+        upsert_ids = [employee_id for employee_id, op in final_ops.items() if op == "upsert"]
+        embeddings = {
+            entry["employee_id"]: entry
+            for entry in (self.db_manager.get_face_embeddings(gallery.model_name, upsert_ids) if upsert_ids else [])
+        }
+
+        # One rebuild of the gallery arrays for the whole batch; an upsert whose
+        # embedding has since been deleted is a removal
+        upserts = [
+            (employee_id, embeddings[employee_id].get("name"), embeddings[employee_id]["embedding"])
+            for employee_id in upsert_ids if employee_id in embeddings
+        ]
+        removals = [employee_id for employee_id in final_ops if employee_id not in embeddings]
+        gallery.apply_many(upserts, removals, version=changes[-1]["seq"])
+        return len(changes)
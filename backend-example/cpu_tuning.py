@@ -0,0 +1,238 @@
+"""
+CPU thread tuning for ITScence inference workers
+Sizes the TensorFlow, OpenCV and BLAS thread pools to the CPUs this process
+may actually use (affinity mask and cgroup quota), shared out across worker
+processes, so several workers on a small VM do not oversubscribe it
+"""
+
+import os
+import sys
+import json
+import math
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+# "auto": plan from the detected CPUs, using a calibrated profile when it matches;
+# "off": leave every library at its default (all cores each)
+CPU_TUNING = os.getenv("CPU_TUNING", "auto").lower()
+# Written by calibrate_cpu.py
+CPU_PROFILE_FILE = os.getenv("CPU_PROFILE_FILE", "cpu_profile.json")
+# Worker processes sharing this host's CPUs (gunicorn/uvicorn workers)
+CPU_WORKER_PROCESSES = int(os.getenv("CPU_WORKER_PROCESSES") or os.getenv("WEB_CONCURRENCY") or os.getenv("WORKERS") or "1")
+# Pin each worker process to its own slice of the CPUs
+CPU_PIN_WORKERS = os.getenv("CPU_PIN_WORKERS", "false").lower() == "true"
+CPU_SLOT_LOCK_DIR = os.getenv("CPU_SLOT_LOCK_DIR", "/tmp")
+
+# Read by OpenMP, OpenBLAS, MKL, numexpr and Accelerate when they load
+BLAS_THREAD_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS", "NUMEXPR_NUM_THREADS", "VECLIB_MAXIMUM_THREADS")
+
+_applied: Optional[Dict[str, Any]] = None
+_slot_lock = None  # open lock file holding this worker's CPU slot
+
+def affinity_cpus() -> List[int]:
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+def cgroup_paths(proc_cgroup: str = "/proc/self/cgroup") -> Tuple[Optional[str], Optional[str]]:
+    """This process's cgroup v2 path and v1 cpu-controller path (either may be None)"""
+    v2, v1 = None, None
+    try:
+        with open(proc_cgroup) as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return None, None
+    for line in lines:
+        parts = line.split(":", 2)
+        if len(parts) != 3:
+            continue
+        _, controllers, path = parts
+        if not controllers:
+            v2 = path
+        elif "cpu" in controllers.split(","):
+            v1 = path
+    return v2, v1
+
+def _cgroup_dirs(base: str, path: Optional[str]) -> List[str]:
+    """base/path and each of its parents up to base; limits anywhere above a cgroup apply to it"""
+    parts = [part for part in (path or "/").strip("/").split("/") if part and part != ".."]
+    return [os.path.join(base, *parts[:depth]) for depth in range(len(parts), -1, -1)]
+
+def _cpu_max(directory: str) -> Optional[float]:
+    try:
+        with open(os.path.join(directory, "cpu.max")) as f:
+            quota, period = f.read().split()[:2]
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        return None
+
+def _cfs_quota(directory: str) -> Optional[float]:
+    try:
+        with open(os.path.join(directory, "cpu.cfs_quota_us")) as f:
+            quota = int(f.read())
+        with open(os.path.join(directory, "cpu.cfs_period_us")) as f:
+            period = int(f.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+def cgroup_cpu_quota(root: str = "/sys/fs/cgroup", proc_cgroup: str = "/proc/self/cgroup") -> Optional[float]:
+    """
+    CPUs allowed by the tightest cgroup quota (v2 cpu.max or v1 cfs quota/period)
+    on this process's cgroup path from /proc/self/cgroup and its parents; None
+    when unlimited. In a container with its own cgroup namespace the path is
+    "/", so this reads the mount root; on a host (e.g. a systemd service) it
+    reads the service's own cgroup.
+    """
+    v2_path, v1_path = cgroup_paths(proc_cgroup)
+    quotas = [_cpu_max(directory) for directory in _cgroup_dirs(root, v2_path)]
+    for controller in ("cpu", "cpu,cpuacct"):
+        quotas += [_cfs_quota(directory) for directory in _cgroup_dirs(os.path.join(root, controller), v1_path)]
+    quotas = [quota for quota in quotas if quota is not None]
+    return min(quotas) if quotas else None
+
+def available_cpus(root: str = "/sys/fs/cgroup", proc_cgroup: str = "/proc/self/cgroup") -> Dict[str, Any]:
+    """CPUs usable by this process: the affinity mask, capped by the cgroup quota (rounded down, at least 1)"""
+    cpus = affinity_cpus()
+    quota = cgroup_cpu_quota(root, proc_cgroup)
+    effective = len(cpus) if quota is None else max(1, min(len(cpus), math.floor(quota)))
+    return {"host": os.cpu_count(), "affinity": len(cpus), "quota": quota, "effective": effective}
+
+def plan_threads(cpus: int, processes: int = 1, inference_threads: int = 1) -> Dict[str, int]:
+    """
+    Thread counts for one worker process. TensorFlow's intra-op pool is shared
+    by all inferences in the process, so it gets the process's whole share;
+    OpenCV and BLAS run inside each concurrent inference thread, so they split it.
+    """
+    per_process = max(1, cpus // max(1, processes))
+    per_inference = max(1, per_process // max(1, inference_threads))
+    return {
+        "cpus": cpus,
+        "processes": processes,
+        "cpus_per_process": per_process,
+        "tf_intra_op": per_process,
+        "tf_inter_op": 1,
+        "opencv": per_inference,
+        "blas": per_inference,
+    }
+
+def load_profile(path: str = CPU_PROFILE_FILE) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def claim_cpu_slot(processes: int, lock_dir: str = CPU_SLOT_LOCK_DIR) -> Optional[int]:
+    """First free slot in 0..processes-1, held by a file lock for the life of the process"""
+    global _slot_lock
+    try:
+        import fcntl
+    except ImportError:
+        return None
+    for slot in range(processes):
+        handle = open(os.path.join(lock_dir, f"itscence-cpu-slot-{slot}.lock"), "w")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            continue
+        _slot_lock = handle
+        return slot
+    return None
+
+def pin_to_slot(slot: int, processes: int, cpus: List[int]) -> List[int]:
+    """Restrict this process to its contiguous share of cpus"""
+    per_process = max(1, len(cpus) // max(1, processes))
+    start = (slot * per_process) % len(cpus)
+    pinned = cpus[start:start + per_process]
+    os.sched_setaffinity(0, pinned)
+    return pinned
+
+def _limit_blas(threads: int) -> str:
+    """BLAS loaded before tuning (numpy) is limited at runtime when threadpoolctl is installed"""
+    for var in BLAS_THREAD_VARS:
+        os.environ[var] = str(threads)
+    try:
+        from threadpoolctl import threadpool_limits
+        threadpool_limits(limits=threads)
+        return "threadpoolctl"
+    except ImportError:
+        return "environment"
+
+def _limit_tensorflow(intra: int, inter: int) -> str:
+    """The env vars cover a TensorFlow that is not loaded yet; a loaded one is set directly if it has not started"""
+    os.environ["TF_NUM_INTRAOP_THREADS"] = str(intra)
+    os.environ["TF_NUM_INTEROP_THREADS"] = str(inter)
+    tf = sys.modules.get("tensorflow")
+    if tf is None:
+        return "environment"
+    try:
+        tf.config.threading.set_intra_op_parallelism_threads(intra)
+        tf.config.threading.set_inter_op_parallelism_threads(inter)
+        return "runtime"
+    except RuntimeError:
+        return "already_initialized"
+
+def apply_cpu_tuning(
+    inference_threads: int = 1,
+    processes: int = CPU_WORKER_PROCESSES,
+    pin: bool = CPU_PIN_WORKERS,
+    profile_path: str = CPU_PROFILE_FILE
+) -> Dict[str, Any]:
+    """
+    Size this worker's thread pools; call before TensorFlow is imported.
+    A calibrated profile is used when it was measured with the same CPUs per
+    process, otherwise the plan comes from plan_threads().
+    """
+    global _applied
+    if CPU_TUNING == "off":
+        _applied = {"mode": "off"}
+        return _applied
+
+    cpus = available_cpus()
+    result: Dict[str, Any] = {"mode": "auto", "detected": cpus}
+    if pin and processes > 1 and hasattr(os, "sched_setaffinity"):
+        slot = claim_cpu_slot(processes)
+        if slot is not None:
+            result["pinned"] = {"slot": slot, "cpus": pin_to_slot(slot, processes, affinity_cpus())}
+            # The slice is this process's alone, but the cgroup quota is still shared by all of them
+            cpus = dict(cpus, effective=max(1, min(len(result["pinned"]["cpus"]), cpus["effective"] // processes)))
+            processes = 1
+
+    plan = plan_threads(cpus["effective"], processes, inference_threads)
+    profile = load_profile(profile_path)
+    if profile and profile.get("cpus_per_process") == plan["cpus_per_process"]:
+        plan.update({key: int(profile[key]) for key in ("tf_intra_op", "tf_inter_op", "opencv", "blas") if key in profile})
+        result["profile"] = profile_path
+    elif profile:
+        logging.warning(
+            f"⚠️ CPU profile {profile_path} was calibrated for {profile.get('cpus_per_process')} CPU(s) per process; "
+            f"using the default plan for {plan['cpus_per_process']}"
+        )
+
+    try:
+        import cv2
+        cv2.setNumThreads(plan["opencv"])
+    except Exception as e:
+        logging.warning(f"⚠️ Could not set OpenCV threads: {e}")
+    result["blas_limited_by"] = _limit_blas(plan["blas"])
+    result["tensorflow_limited_by"] = _limit_tensorflow(plan["tf_intra_op"], plan["tf_inter_op"])
+    result["threads"] = plan
+    _applied = result
+    logging.info(
+        f"🧵 CPU tuning: {cpus['effective']} CPU(s), {processes} process(es) -> "
+        f"TF {plan['tf_intra_op']}/{plan['tf_inter_op']}, OpenCV {plan['opencv']}, BLAS {plan['blas']}"
+    )
+    return result
+
+def thread_plan() -> Dict[str, int]:
+    """Thread counts in effect for this process (all zero = library defaults when tuning is off)"""
+    if _applied and "threads" in _applied:
+        return _applied["threads"]
+    if CPU_TUNING == "off":
+        return {"tf_intra_op": 0, "tf_inter_op": 0, "opencv": 0, "blas": 0}
+    return plan_threads(available_cpus()["effective"], CPU_WORKER_PROCESSES)
+
+def tuning_status() -> Dict[str, Any]:
+    return _applied or {"mode": "not_applied"}
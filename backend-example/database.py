@@ -3,18 +3,23 @@ MongoDB Database Configuration and Models for ITScence
 """
 
 import os
+import time
+import asyncio
 import logging
 from datetime import datetime, timezone
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Tuple
 from bson import ObjectId
 import gridfs
 import io
+import json
 import base64
+import uuid
+import threading
 from PIL import Image
 
 try:
-    from pymongo import MongoClient
-    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
+    from pymongo import MongoClient, UpdateOne, ReturnDocument
+    from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError, BulkWriteError
     PYMONGO_AVAILABLE = True
 except ImportError:
     PYMONGO_AVAILABLE = False
@@ -23,8 +28,13 @@ except ImportError:
 from pydantic import BaseModel, Field, ConfigDict
 from typing_extensions import Annotated
 
+# Attendance group-commit writer
+from attendance_writer import AttendanceWriteBuffer
+from image_persistence import AttendanceImageQueue
+from presence import PresenceTable
+
 # Timezone utilities
-from timezone_utils import get_local_now, get_local_date_start
+from timezone_utils import get_local_now, get_local_date_start, convert_utc_to_local, parse_local_datetime
 
 # MongoDB Configuration
 MONGODB_URL = os.getenv("MONGODB_URL", "mongodb://localhost:27017")
@@ -32,6 +42,39 @@ DATABASE_NAME = os.getenv("DATABASE_NAME", "itscence")
 EMPLOYEES_COLLECTION = "employees"
 ATTENDANCE_COLLECTION = "attendance"
 FACES_COLLECTION = "faces"
+ATTENDANCE_SUMMARY_COLLECTION = "attendance_daily_summary"
+COUNTERS_COLLECTION = "counters"
+FACE_EMBEDDINGS_COLLECTION = "face_embeddings"
+CLUSTER_STATE_COLLECTION = "cluster_state"
+GALLERY_CHANGES_COLLECTION = "gallery_changes"
+
+# Cluster-wide versioning of config and gallery (see cluster_sync.py)
+CLUSTER_CONFIG_ID = "config"
+CLUSTER_IDENTITY_ID = "identity"
+GALLERY_SEQ_COUNTER = "gallery_seq"
+GALLERY_CHANGES_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Employee ID allocation (EMP001, EMP002, ...)
+EMPLOYEE_ID_COUNTER = "employee_id"
+EMPLOYEE_ID_PREFIX = "EMP"
+
+# Statistics cache: serve cached stats for STATS_CACHE_TTL seconds, then keep
+# serving them for up to STATS_STALE_TTL seconds while a background refresh runs
+STATS_CACHE_TTL = float(os.getenv("STATS_CACHE_TTL", "15"))
+STATS_STALE_TTL = float(os.getenv("STATS_STALE_TTL", "300"))
+
+# Attendance history paging
+MAX_ATTENDANCE_PAGE_SIZE = 500
+ATTENDANCE_LIST_PROJECTION = {
+    "_id": 1,
+    "attendance_id": 1,
+    "employee_id": 1,
+    "employee_name": 1,
+    "type": 1,
+    "timestamp": 1,
+    "confidence": 1,
+    "image_id": 1,
+}
 
 # Database Models
 class PyObjectId(ObjectId):
@@ -79,6 +122,14 @@ class DatabaseManager:
         self.db = None
         self.fs = None
         self.connected = False
+        self.stats_cache = StatsCache(self.get_stats)
+        self.attendance_writer = AttendanceWriteBuffer(self.write_attendance_batch)
+        self.attendance_images = AttendanceImageQueue(self.put_attendance_image, self.set_attendance_image)
+        self.presence = PresenceTable()
+        # (employee_id, date) summaries whose incremental update failed, rebuilt from raw records
+        self._summary_repairs: set = set()
+        self._summary_repairs_lock = threading.Lock()
+        self.summary_metrics = {"update_failures": 0, "days_repaired": 0, "repair_failures": 0}
         
     def connect(self):
         """Connect to MongoDB"""
@@ -97,14 +148,7 @@ class DatabaseManager:
             # Test connection
             self.client.admin.command('ping')
             
-            self.db = self.client[DATABASE_NAME]
-            self.fs = gridfs.GridFS(self.db)
-            
-            # Create indexes for better performance
-            self.db[EMPLOYEES_COLLECTION].create_index("employee_id", unique=True)
-            self.db[ATTENDANCE_COLLECTION].create_index([("employee_id", 1), ("timestamp", -1)])
-            
-            self.connected = True
+            self.attach(self.client, DATABASE_NAME)
             logging.info(f"✅ Connected to MongoDB: {DATABASE_NAME}")
             return True
             
@@ -117,6 +161,30 @@ class DatabaseManager:
             self.connected = False
             return False
     
+    def attach(self, client, database_name: str):
+        """Use an already-connected client (any pymongo-compatible one) and prepare the database"""
+        self.client = client
+        self.db = client[database_name]
+        self.fs = gridfs.GridFS(self.db)
+        
+        # Create indexes for better performance
+        self.db[EMPLOYEES_COLLECTION].create_index("employee_id", unique=True)
+        self.db[EMPLOYEES_COLLECTION].create_index("face_enrolled")
+        self.db[ATTENDANCE_COLLECTION].create_index([("employee_id", 1), ("timestamp", -1)])
+        # Keyset pagination indexes: every history query sorts on (timestamp, _id)
+        self.db[ATTENDANCE_COLLECTION].create_index([("timestamp", -1), ("_id", -1)])
+        self.db[ATTENDANCE_COLLECTION].create_index([("employee_id", 1), ("timestamp", -1), ("_id", -1)])
+        self.db[ATTENDANCE_COLLECTION].create_index([("type", 1), ("timestamp", -1), ("_id", -1)])
+        self.db[ATTENDANCE_COLLECTION].create_index("attendance_id")
+        # One summary per employee per local day; date prefix serves company-wide range reads
+        self.db[ATTENDANCE_SUMMARY_COLLECTION].create_index([("date", 1), ("employee_id", 1)], unique=True)
+        self.db[FACE_EMBEDDINGS_COLLECTION].create_index([("model_name", 1), ("employee_id", 1)], unique=True)
+        self.db[GALLERY_CHANGES_COLLECTION].create_index("seq", unique=True)
+        self.db[GALLERY_CHANGES_COLLECTION].create_index("at", expireAfterSeconds=GALLERY_CHANGES_RETENTION_SECONDS)
+        
+        self.seed_employee_id_counter()
+        self.connected = True
+
     def disconnect(self):
         """Disconnect from MongoDB"""
         if self.client:
@@ -164,6 +232,50 @@ class DatabaseManager:
             logging.error(f"❌ Error creating employee: {e}")
             raise
 
+    def seed_employee_id_counter(self):
+        """
+        Seed the employee ID counter from existing employee IDs (one-time migration).
+
+        Runs on connect but only scans employees when the counter document does not
+        exist yet; $max keeps it safe when several workers seed at the same time.
+        """
+        counters = self.db[COUNTERS_COLLECTION]
+        if counters.find_one({"_id": EMPLOYEE_ID_COUNTER}) is not None:
+            return
+
+        highest = 0
+        for employee in self.db[EMPLOYEES_COLLECTION].find({}, {"_id": 0, "employee_id": 1}):
+            employee_id = str(employee.get("employee_id", ""))
+            suffix = employee_id[len(EMPLOYEE_ID_PREFIX):]
+            if employee_id.startswith(EMPLOYEE_ID_PREFIX) and suffix.isdigit():
+                highest = max(highest, int(suffix))
+
+        counters.update_one({"_id": EMPLOYEE_ID_COUNTER}, {"$max": {"seq": highest}}, upsert=True)
+        logging.info(f"✅ Employee ID counter seeded at {highest}")
+
+    async def allocate_employee_ids(self, count: int = 1) -> List[str]:
+        """
+        Atomically reserve a block of `count` employee IDs with one round trip.
+        IDs are never reused, even after an employee is deleted.
+        """
+        if not self.is_connected():
+            raise Exception("Database not connected")
+        if count < 1:
+            raise ValueError("count must be at least 1")
+
+        counter = self.db[COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": EMPLOYEE_ID_COUNTER},
+            {"$inc": {"seq": count}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        last = counter["seq"]
+        return [f"{EMPLOYEE_ID_PREFIX}{seq:03d}" for seq in range(last - count + 1, last + 1)]
+
+    async def allocate_employee_id(self) -> str:
+        """Atomically allocate the next employee ID"""
+        return (await self.allocate_employee_ids(1))[0]
+
     async def get_employee(self, employee_id: str) -> Optional[Dict[str, Any]]:
         """Get employee by ID"""
         try:
@@ -209,6 +321,11 @@ class DatabaseManager:
                 {"employee_id": employee_id},
                 {"$set": update_data}
             )
+            if "name" in update_data:
+                self.db[FACE_EMBEDDINGS_COLLECTION].update_many(
+                    {"employee_id": employee_id},
+                    {"$set": {"name": update_data["name"]}}
+                )
             return result.modified_count > 0
         except Exception as e:
             logging.error(f"❌ Error updating employee: {e}")
@@ -226,8 +343,9 @@ class DatabaseManager:
                 # Delete face image from GridFS
                 await self.delete_face_image(employee["face_image_id"])
             
-            # Delete employee record
+            # Delete employee record and stored embeddings
             result = self.db[EMPLOYEES_COLLECTION].delete_one({"employee_id": employee_id})
+            self.delete_face_embeddings(employee_id)
             
             if result.deleted_count > 0:
                 logging.info(f"✅ Employee deleted: {employee_id}")
@@ -268,6 +386,10 @@ class DatabaseManager:
 
     async def get_face_image(self, image_id: str) -> Optional[bytes]:
         """Retrieve face image from GridFS"""
+        return self.read_face_image(image_id)
+
+    def read_face_image(self, image_id: str) -> Optional[bytes]:
+        """Blocking GridFS read behind get_face_image; call from a worker thread"""
         try:
             if not self.is_connected():
                 return None
@@ -300,6 +422,9 @@ class DatabaseManager:
             employees = await self.get_all_employees()
             
             for employee in employees:
+                # Synthetic scale-test employees only have placeholder images
+                if employee.get("synthetic"):
+                    continue
                 if employee.get("face_image_id") and employee.get("face_enrolled"):
                     image_data = await self.get_face_image(employee["face_image_id"])
                     if image_data:
@@ -315,36 +440,223 @@ class DatabaseManager:
             logging.error(f"❌ Error getting face images: {e}")
             return []
 
-    # Attendance Image Operations
-    async def store_attendance_image(self, employee_id: str, attendance_type: str, image_data: str) -> str:
-        """Store attendance captured image in GridFS"""
+    # Bulk Employee Operations (blocking; used by the synthetic gallery generator)
+    def insert_employees(self, employees: List[Dict[str, Any]]) -> int:
+        """Insert many employee documents in one unordered batch; returns how many were inserted"""
+        now = get_local_now()
+        for employee in employees:
+            employee.setdefault("created_at", now)
+            employee.setdefault("updated_at", now)
         try:
-            if not self.is_connected():
-                raise Exception("Database not connected")
+            return len(self.db[EMPLOYEES_COLLECTION].insert_many(employees, ordered=False).inserted_ids)
+        except BulkWriteError as e:
+            return e.details.get("nInserted", 0)
 
-            # Decode base64 image
-            if image_data.startswith('data:image'):
-                image_data = image_data.split(',')[1]
-            
-            image_bytes = base64.b64decode(image_data)
-            
-            # Store in GridFS with attendance-specific metadata
-            file_id = self.fs.put(
-                image_bytes,
-                filename=f"{employee_id}_{attendance_type}_{get_local_now().strftime('%Y%m%d_%H%M%S')}.jpg",
-                employee_id=employee_id,
-                attendance_type=attendance_type,
-                content_type="image/jpeg",
-                upload_date=get_local_now(),
-                image_type="attendance"
+    def put_face_image(self, employee_id: str, image_bytes: bytes, **metadata) -> ObjectId:
+        """Store raw face image bytes in GridFS and return the file id"""
+        return self.fs.put(
+            image_bytes,
+            filename=f"{employee_id}_face.jpg",
+            employee_id=employee_id,
+            content_type="image/jpeg",
+            upload_date=get_local_now(),
+            **metadata
+        )
+
+    def purge_synthetic_employees(self, batch_size: int = 5000, publish_changes: bool = False) -> Dict[str, int]:
+        """
+        Delete employees created by the synthetic gallery generator, with their embeddings and images.
+        Per-employee gallery deletes are logged only with publish_changes; otherwise the gallery
+        version is bumped once so running workers reload
+        """
+        result = {"employees": 0, "embeddings": 0, "images": 0}
+        while True:
+            batch = list(self.db[EMPLOYEES_COLLECTION].find(
+                {"synthetic": True}, {"_id": 0, "employee_id": 1, "face_image_id": 1}
+            ).limit(batch_size))
+            if not batch:
+                if result["employees"] and not publish_changes:
+                    self.bump_gallery_version()
+                return result
+            employee_ids = [employee["employee_id"] for employee in batch]
+            for employee in batch:
+                if employee.get("face_image_id"):
+                    self.fs.delete(employee["face_image_id"])
+                    result["images"] += 1
+            result["embeddings"] += self.db[FACE_EMBEDDINGS_COLLECTION].delete_many({"employee_id": {"$in": employee_ids}}).deleted_count
+            result["employees"] += self.db[EMPLOYEES_COLLECTION].delete_many({"employee_id": {"$in": employee_ids}}).deleted_count
+            if publish_changes:
+                self.record_gallery_changes("delete", employee_ids)
+
+    # Face Embedding Operations (blocking; call from a worker thread on hot paths)
+    def store_face_embedding(self, employee_id: str, name: str, model_name: str, embedding: List[float]):
+        """Store or replace an employee's face embedding for one model"""
+        self.db[FACE_EMBEDDINGS_COLLECTION].update_one(
+            {"model_name": model_name, "employee_id": employee_id},
+            {"$set": {
+                "name": name,
+                "embedding": [float(value) for value in embedding],
+                "dimension": len(embedding),
+                "updated_at": get_local_now()
+            }},
+            upsert=True
+        )
+
+    def store_face_embeddings(self, model_name: str, entries: List[Dict[str, Any]]) -> int:
+        """Bulk store_face_embedding for entries of {employee_id, name, embedding}"""
+        if not entries:
+            return 0
+        now = get_local_now()
+        result = self.db[FACE_EMBEDDINGS_COLLECTION].bulk_write([
+            UpdateOne(
+                {"model_name": model_name, "employee_id": entry["employee_id"]},
+                {"$set": {
+                    "name": entry.get("name"),
+                    "embedding": [float(value) for value in entry["embedding"]],
+                    "dimension": len(entry["embedding"]),
+                    "updated_at": now
+                }},
+                upsert=True
             )
-            
-            logging.info(f"✅ Attendance image stored for employee: {employee_id} ({attendance_type})")
-            return str(file_id)
-            
-        except Exception as e:
-            logging.error(f"❌ Error storing attendance image: {e}")
-            raise
+            for entry in entries
+        ], ordered=False)
+        return result.upserted_count + result.modified_count
+
+    def get_face_embeddings(self, model_name: str, employee_ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Get stored embeddings for a model, optionally only for some employees"""
+        query: Dict[str, Any] = {"model_name": model_name}
+        if employee_ids is not None:
+            query["employee_id"] = {"$in": employee_ids}
+        projection = {"_id": 0, "employee_id": 1, "name": 1, "embedding": 1}
+        return list(self.db[FACE_EMBEDDINGS_COLLECTION].find(query, projection))
+
+    def get_employees_missing_embeddings(self, model_name: str, known_ids: Optional[set] = None) -> List[Dict[str, Any]]:
+        """
+        Enrolled employees with a stored face image but no embedding for the model,
+        as {employee_id, name, face_image_id}; the images themselves are not read
+        """
+        if known_ids is None:
+            known_ids = set(self.db[FACE_EMBEDDINGS_COLLECTION].distinct("employee_id", {"model_name": model_name}))
+        employees = self.db[EMPLOYEES_COLLECTION].find(
+            # Synthetic scale-test employees only have placeholder images
+            {"face_enrolled": True, "face_image_id": {"$nin": [None, ""]}, "synthetic": {"$ne": True}},
+            {"_id": 0, "employee_id": 1, "name": 1, "face_image_id": 1}
+        )
+        return [
+            {**employee, "face_image_id": str(employee["face_image_id"])}
+            for employee in employees if employee["employee_id"] not in known_ids
+        ]
+
+    def delete_face_embeddings(self, employee_id: str) -> int:
+        """Delete an employee's embeddings for every model"""
+        return self.db[FACE_EMBEDDINGS_COLLECTION].delete_many({"employee_id": employee_id}).deleted_count
+
+    # Cluster State Operations (blocking)
+    def get_cluster_config(self) -> Optional[Dict[str, Any]]:
+        """Get the cluster-wide config document: {version, config}"""
+        return self.db[CLUSTER_STATE_COLLECTION].find_one({"_id": CLUSTER_CONFIG_ID}, {"_id": 0, "version": 1, "config": 1})
+
+    def get_cluster_config_version(self) -> int:
+        state = self.db[CLUSTER_STATE_COLLECTION].find_one({"_id": CLUSTER_CONFIG_ID}, {"_id": 0, "version": 1})
+        return state["version"] if state else 0
+
+    def publish_cluster_config(self, config: Dict[str, Any]) -> int:
+        """Store a new cluster-wide config and return its version"""
+        state = self.db[CLUSTER_STATE_COLLECTION].find_one_and_update(
+            {"_id": CLUSTER_CONFIG_ID},
+            {"$set": {"config": config, "updated_at": get_local_now()}, "$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return state["version"]
+
+    def get_database_id(self) -> str:
+        """
+        Random id created the first time a worker asks for it. Gallery snapshots carry it,
+        so a file written against a dropped or different database is not mapped
+        """
+        state = self.db[CLUSTER_STATE_COLLECTION].find_one_and_update(
+            {"_id": CLUSTER_IDENTITY_ID},
+            {"$setOnInsert": {"database_id": uuid.uuid4().hex, "created_at": get_local_now()}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return state["database_id"]
+
+    def get_gallery_version(self) -> int:
+        """Current cluster gallery sequence number"""
+        counter = self.db[COUNTERS_COLLECTION].find_one({"_id": GALLERY_SEQ_COUNTER})
+        return counter["seq"] if counter else 0
+
+    def record_gallery_change(self, op: str, employee_id: str) -> int:
+        """Append an 'upsert' or 'delete' gallery change and return its sequence number"""
+        return self.record_gallery_changes(op, [employee_id])
+
+    def record_gallery_changes(self, op: str, employee_ids: List[str]) -> int:
+        """Append one change per employee under a single counter bump; returns the last sequence number"""
+        counter = self.db[COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": GALLERY_SEQ_COUNTER},
+            {"$inc": {"seq": len(employee_ids)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        first_seq = counter["seq"] - len(employee_ids) + 1
+        now = datetime.now(timezone.utc)
+        self.db[GALLERY_CHANGES_COLLECTION].insert_many([
+            {"seq": first_seq + i, "op": op, "employee_id": employee_id, "at": now}
+            for i, employee_id in enumerate(employee_ids)
+        ])
+        return counter["seq"]
+
+    def bump_gallery_version(self) -> int:
+        """
+        Advance the gallery sequence without logging a change. Workers see a gap and
+        do one full reload (and no snapshot matches it), instead of applying per-row deltas
+        """
+        counter = self.db[COUNTERS_COLLECTION].find_one_and_update(
+            {"_id": GALLERY_SEQ_COUNTER},
+            {"$inc": {"seq": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return counter["seq"]
+
+    def get_gallery_changes(self, after_seq: int, limit: int = 1000) -> List[Dict[str, Any]]:
+        """Gallery changes with seq > after_seq, oldest first"""
+        return list(
+            self.db[GALLERY_CHANGES_COLLECTION]
+            .find({"seq": {"$gt": after_seq}}, {"_id": 0, "seq": 1, "op": 1, "employee_id": 1})
+            .sort("seq", 1)
+            .limit(limit)
+        )
+
+    # Attendance Image Operations
+    def put_attendance_image(self, employee_id: str, attendance_type: str, image_bytes: bytes) -> str:
+        """Store raw attendance image bytes in GridFS (blocking; used by the image queue workers)"""
+        if not self.is_connected():
+            raise Exception("Database not connected")
+
+        # Store in GridFS with attendance-specific metadata
+        file_id = self.fs.put(
+            image_bytes,
+            filename=f"{employee_id}_{attendance_type}_{get_local_now().strftime('%Y%m%d_%H%M%S')}.jpg",
+            employee_id=employee_id,
+            attendance_type=attendance_type,
+            content_type="image/jpeg",
+            upload_date=get_local_now(),
+            image_type="attendance"
+        )
+        
+        logging.info(f"✅ Attendance image stored for employee: {employee_id} ({attendance_type})")
+        return str(file_id)
+
+    def set_attendance_image(self, attendance_id: str, image_id: str) -> bool:
+        """Attach a stored image to an attendance record (blocking; used by the image queue workers)"""
+        result = self.db[ATTENDANCE_COLLECTION].update_one(
+            {"attendance_id": attendance_id},
+            {"$set": {"image_id": image_id}}
+        )
+        return result.matched_count > 0
 
     async def get_attendance_image(self, image_id: str) -> Optional[bytes]:
         """Retrieve attendance image from GridFS"""
@@ -374,17 +686,25 @@ class DatabaseManager:
 
     # Attendance Operations
     async def create_attendance(self, attendance_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create attendance record"""
+        """
+        Create attendance record.
+        Goes through the group-commit write buffer when it is running; either way
+        the result is built from the inserted document rather than read back.
+        """
         try:
             if not self.is_connected():
                 raise Exception("Database not connected")
 
             attendance_data["created_at"] = get_local_now()
-            result = self.db[ATTENDANCE_COLLECTION].insert_one(attendance_data)
+            if self.attendance_writer.running:
+                await self.attendance_writer.submit(attendance_data)
+            else:
+                failures = self.write_attendance_batch([attendance_data])
+                if failures:
+                    raise failures[0]
             
-            # Retrieve and return the created record
-            attendance = self.db[ATTENDANCE_COLLECTION].find_one({"_id": result.inserted_id})
-            attendance["_id"] = str(attendance["_id"])
+            attendance = {**attendance_data, "_id": str(attendance_data["_id"])}
+            self.presence.record(attendance_data)
             
             logging.info(f"✅ Attendance recorded: {attendance_data['employee_name']} - {attendance_data['type']}")
             return attendance
@@ -393,43 +713,281 @@ class DatabaseManager:
             logging.error(f"❌ Error creating attendance: {e}")
             raise
 
+    def write_attendance_batch(self, documents: List[Dict[str, Any]]) -> Dict[int, Exception]:
+        """
+        Insert a batch of attendance records with one insert_many and fold them into
+        the daily summaries with one bulk write. Runs in a worker thread.
+        Returns {index: exception} for documents that were not inserted.
+        """
+        failures: Dict[int, Exception] = {}
+        try:
+            self.db[ATTENDANCE_COLLECTION].insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            for error in e.details.get("writeErrors", []):
+                failures[error["index"]] = Exception(error.get("errmsg", "Attendance insert failed"))
+
+        inserted = [document for index, document in enumerate(documents) if index not in failures]
+
+        # Keep the daily summaries in step; the raw records stay the source of truth
+        partials = summarize_attendance(inserted)
+        try:
+            operations = [UpdateOne(*build_summary_update(partial), upsert=True) for partial in partials]
+            if operations:
+                self.db[ATTENDANCE_SUMMARY_COLLECTION].bulk_write(operations, ordered=False)
+        except Exception as e:
+            # Some merges may have applied, so the days are rebuilt rather than the merges retried
+            self.summary_metrics["update_failures"] += 1
+            logging.error(f"❌ Error updating attendance summary: {e}; rebuilding {len(partials)} day(s) from raw records")
+            with self._summary_repairs_lock:
+                self._summary_repairs.update((partial["employee_id"], partial["date"]) for partial in partials)
+
+        if self._summary_repairs:
+            self.repair_attendance_summaries()
+        return failures
+
+    def repair_attendance_summaries(self) -> int:
+        """
+        Rebuild the queued (employee_id, date) summaries from raw records. Days that
+        still fail stay queued and are retried after the next attendance write.
+        """
+        with self._summary_repairs_lock:
+            days = sorted(self._summary_repairs)
+        repaired = 0
+        for employee_id, date in days:
+            try:
+                self.rebuild_attendance_summary_day(employee_id, date)
+            except Exception as e:
+                self.summary_metrics["repair_failures"] += 1
+                logging.error(f"❌ Error rebuilding attendance summary for {employee_id} on {date}: {e}")
+                break
+            with self._summary_repairs_lock:
+                self._summary_repairs.discard((employee_id, date))
+            repaired += 1
+        self.summary_metrics["days_repaired"] += repaired
+        return repaired
+
+    def rebuild_attendance_summary_day(self, employee_id: str, date: str):
+        """Replace one employee's summary for a local date with one folded from the raw records"""
+        query = {
+            "employee_id": employee_id,
+            "timestamp": {"$gte": parse_local_datetime(date), "$lt": parse_local_datetime(date, end_of_day=True)},
+        }
+        projection = {"_id": 0, "attendance_id": 1, "employee_id": 1, "employee_name": 1, "type": 1, "timestamp": 1, "confidence": 1}
+        records = list(self.db[ATTENDANCE_COLLECTION].find(query, projection))
+        summaries = self.db[ATTENDANCE_SUMMARY_COLLECTION]
+        summaries.delete_one({"employee_id": employee_id, "date": date})
+        for partial in summarize_attendance(records):
+            summaries.update_one(*build_summary_update(partial), upsert=True)
+
+    def summary_stats(self) -> Dict[str, Any]:
+        return {**self.summary_metrics, "days_pending_repair": len(self._summary_repairs)}
+
     async def get_attendance_history(self, limit: int = 50, employee_id: Optional[str] = None) -> List[Dict[str, Any]]:
-        """Get attendance history"""
+        """Get the most recent attendance records (first page of get_attendance_page)"""
+        records, _ = await self.get_attendance_page(limit=limit, employee_id=employee_id)
+        return records
+
+    async def get_attendance_page(
+        self,
+        limit: int = 50,
+        cursor: Optional[str] = None,
+        employee_id: Optional[str] = None,
+        attendance_type: Optional[str] = None,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get one page of attendance history using keyset pagination.
+
+        Records are ordered by (timestamp, _id) descending so the cursor of the
+        last record on a page identifies exactly where the next page starts;
+        each page is a bounded index range scan regardless of how deep it is.
+        Returns the records and the cursor for the next page (None at the end).
+        Raises ValueError if the cursor is malformed.
+        """
+        if not self.is_connected():
+            return [], None
+
+        limit = max(1, min(limit, MAX_ATTENDANCE_PAGE_SIZE))
+
+        query: Dict[str, Any] = {}
+        if employee_id:
+            query["employee_id"] = employee_id
+        if attendance_type:
+            query["type"] = attendance_type
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
+
+        if cursor:
+            cursor_timestamp, cursor_id = decode_attendance_cursor(cursor)
+            keyset = {"$or": [
+                {"timestamp": {"$lt": cursor_timestamp}},
+                {"timestamp": cursor_timestamp, "_id": {"$lt": cursor_id}},
+            ]}
+            query = {"$and": [query, keyset]} if query else keyset
+
+        try:
+            # Fetch one extra record to know whether another page exists
+            records = list(
+                self.db[ATTENDANCE_COLLECTION]
+                .find(query, ATTENDANCE_LIST_PROJECTION)
+                .sort([("timestamp", -1), ("_id", -1)])
+                .limit(limit + 1)
+            )
+        except Exception as e:
+            logging.error(f"❌ Error getting attendance page: {e}")
+            return [], None
+
+        next_cursor = None
+        if len(records) > limit:
+            records = records[:limit]
+            last = records[-1]
+            next_cursor = encode_attendance_cursor(last["timestamp"], last["_id"])
+
+        for record in records:
+            record["_id"] = str(record["_id"])
+
+        return records, next_cursor
+
+    # Daily Attendance Summary Operations
+    async def get_attendance_summaries(self, start_date: str, end_date: str) -> List[Dict[str, Any]]:
+        """Get daily summaries for all employees between two local dates (YYYY-MM-DD, inclusive)"""
         try:
             if not self.is_connected():
                 return []
 
-            query = {}
-            if employee_id:
-                query["employee_id"] = employee_id
-                
-            attendance = list(
-                self.db[ATTENDANCE_COLLECTION]
-                .find(query)
-                .sort("timestamp", -1)
-                .limit(limit)
+            summaries = list(
+                self.db[ATTENDANCE_SUMMARY_COLLECTION]
+                .find({"date": {"$gte": start_date, "$lte": end_date}}, {"_id": 0})
+                .sort([("date", 1), ("employee_id", 1)])
             )
-            
-            for record in attendance:
-                record["_id"] = str(record["_id"])
-                
-            return attendance
+            return summaries
         except Exception as e:
-            logging.error(f"❌ Error getting attendance history: {e}")
+            logging.error(f"❌ Error getting attendance summaries: {e}")
             return []
 
+    async def refresh_presence(self) -> int:
+        """Reload the presence table without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.load_presence)
+
+    def load_presence(self) -> int:
+        """
+        (Re)load today's presence table from the daily summaries with one indexed
+        query. Also picks up attendance written by other workers. Blocking.
+        """
+        if not self.is_connected():
+            return 0
+
+        projection = {
+            "_id": 0, "employee_id": 1, "employee_name": 1,
+            "last_event_type": 1, "last_event_at": 1, "last_attendance_id": 1, "last_confidence": 1
+        }
+        summaries = list(self.db[ATTENDANCE_SUMMARY_COLLECTION].find({"date": local_date_key(get_local_now())}, projection))
+        self.presence.merge(
+            {
+                "employee_id": summary["employee_id"],
+                "employee_name": summary.get("employee_name"),
+                "last_event_type": summary["last_event_type"],
+                "last_event_at": summary["last_event_at"],
+                "attendance_id": summary.get("last_attendance_id"),
+                "confidence": summary.get("last_confidence"),
+            }
+            for summary in summaries
+            if summary.get("last_event_at") and summary.get("last_event_type")
+        )
+        return len(summaries)
+
+    def rebuild_attendance_summaries(
+        self,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None,
+        batch_size: int = 1000
+    ) -> Dict[str, int]:
+        """
+        Regenerate daily summaries from raw attendance history.
+
+        Summaries for the local dates covered by [start, end) are dropped, then raw
+        records are streamed in timestamp order and folded into summaries one batch
+        at a time, so memory stays bounded by batch_size regardless of history size.
+        """
+        if not self.is_connected():
+            raise Exception("Database not connected")
+
+        query: Dict[str, Any] = {}
+        if start or end:
+            query["timestamp"] = {}
+            if start:
+                query["timestamp"]["$gte"] = start
+            if end:
+                query["timestamp"]["$lt"] = end
+
+        summary_filter: Dict[str, Any] = {}
+        if start or end:
+            summary_filter["date"] = {}
+            if start:
+                summary_filter["date"]["$gte"] = local_date_key(start)
+            if end:
+                summary_filter["date"]["$lt"] = local_date_key(end)
+        deleted = self.db[ATTENDANCE_SUMMARY_COLLECTION].delete_many(summary_filter).deleted_count
+
+        projection = {"_id": 0, "attendance_id": 1, "employee_id": 1, "employee_name": 1, "type": 1, "timestamp": 1, "confidence": 1}
+        cursor = (
+            self.db[ATTENDANCE_COLLECTION]
+            .find(query, projection)
+            .sort([("timestamp", 1), ("_id", 1)])
+            .batch_size(batch_size)
+        )
+
+        processed = 0
+        upserted = 0
+        batch: List[Dict[str, Any]] = []
+
+        def flush():
+            operations = [
+                UpdateOne(*build_summary_update(partial), upsert=True)
+                for partial in summarize_attendance(batch)
+            ]
+            if operations:
+                self.db[ATTENDANCE_SUMMARY_COLLECTION].bulk_write(operations, ordered=False)
+            batch.clear()
+            return len(operations)
+
+        for record in cursor:
+            batch.append(record)
+            processed += 1
+            if len(batch) >= batch_size:
+                upserted += flush()
+        upserted += flush()
+
+        logging.info(f"✅ Attendance summaries rebuilt: {processed} records, {upserted} summary upserts")
+        return {"records_processed": processed, "summary_upserts": upserted, "summaries_deleted": deleted}
+
     # Database Statistics
     async def get_stats(self) -> Dict[str, Any]:
-        """Get database statistics"""
+        """Get database statistics without blocking the event loop"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._collect_stats)
+
+    async def get_cached_stats(self) -> Dict[str, Any]:
+        """Get database statistics from the in-process cache (see StatsCache)"""
+        return await self.stats_cache.get()
+
+    def _collect_stats(self) -> Dict[str, Any]:
+        """Query database statistics; runs in a worker thread"""
         try:
             if not self.is_connected():
                 return {"connected": False}
 
-            total_employees = self.db[EMPLOYEES_COLLECTION].count_documents({})
+            # Collection totals come from metadata instead of a full count
+            total_employees = self.db[EMPLOYEES_COLLECTION].estimated_document_count()
+            total_attendance = self.db[ATTENDANCE_COLLECTION].estimated_document_count()
             enrolled_employees = self.db[EMPLOYEES_COLLECTION].count_documents({"face_enrolled": True})
-            total_attendance = self.db[ATTENDANCE_COLLECTION].count_documents({})
             
-            # Today's attendance
+            # Today's attendance (range count on the timestamp index)
             today_start = get_local_date_start()
             today_attendance = self.db[ATTENDANCE_COLLECTION].count_documents({
                 "timestamp": {"$gte": today_start}
@@ -448,6 +1006,154 @@ class DatabaseManager:
             logging.error(f"❌ Error getting stats: {e}")
             return {"connected": False, "error": str(e)}
 
+class StatsCache:
+    """
+    Small in-process cache with stale-while-revalidate refresh.
+
+    Fresh values (younger than ttl) are returned as-is. Stale values (younger
+    than stale_ttl) are returned immediately while a single background refresh
+    runs. Anything older, or an empty cache, waits for a refresh; concurrent
+    callers share one in-flight refresh.
+    """
+
+    def __init__(self, loader, ttl: float = STATS_CACHE_TTL, stale_ttl: float = STATS_STALE_TTL):
+        self.loader = loader
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self.value: Optional[Dict[str, Any]] = None
+        self.updated_at = 0.0
+        self._refresh_task: Optional[asyncio.Task] = None
+
+    async def get(self) -> Dict[str, Any]:
+        age = time.monotonic() - self.updated_at
+        if self.value is not None and age < self.ttl:
+            return self._with_age(age)
+
+        task = self._start_refresh()
+        if self.value is not None and age < self.stale_ttl:
+            return self._with_age(age)
+
+        await asyncio.shield(task)
+        return self._with_age(time.monotonic() - self.updated_at)
+
+    def invalidate(self):
+        """Force the next call to refresh"""
+        self.updated_at = 0.0
+
+    def _start_refresh(self) -> asyncio.Task:
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh())
+        return self._refresh_task
+
+    async def _refresh(self):
+        try:
+            self.value = await self.loader()
+            self.updated_at = time.monotonic()
+        except Exception as e:
+            logging.error(f"❌ Error refreshing stats cache: {e}")
+            if self.value is None:
+                self.value = {"connected": False, "error": str(e)}
+                self.updated_at = time.monotonic()
+
+    def _with_age(self, age: float) -> Dict[str, Any]:
+        return {**self.value, "cache_age_seconds": round(age, 1)}
+
+def encode_attendance_cursor(timestamp: datetime, object_id: ObjectId) -> str:
+    """Encode an attendance (timestamp, _id) position as an opaque cursor"""
+    payload = json.dumps({"t": timestamp.isoformat(), "id": str(object_id)}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_attendance_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """Decode a cursor produced by encode_attendance_cursor"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+        return datetime.fromisoformat(payload["t"]), ObjectId(payload["id"])
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+def local_date_key(timestamp: datetime) -> str:
+    """Local calendar date (YYYY-MM-DD) of a timestamp; naive values are treated as UTC"""
+    return convert_utc_to_local(timestamp).strftime("%Y-%m-%d")
+
+def summarize_attendance(records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Fold attendance records into partial daily summaries keyed by (employee_id, date)"""
+    partials: Dict[Tuple[str, str], Dict[str, Any]] = {}
+    for record in records:
+        date = local_date_key(record["timestamp"])
+        key = (record["employee_id"], date)
+        partial = partials.setdefault(key, {
+            "employee_id": record["employee_id"],
+            "employee_name": record["employee_name"],
+            "date": date,
+            "first_check_in": None,
+            "last_check_out": None,
+            "check_in_count": 0,
+            "check_out_count": 0,
+            "last_event_type": None,
+            "last_event_at": None,
+            "last_attendance_id": None,
+            "last_confidence": None,
+        })
+        timestamp = record["timestamp"]
+        if record["type"] == "check-in":
+            partial["check_in_count"] += 1
+            if partial["first_check_in"] is None or timestamp < partial["first_check_in"]:
+                partial["first_check_in"] = timestamp
+        elif record["type"] == "check-out":
+            partial["check_out_count"] += 1
+            if partial["last_check_out"] is None or timestamp > partial["last_check_out"]:
+                partial["last_check_out"] = timestamp
+        if partial["last_event_at"] is None or timestamp >= partial["last_event_at"]:
+            partial["last_event_at"] = timestamp
+            partial["last_event_type"] = record["type"]
+            partial["last_attendance_id"] = record.get("attendance_id")
+            partial["last_confidence"] = record.get("confidence")
+            partial["employee_name"] = record["employee_name"]
+    return list(partials.values())
+
+def build_summary_update(partial: Dict[str, Any]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """
+    Build the (filter, pipeline update) that merges a partial summary into its
+    daily summary document in a single atomic upsert.
+    """
+    def merge_time(field: str, value: Optional[datetime], newest: bool) -> Any:
+        if value is None:
+            return f"${field}"
+        operator = "$max" if newest else "$min"
+        return {"$ifNull": [{operator: [f"${field}", value]}, value]}
+
+    is_newer = {"$gte": [partial["last_event_at"], {"$ifNull": ["$last_event_at", partial["last_event_at"]]}]}
+    has_check_in = {"$ne": [{"$ifNull": ["$first_check_in", None]}, None]}
+    has_check_out = {"$ne": [{"$ifNull": ["$last_check_out", None]}, None]}
+
+    update = [
+        {"$set": {
+            "employee_id": {"$literal": partial["employee_id"]},
+            "date": partial["date"],
+            "employee_name": {"$cond": [is_newer, {"$literal": partial["employee_name"]}, "$employee_name"]},
+            "first_check_in": merge_time("first_check_in", partial["first_check_in"], newest=False),
+            "last_check_out": merge_time("last_check_out", partial["last_check_out"], newest=True),
+            "check_in_count": {"$add": [{"$ifNull": ["$check_in_count", 0]}, partial["check_in_count"]]},
+            "check_out_count": {"$add": [{"$ifNull": ["$check_out_count", 0]}, partial["check_out_count"]]},
+            "last_event_type": {"$cond": [is_newer, {"$literal": partial["last_event_type"]}, "$last_event_type"]},
+            "last_event_at": {"$cond": [is_newer, partial["last_event_at"], "$last_event_at"]},
+            "last_attendance_id": {"$cond": [is_newer, {"$literal": partial["last_attendance_id"]}, "$last_attendance_id"]},
+            "last_confidence": {"$cond": [is_newer, {"$literal": partial["last_confidence"]}, "$last_confidence"]},
+            "updated_at": get_local_now(),
+        }},
+        {"$set": {
+            "status": {"$switch": {
+                "branches": [
+                    {"case": {"$and": [has_check_in, has_check_out]}, "then": "completed"},
+                    {"case": has_check_in, "then": "present"},
+                ],
+                "default": "checked_out_only",
+            }},
+        }},
+    ]
+    return {"employee_id": partial["employee_id"], "date": partial["date"]}, update
+
 # Global database instance
 db_manager = DatabaseManager()
 
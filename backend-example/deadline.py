@@ -0,0 +1,100 @@
+"""
+Request deadlines for the recognition pipeline
+Stop working on a request once its client has given up (timed out or disconnected)
+"""
+
+import os
+import time
+import asyncio
+from collections import Counter
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# Budget when the client sends none, and the most a client may ask for
+RECOGNITION_DEADLINE_SECONDS = float(os.getenv("RECOGNITION_DEADLINE_SECONDS", "15"))
+RECOGNITION_MAX_DEADLINE_SECONDS = float(os.getenv("RECOGNITION_MAX_DEADLINE_SECONDS", "60"))
+# Client budget in milliseconds, measured from when the request arrives
+DEADLINE_HEADER = "X-Request-Timeout-Ms"
+# How often a running stage checks whether the client went away
+DISCONNECT_POLL_SECONDS = 0.25
+
+class DeadlineExceeded(Exception):
+    """The request's deadline passed (reason "deadline") or its client disconnected ("disconnected")"""
+
+    def __init__(self, stage: str, reason: str):
+        super().__init__(f"{'client disconnected' if reason == 'disconnected' else 'deadline passed'} during {stage}")
+        self.stage = stage
+        self.reason = reason
+
+class DeadlineMetrics:
+    """Per-stage counts of requests dropped for each reason"""
+
+    def __init__(self):
+        self.completed = 0
+        self.dropped: Dict[str, Counter] = {"deadline": Counter(), "disconnected": Counter()}
+
+    def record_drop(self, error: DeadlineExceeded):
+        self.dropped[error.reason][error.stage] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "default_seconds": RECOGNITION_DEADLINE_SECONDS,
+            "completed": self.completed,
+            "dropped": {reason: dict(stages) for reason, stages in self.dropped.items()},
+            "dropped_total": sum(sum(stages.values()) for stages in self.dropped.values()),
+        }
+
+class Deadline:
+    """
+    A monotonic deadline plus an optional is_disconnected() probe.
+
+    check(stage) raises DeadlineExceeded between stages; guard(awaitable, stage)
+    also interrupts a stage that is still waiting (queued in the inference pool
+    or for the database). A stage already running on a thread cannot be
+    stopped, but its result is dropped and no later stage runs.
+    """
+
+    def __init__(self, seconds: float, is_disconnected: Optional[Callable[[], Awaitable[bool]]] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self.is_disconnected = is_disconnected
+
+    @classmethod
+    def from_header(cls, value: Optional[str], is_disconnected=None) -> "Deadline":
+        seconds = RECOGNITION_DEADLINE_SECONDS
+        if value:
+            try:
+                seconds = max(0.0, min(float(value) / 1000, RECOGNITION_MAX_DEADLINE_SECONDS))
+            except ValueError:
+                pass
+        return cls(seconds, is_disconnected)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    async def check(self, stage: str):
+        if self.remaining() <= 0:
+            raise DeadlineExceeded(stage, "deadline")
+        if self.is_disconnected is not None and await self.is_disconnected():
+            raise DeadlineExceeded(stage, "disconnected")
+
+    async def guard(self, awaitable: Awaitable, stage: str, undo: Optional[Callable[[Any], None]] = None):
+        """
+        Await `awaitable` unless the deadline passes or the client leaves first,
+        in which case it is cancelled. If it completed just as we gave up,
+        undo(result) is called so acquired resources are handed back.
+        """
+        await self.check(stage)
+        task = asyncio.ensure_future(awaitable)
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=min(self.remaining(), DISCONNECT_POLL_SECONDS))
+                if done:
+                    return task.result()
+                await self.check(stage)
+        except BaseException:
+            if task.done() and not task.cancelled() and task.exception() is None:
+                if undo is not None:
+                    undo(task.result())
+            else:
+                task.cancel()
+            raise
@@ -175,6 +175,7 @@ User=$USER
 Group=$USER
 WorkingDirectory=$(pwd)
 Environment=PATH=$(pwd)/venv/bin
+Environment=CPU_WORKER_PROCESSES=4
 ExecStart=$(pwd)/venv/bin/gunicorn main:app -w 4 -k uvicorn.workers.UvicornWorker -b 0.0.0.0:8000
 ExecReload=/bin/kill -s HUP \$MAINPID
 KillMode=mixed
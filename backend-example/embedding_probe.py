@@ -0,0 +1,82 @@
+"""
+Client-computed probe embeddings for ITScence
+Kiosks on slow uplinks run the embedding model on the device and send the
+vector instead of a JPEG; this module decodes and validates those probes
+"""
+
+import os
+import base64
+import binascii
+from importlib import metadata
+from typing import List, Optional
+
+import numpy as np
+
+# Probes accepted in one /api/recognize-embeddings call
+EMBEDDING_MAX_PROBES = int(os.getenv("EMBEDDING_MAX_PROBES", "32"))
+# Headers carrying the model tag when the body is raw float32
+EMBEDDING_MODEL_HEADER = "X-Embedding-Model"
+EMBEDDING_MODEL_VERSION_HEADER = "X-Embedding-Model-Version"
+
+def installed_deepface_version() -> str:
+    try:
+        return metadata.version("deepface")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+# Version tag of the embedding pipeline the gallery is built with; client
+# vectors must carry the same tag to be comparable with the gallery
+EMBEDDING_MODEL_VERSION = os.getenv("EMBEDDING_MODEL_VERSION") or f"deepface-{installed_deepface_version()}"
+
+class ProbeError(ValueError):
+    """A probe request that cannot be matched; status_code is the HTTP status to answer with"""
+
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+def check_model_tag(model_name: Optional[str], model_version: Optional[str], expected_name: str, expected_version: str = EMBEDDING_MODEL_VERSION):
+    """Probes from another model (or model version) than the gallery's are rejected with 409"""
+    if not model_name or not model_version:
+        raise ProbeError("Probe must be tagged with model_name and model_version")
+    if model_name != expected_name or model_version != expected_version:
+        raise ProbeError(
+            f"Probe is from {model_name} ({model_version}); the gallery uses {expected_name} ({expected_version})",
+            status_code=409
+        )
+
+def _check_probes(probes: np.ndarray, max_probes: int) -> np.ndarray:
+    if len(probes) == 0:
+        raise ProbeError("No probe embeddings in request")
+    if len(probes) > max_probes:
+        raise ProbeError(f"At most {max_probes} probe embeddings per request")
+    if not np.isfinite(probes).all():
+        raise ProbeError("Probe embeddings must be finite")
+    return probes
+
+def decode_raw_probes(data: bytes, dimension: int, max_probes: int = EMBEDDING_MAX_PROBES) -> np.ndarray:
+    """Little-endian float32 vectors back to back; the count follows from the body length"""
+    row_bytes = dimension * 4
+    if dimension <= 0 or len(data) % row_bytes:
+        raise ProbeError(f"Body must be a whole number of {dimension}-dimension float32 vectors ({row_bytes} bytes each)")
+    probes = np.frombuffer(data, dtype="<f4").reshape(-1, dimension)
+    return _check_probes(probes, max_probes)
+
+def decode_base64_probes(values: List[str], dimension: int, max_probes: int = EMBEDDING_MAX_PROBES) -> np.ndarray:
+    """One base64 string of little-endian float32 per probe"""
+    if len(values) > max_probes:
+        raise ProbeError(f"At most {max_probes} probe embeddings per request")
+    rows = []
+    for value in values:
+        try:
+            raw = base64.b64decode(value, validate=True)
+        except (binascii.Error, TypeError, ValueError):
+            raise ProbeError("Probe embeddings must be base64-encoded float32")
+        if len(raw) != dimension * 4:
+            raise ProbeError(f"Each probe must be {dimension} float32 values ({dimension * 4} bytes)")
+        rows.append(np.frombuffer(raw, dtype="<f4"))
+    return _check_probes(np.array(rows, dtype=np.float32).reshape(-1, dimension), max_probes)
+
+def encode_probe(embedding) -> str:
+    """base64 of a float32 embedding, as the kiosk would send it"""
+    return base64.b64encode(np.asarray(embedding, dtype="<f4").tobytes()).decode("ascii")
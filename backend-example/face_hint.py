@@ -0,0 +1,127 @@
+"""
+Client-supplied face hints for ITScence
+Kiosks that already run a face detector can send the face box (with optional
+eye landmarks) or a pre-aligned face crop; the server sanity-checks the region
+and narrows or skips its own detection
+"""
+
+import os
+import json
+from collections import Counter
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+# Detection runs on the box grown by this fraction of its size on each side
+FACE_HINT_MARGIN = float(os.getenv("FACE_HINT_MARGIN", "0.25"))
+# Sanity limits for a hinted face region
+FACE_HINT_MIN_SIZE = 32  # pixels, shorter side
+FACE_HINT_ASPECT_RANGE = (0.5, 2.0)  # width / height
+FACE_HINT_MIN_INSIDE = 0.8  # fraction of the box that must lie inside the frame
+FACE_HINT_MIN_CONTRAST = 8.0  # gray-level std dev; blank or flat regions are not faces
+
+class FaceHintError(ValueError):
+    """A client face hint that failed parsing or the sanity check"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"face hint rejected: {reason}")
+        self.reason = reason
+
+def _point(value) -> Optional[Tuple[float, float]]:
+    if value is None:
+        return None
+    if not isinstance(value, (list, tuple)) or len(value) != 2:
+        raise FaceHintError("malformed")
+    return float(value[0]), float(value[1])
+
+def parse_face_box(raw: str) -> Dict[str, Any]:
+    """Parse a JSON box {"x", "y", "w", "h"} with optional "left_eye"/"right_eye" [x, y] points"""
+    try:
+        data = json.loads(raw)
+        area = {key: float(data[key]) for key in ("x", "y", "w", "h")}
+        area["left_eye"] = _point(data.get("left_eye"))
+        area["right_eye"] = _point(data.get("right_eye"))
+    except FaceHintError:
+        raise
+    except (ValueError, TypeError, KeyError, AttributeError):
+        raise FaceHintError("malformed")
+    return area
+
+def scale_area(area: Dict[str, Any], ratio: float) -> Dict[str, Any]:
+    """Map a box from upload pixels to the (downscaled) processing frame"""
+    scaled = {key: area[key] * ratio for key in ("x", "y", "w", "h")}
+    for eye in ("left_eye", "right_eye"):
+        point = area.get(eye)
+        scaled[eye] = (point[0] * ratio, point[1] * ratio) if point else None
+    return scaled
+
+def offset_area(area: Dict[str, Any], dx: float, dy: float) -> Dict[str, Any]:
+    """Shift a facial_area (and its eye points) found in a sub-region back into frame coordinates"""
+    shifted = dict(area, x=area["x"] + dx, y=area["y"] + dy)
+    for eye in ("left_eye", "right_eye"):
+        point = area.get(eye)
+        if point:
+            shifted[eye] = (point[0] + dx, point[1] + dy)
+    return shifted
+
+def clip_area(area: Dict[str, Any], width: int, height: int) -> Dict[str, Any]:
+    x0, y0 = max(0, int(round(area["x"]))), max(0, int(round(area["y"])))
+    x1 = min(width, int(round(area["x"] + area["w"])))
+    y1 = min(height, int(round(area["y"] + area["h"])))
+    return dict(area, x=x0, y=y0, w=max(0, x1 - x0), h=max(0, y1 - y0))
+
+def padded_region(area: Dict[str, Any], width: int, height: int, margin: float = FACE_HINT_MARGIN) -> Tuple[int, int, int, int]:
+    """(x0, y0, x1, y1) of the box grown by margin on each side, clipped to the frame"""
+    pad_x, pad_y = area["w"] * margin, area["h"] * margin
+    return (
+        max(0, int(area["x"] - pad_x)),
+        max(0, int(area["y"] - pad_y)),
+        min(width, int(area["x"] + area["w"] + pad_x)),
+        min(height, int(area["y"] + area["h"] + pad_y)),
+    )
+
+def check_face_region(image: np.ndarray, area: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Cheap sanity check of a hinted face box against the frame: plausible size
+    and shape, mostly inside the frame, eyes inside the box, and not a flat
+    region. Returns the box clipped to the frame, or raises FaceHintError.
+    """
+    height, width = image.shape[:2]
+    if area["w"] <= 0 or area["h"] <= 0:
+        raise FaceHintError("empty_box")
+    aspect = area["w"] / area["h"]
+    if not FACE_HINT_ASPECT_RANGE[0] <= aspect <= FACE_HINT_ASPECT_RANGE[1]:
+        raise FaceHintError("bad_aspect")
+    clipped = clip_area(area, width, height)
+    if clipped["w"] * clipped["h"] < FACE_HINT_MIN_INSIDE * area["w"] * area["h"]:
+        raise FaceHintError("outside_frame")
+    if min(clipped["w"], clipped["h"]) < FACE_HINT_MIN_SIZE:
+        raise FaceHintError("too_small")
+    for eye in ("left_eye", "right_eye"):
+        point = area.get(eye)
+        if point and not (area["x"] <= point[0] <= area["x"] + area["w"] and area["y"] <= point[1] <= area["y"] + area["h"]):
+            raise FaceHintError("eyes_outside_box")
+    region = image[clipped["y"]:clipped["y"] + clipped["h"], clipped["x"]:clipped["x"] + clipped["w"]]
+    if float(cv2.cvtColor(region, cv2.COLOR_BGR2GRAY).std()) < FACE_HINT_MIN_CONTRAST:
+        raise FaceHintError("flat_region")
+    return clipped
+
+def whole_frame_area(image: np.ndarray) -> Dict[str, Any]:
+    height, width = image.shape[:2]
+    return {"x": 0, "y": 0, "w": width, "h": height, "left_eye": None, "right_eye": None}
+
+class FaceHintMetrics:
+    """How often each hint mode was used, rejected, or fell back to full detection"""
+
+    def __init__(self):
+        self.used: Counter = Counter()
+        self.rejected: Counter = Counter()
+        self.fallbacks = 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "used": dict(self.used),
+            "rejected": dict(self.rejected),
+            "fallbacks_to_full_detection": self.fallbacks,
+        }
@@ -0,0 +1,142 @@
+"""
+Face quality gate for ITScence
+Cheap checks on the detected face (sharpness, exposure, size, position, pose)
+so unusable frames are rejected before liveness and embedding
+"""
+
+import math
+from collections import Counter
+from typing import Any, Dict, Optional
+
+import cv2
+import numpy as np
+
+# Face crops are resized to this width before measuring sharpness, so the
+# threshold does not depend on how close the person stands
+SHARPNESS_WIDTH = 128
+
+QUALITY_MESSAGES = {
+    "blurry": "Image is blurry. Hold still and make sure the camera is in focus.",
+    "too_dark": "Image is too dark. Improve the lighting on your face.",
+    "too_bright": "Image is overexposed. Avoid strong light on your face or behind you.",
+    "face_too_small": "Face is too small. Move closer to the camera.",
+    "face_at_edge": "Face is cut off at the edge of the frame. Center your face in the camera.",
+    "face_tilted": "Head is tilted. Keep your head straight.",
+    "face_turned": "Face is turned away. Look straight at the camera.",
+}
+
+def face_crop(image: np.ndarray, facial_area: Dict[str, Any]) -> np.ndarray:
+    height, width = image.shape[:2]
+    x, y = max(0, int(facial_area["x"])), max(0, int(facial_area["y"]))
+    w, h = int(facial_area["w"]), int(facial_area["h"])
+    return image[y:min(height, y + h), x:min(width, x + w)]
+
+def sharpness(gray_face: np.ndarray) -> float:
+    """Variance of the Laplacian of the face at a fixed width"""
+    scale = SHARPNESS_WIDTH / max(gray_face.shape[1], 1)
+    resized = cv2.resize(gray_face, (SHARPNESS_WIDTH, max(1, int(gray_face.shape[0] * scale))), interpolation=cv2.INTER_AREA)
+    return float(cv2.Laplacian(resized, cv2.CV_64F).var())
+
+def pose_from_eyes(facial_area: Dict[str, Any]) -> Optional[Dict[str, float]]:
+    """
+    Roll (degrees) from the eye line, and a yaw proxy: how far the eye midpoint
+    sits from the box centre, as a fraction of half the box width (0 = frontal).
+    None when the detector gives no eye landmarks.
+    """
+    left, right = facial_area.get("left_eye"), facial_area.get("right_eye")
+    if not left or not right:
+        return None
+    dx, dy = float(right[0]) - float(left[0]), float(right[1]) - float(left[1])
+    if dx == 0 and dy == 0:
+        return None
+    roll = abs(math.degrees(math.atan2(dy, dx))) % 180
+    roll = min(roll, 180 - roll)
+    mid_x = (float(left[0]) + float(right[0])) / 2
+    center_x = facial_area["x"] + facial_area["w"] / 2
+    yaw = abs(mid_x - center_x) / max(facial_area["w"] / 2, 1)
+    return {"roll_degrees": round(roll, 1), "yaw_offset": round(yaw, 3)}
+
+def assess_face_quality(image: np.ndarray, facial_area: Dict[str, Any], settings, check_edge_margin: bool = True) -> Dict[str, Any]:
+    """
+    Check the detected face in a BGR frame against the quality_* thresholds of
+    `settings` (a DeepFaceConfig). Returns passed, the first failing check as
+    reason with a message for the user, and the measured values. The edge
+    margin check is skipped for frames that are already a face crop.
+    """
+    height, width = image.shape[:2]
+    crop = face_crop(image, facial_area)
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.size else np.zeros((1, 1), dtype=np.uint8)
+
+    face_size = min(int(facial_area["w"]), int(facial_area["h"]))
+    margin = min(
+        facial_area["x"], facial_area["y"],
+        width - (facial_area["x"] + facial_area["w"]),
+        height - (facial_area["y"] + facial_area["h"])
+    ) / max(min(width, height), 1)
+    metrics: Dict[str, Any] = {
+        "face_size": face_size,
+        "edge_margin": round(float(margin), 3),
+        "brightness": round(float(gray.mean()), 1),
+        "sharpness": round(sharpness(gray), 1) if crop.size else 0.0,
+    }
+    pose = pose_from_eyes(facial_area)
+    if pose:
+        metrics.update(pose)
+
+    # Ordered from the most to the least actionable for someone at a kiosk
+    failures = [
+        ("face_too_small", face_size < settings.quality_min_face_size),
+        ("face_at_edge", check_edge_margin and margin < settings.quality_min_edge_margin),
+        ("too_dark", metrics["brightness"] < settings.quality_min_brightness),
+        ("too_bright", metrics["brightness"] > settings.quality_max_brightness),
+        ("face_turned", bool(pose) and pose["yaw_offset"] > settings.quality_max_yaw_offset),
+        ("face_tilted", bool(pose) and pose["roll_degrees"] > settings.quality_max_roll_degrees),
+        ("blurry", metrics["sharpness"] < settings.quality_min_sharpness),
+    ]
+    reason = next((name for name, failed in failures if failed), None)
+    return {
+        "passed": reason is None,
+        "reason": reason,
+        "message": QUALITY_MESSAGES.get(reason) if reason else None,
+        "metrics": metrics,
+    }
+
+class QualityGateMetrics:
+    """
+    Reject counts per reason and an estimate of the work they saved: each
+    reject is credited with the running average cost of the stages that would
+    have followed (liveness, embedding, matching) on accepted frames.
+    """
+
+    def __init__(self, smoothing: float = 0.1):
+        self.smoothing = smoothing
+        self.checked = 0
+        self.rejected: Counter = Counter()
+        self.gate_ms = 0.0
+        self.downstream_avg_ms: Optional[float] = None
+        self.estimated_saved_ms = 0.0
+
+    def record_check(self, passed: bool, reason: Optional[str], gate_ms: float):
+        self.checked += 1
+        self.gate_ms += gate_ms
+        if not passed:
+            self.rejected[reason] += 1
+            self.estimated_saved_ms += self.downstream_avg_ms or 0.0
+
+    def record_downstream(self, ms: float):
+        if self.downstream_avg_ms is None:
+            self.downstream_avg_ms = ms
+        else:
+            self.downstream_avg_ms += self.smoothing * (ms - self.downstream_avg_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        rejected = sum(self.rejected.values())
+        return {
+            "checked": self.checked,
+            "rejected": rejected,
+            "reject_rate": round(rejected / self.checked, 3) if self.checked else 0.0,
+            "rejected_by_reason": dict(self.rejected),
+            "avg_gate_ms": round(self.gate_ms / self.checked, 2) if self.checked else 0.0,
+            "avg_downstream_ms": round(self.downstream_avg_ms, 1) if self.downstream_avg_ms is not None else None,
+            "estimated_saved_ms": round(self.estimated_saved_ms, 1),
+        }
@@ -0,0 +1,137 @@
+"""
+Per-kiosk face tracking for ITScence
+A person at a kiosk sends many frames in a row; while the face stays in place
+and looks the same, the identity from the last full recognition is reused
+instead of embedding and matching every frame
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+import cv2
+import numpy as np
+
+# Kiosks with a live track; the least recently seen is dropped beyond this
+TRACKING_MAX_KIOSKS = 256
+# Side of the grayscale thumbnail used for the appearance check
+SIGNATURE_SIZE = 16
+
+def box_iou(a: Dict[str, Any], b: Dict[str, Any]) -> float:
+    overlap_w = max(0.0, min(a["x"] + a["w"], b["x"] + b["w"]) - max(a["x"], b["x"]))
+    overlap_h = max(0.0, min(a["y"] + a["h"], b["y"] + b["h"]) - max(a["y"], b["y"]))
+    intersection = overlap_w * overlap_h
+    union = a["w"] * a["h"] + b["w"] * b["h"] - intersection
+    return intersection / union if union > 0 else 0.0
+
+def appearance_signature(image: np.ndarray, facial_area: Dict[str, Any]) -> Optional[np.ndarray]:
+    """Zero-mean, unit-norm 16x16 grayscale thumbnail of the face; None for an empty crop"""
+    height, width = image.shape[:2]
+    x, y = max(0, int(facial_area["x"])), max(0, int(facial_area["y"]))
+    crop = image[y:min(height, y + int(facial_area["h"])), x:min(width, x + int(facial_area["w"]))]
+    if not crop.size:
+        return None
+    gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY) if crop.ndim == 3 else crop
+    thumb = cv2.resize(gray, (SIGNATURE_SIZE, SIGNATURE_SIZE), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    thumb -= thumb.mean()
+    norm = float(np.linalg.norm(thumb))
+    return thumb / norm if norm > 0 else thumb
+
+def appearance_similarity(a: Optional[np.ndarray], b: Optional[np.ndarray]) -> float:
+    """Normalised cross-correlation of two signatures (1 = identical)"""
+    if a is None or b is None:
+        return 0.0
+    return float(a @ b)
+
+class FaceTracker:
+    """
+    One track per kiosk: the face box, appearance signature, identity and
+    embedding from the kiosk's last full recognition.
+
+    A new frame continues the track when it arrives within the gap limit, its
+    box overlaps the tracked box and its appearance correlates with it. A
+    continuing frame reuses the cached result until the track has gone
+    reembed_every frames without a full recognition; tracks whose match was
+    within the uncertainty margin of the threshold are never reused.
+    `settings` returns the live DeepFaceConfig (tracking_* fields). Runs on
+    the event loop; no locking needed.
+    """
+
+    def __init__(self, settings: Callable[[], Any], clock: Callable[[], float] = time.monotonic, max_kiosks: int = TRACKING_MAX_KIOSKS):
+        self.settings = settings
+        self.clock = clock
+        self.max_kiosks = max_kiosks
+        self.tracks: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.metrics = {"reused": 0, "started": 0, "refreshed": 0, "ended": 0, "missed": {}}
+
+    def _miss(self, reason: str):
+        self.metrics["missed"][reason] = self.metrics["missed"].get(reason, 0) + 1
+
+    def continue_track(self, kiosk: str, facial_area: Dict[str, Any], signature: Optional[np.ndarray]) -> Optional[Dict[str, Any]]:
+        """The kiosk's track if this detection continues it and its cached identity may be reused"""
+        settings = self.settings()
+        track = self.tracks.get(kiosk)
+        if track is None:
+            return None
+        now = self.clock()
+        if now - track["last_seen"] > settings.tracking_max_gap_seconds:
+            self.end(kiosk)
+            self._miss("gap")
+            return None
+        if box_iou(facial_area, track["box"]) < settings.tracking_min_iou:
+            self._miss("moved")
+            return None
+        if appearance_similarity(signature, track["signature"]) < settings.tracking_min_appearance:
+            self._miss("appearance")
+            return None
+        if track["confidence"] < settings.confidence_threshold + settings.tracking_uncertainty_margin:
+            self._miss("uncertain")
+            return None
+        if track["frames_since_embedding"] + 1 >= settings.tracking_reembed_every:
+            self._miss("refresh_due")
+            return None
+
+        track["frames_since_embedding"] += 1
+        track["frames"] += 1
+        track["box"] = facial_area
+        track["signature"] = signature
+        track["last_seen"] = now
+        self.tracks.move_to_end(kiosk)
+        self.metrics["reused"] += 1
+        return track
+
+    def update(self, kiosk: str, facial_area: Dict[str, Any], signature: Optional[np.ndarray], employee: Any, confidence: float, liveness_score: Optional[float], embedding):
+        """Start or refresh the kiosk's track after a full recognition"""
+        previous = self.tracks.get(kiosk)
+        same_person = previous is not None and previous["employee_id"] == getattr(employee, "id", None)
+        self.metrics["refreshed" if same_person else "started"] += 1
+        self.tracks[kiosk] = {
+            "employee_id": getattr(employee, "id", None),
+            "employee": employee,
+            "confidence": confidence,
+            "liveness_score": liveness_score,
+            "embedding": embedding,
+            "box": facial_area,
+            "signature": signature,
+            "frames": previous["frames"] + 1 if same_person else 1,
+            "frames_since_embedding": 0,
+            "started": previous["started"] if same_person else self.clock(),
+            "last_seen": self.clock(),
+        }
+        self.tracks.move_to_end(kiosk)
+        while len(self.tracks) > self.max_kiosks:
+            self.tracks.popitem(last=False)
+
+    def end(self, kiosk: str):
+        """Forget the kiosk's track (the face left, changed, or failed a check)"""
+        if self.tracks.pop(kiosk, None) is not None:
+            self.metrics["ended"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        looked_up = self.metrics["reused"] + sum(self.metrics["missed"].values())
+        return {
+            "active_tracks": len(self.tracks),
+            "reuse_rate": round(self.metrics["reused"] / looked_up, 3) if looked_up else 0.0,
+            **self.metrics,
+            "missed": dict(self.metrics["missed"]),
+        }
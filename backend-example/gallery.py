@@ -0,0 +1,191 @@
+"""
+In-memory face gallery for ITScence
+Holds the enrolled embeddings of one model as a matrix and matches probes against it
+"""
+
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+def distance_to_confidence(distance: float, distance_metric: str) -> float:
+    """Convert a match distance to a 0-1 confidence for the given metric"""
+    if distance_metric == "cosine":
+        confidence = 1 - distance
+    elif distance_metric in ["euclidean", "euclidean_l2"]:
+        confidence = 1 - min(distance, 2) / 2
+    else:
+        confidence = 1 - distance
+    return max(0.0, min(1.0, float(confidence)))
+
+class FaceGallery:
+    """
+    Embeddings of every enrolled employee for one model.
+
+    Rows of `matrix` line up with `ids` and `names`. For cosine and euclidean_l2
+    the rows are stored L2-normalised so a match is one matrix-vector product.
+    `version` is the cluster gallery sequence number the contents reflect (see
+    cluster_sync); updates replace the arrays rather than mutating them, so a
+    reader holding the old arrays is never affected by a concurrent update.
+    That also makes a read-only memory-mapped matrix (see gallery_snapshot)
+    safe to adopt: the first update copies it into memory.
+    """
+
+    def __init__(self, model_name: str, distance_metric: str):
+        self.model_name = model_name
+        self.distance_metric = distance_metric
+        self.version = 0
+        self.ids: List[str] = []
+        self.names: List[str] = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self._sq_norms = np.zeros(0, dtype=np.float32)
+        self._index: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return len(self.ids)
+
+    @property
+    def dimension(self) -> int:
+        return self.matrix.shape[1] if self.matrix.ndim == 2 else 0
+
+    @property
+    def normalized(self) -> bool:
+        return self.distance_metric in ("cosine", "euclidean_l2")
+
+    def _prepare(self, embeddings: np.ndarray) -> np.ndarray:
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if self.normalized:
+            norms = np.linalg.norm(embeddings, axis=-1, keepdims=True)
+            embeddings = embeddings / np.maximum(norms, 1e-12)
+        return embeddings
+
+    def _set(self, ids: List[str], names: List[str], matrix: np.ndarray):
+        self.ids = ids
+        self.names = names
+        self.matrix = matrix
+        self._sq_norms = np.einsum("ij,ij->i", matrix, matrix) if matrix.size else np.zeros(len(ids), dtype=np.float32)
+        self._index = {employee_id: row for row, employee_id in enumerate(ids)}
+
+    def replace(self, entries: Iterable[Dict[str, Any]], version: int):
+        """Replace the whole gallery with entries of {employee_id, name, embedding}"""
+        entries = list(entries)
+        ids = [entry["employee_id"] for entry in entries]
+        names = [entry.get("name") or "" for entry in entries]
+        matrix = self._prepare(np.array([entry["embedding"] for entry in entries], dtype=np.float32)) if entries else np.zeros((0, 0), dtype=np.float32)
+        with self._lock:
+            self._set(ids, names, matrix)
+            self.version = version
+
+    def load_arrays(self, ids: List[str], names: List[str], matrix: np.ndarray, version: int):
+        """Adopt prepared arrays as-is (rows already normalised if the metric needs it)"""
+        with self._lock:
+            self._set(list(ids), list(names), matrix)
+            self.version = version
+
+    def upsert(self, employee_id: str, name: str, embedding, version: Optional[int] = None):
+        """Add or replace one employee's embedding"""
+        self.apply_many([(employee_id, name, embedding)], version=version)
+
+    def remove(self, employee_id: str, version: Optional[int] = None):
+        """Remove one employee from the gallery"""
+        self.apply_many([], [employee_id], version=version)
+
+    def apply_many(self, upserts: Iterable[Tuple[str, str, Any]], removals: Iterable[str] = (), version: Optional[int] = None):
+        """
+        Apply a batch of (employee_id, name, embedding) upserts and removals,
+        rebuilding the arrays once however many rows change. Removals go first;
+        a later upsert of the same employee wins over an earlier one.
+        """
+        latest = {employee_id: (name, embedding) for employee_id, name, embedding in upserts}
+        vectors = (
+            self._prepare(np.array([embedding for _, embedding in latest.values()], dtype=np.float32).reshape(len(latest), -1))
+            if latest else None
+        )
+        removals = set(removals)
+        with self._lock:
+            removed_rows = [self._index[employee_id] for employee_id in removals if employee_id in self._index]
+            if removed_rows:
+                keep = np.ones(self.size, dtype=bool)
+                keep[removed_rows] = False
+                ids = [employee_id for employee_id, kept in zip(self.ids, keep) if kept]
+                names = [name for name, kept in zip(self.names, keep) if kept]
+                matrix = np.array(self.matrix[keep]) if ids else np.zeros((0, 0), dtype=np.float32)
+            else:
+                ids, names, matrix = list(self.ids), list(self.names), self.matrix
+
+            if latest:
+                index = {employee_id: row for row, employee_id in enumerate(ids)}
+                updated = [(index[employee_id], row) for row, employee_id in enumerate(latest) if employee_id in index]
+                added = [row for row, employee_id in enumerate(latest) if employee_id not in index]
+                entries = list(latest.items())
+                if updated:
+                    matrix = np.array(matrix) if not removed_rows else matrix
+                    for gallery_row, row in updated:
+                        matrix[gallery_row] = vectors[row]
+                        names[gallery_row] = entries[row][1][0] or names[gallery_row]
+                if added:
+                    matrix = np.concatenate([matrix, vectors[added]]) if ids else vectors[added]
+                    ids.extend(entries[row][0] for row in added)
+                    names.extend(entries[row][1][0] or "" for row in added)
+
+            if removed_rows or latest:
+                self._set(ids, names, matrix)
+            if version is not None:
+                self.version = max(self.version, version)
+
+    def _snapshot(self):
+        with self._lock:
+            return self.ids, self.names, self.matrix, self._sq_norms
+
+    def _distances(self, probe, matrix: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+        """Distances to every row for one probe (1-D result) or a batch of probes (one row each)"""
+        probe = self._prepare(np.asarray(probe, dtype=np.float32))
+        if probe.shape[-1] != matrix.shape[1]:
+            raise ValueError(f"Embedding size {probe.shape[-1]} does not match gallery size {matrix.shape[1]}")
+        similarity = probe @ matrix.T
+        if self.distance_metric == "cosine":
+            return 1.0 - similarity
+        # ||a - b||^2 = ||a||^2 + ||b||^2 - 2ab
+        probe_sq_norms = np.einsum("...j,...j->...", probe, probe)[..., np.newaxis]
+        squared = sq_norms + probe_sq_norms - 2.0 * similarity
+        return np.sqrt(np.maximum(squared, 0.0))
+
+    def distances(self, probe) -> np.ndarray:
+        """Distances from a probe embedding to every gallery row"""
+        _, _, matrix, sq_norms = self._snapshot()
+        return self._distances(np.asarray(probe, dtype=np.float32).reshape(-1), matrix, sq_norms)
+
+    def match(self, probe) -> Optional[Tuple[str, str, float]]:
+        """Best match as (employee_id, name, distance), or None if the gallery is empty"""
+        ids, names, matrix, sq_norms = self._snapshot()
+        if not ids:
+            return None
+        distances = self._distances(np.asarray(probe, dtype=np.float32).reshape(-1), matrix, sq_norms)
+        best = int(np.argmin(distances))
+        return ids[best], names[best], float(distances[best])
+
+    def match_many(self, probes) -> List[Optional[Tuple[str, str, float]]]:
+        """Best match for each row of a (probes, dimension) array, in one matrix product"""
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        ids, names, matrix, sq_norms = self._snapshot()
+        if not ids:
+            return [None] * len(probes)
+        distances = self._distances(probes, matrix, sq_norms)
+        best = np.argmin(distances, axis=1)
+        return [(ids[row], names[row], float(distances[probe, row])) for probe, row in enumerate(best)]
+
+    def contains(self, employee_id: str) -> bool:
+        return employee_id in self._index
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "distance_metric": self.distance_metric,
+            "version": self.version,
+            "size": self.size,
+            "dimension": self.dimension,
+            "memory_bytes": int(self.matrix.nbytes),
+            "memory_mapped": isinstance(self.matrix, np.memmap),
+        }
@@ -0,0 +1,146 @@
+"""
+Memory-mapped face gallery snapshots for ITScence
+Versioned binary file of the gallery matrix and id table that workers map read-only
+"""
+
+import os
+import re
+import json
+import struct
+import logging
+import tempfile
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Where workers keep gallery snapshots (face_database is already a persistent volume)
+GALLERY_SNAPSHOT_DIR = os.getenv("GALLERY_SNAPSHOT_DIR", "face_database")
+GALLERY_SNAPSHOT_ENABLED = os.getenv("GALLERY_SNAPSHOT_ENABLED", "true").lower() == "true"
+# How often a worker rewrites its snapshot once its gallery has moved on
+GALLERY_SNAPSHOT_INTERVAL_SECONDS = float(os.getenv("GALLERY_SNAPSHOT_INTERVAL_SECONDS", "300"))
+
+SNAPSHOT_MAGIC = b"ITSGAL01"
+SNAPSHOT_FORMAT_VERSION = 1
+# Matrix data starts on this boundary so the mapped rows are aligned for BLAS
+SNAPSHOT_ALIGNMENT = 64
+
+def snapshot_path(model_name: str, distance_metric: str, directory: str = GALLERY_SNAPSHOT_DIR) -> str:
+    """Snapshot file for a model/metric pair"""
+    safe = re.sub(r"[^A-Za-z0-9_.-]", "_", f"{model_name}_{distance_metric}").lower()
+    return os.path.join(directory, f"gallery_{safe}.itsgal")
+
+def write_snapshot(path: str, gallery, database_id: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Write a gallery to path and return the header; database_id records which
+    database (DatabaseManager.get_database_id) the gallery version belongs to.
+
+    Layout: 8-byte magic, little-endian uint32 header length, JSON header,
+    zero padding to SNAPSHOT_ALIGNMENT, then the float32 matrix in row order.
+    The file is written next to the target and renamed over it, so workers
+    that still map the old file keep a consistent view.
+    """
+    # Version first: rows read afterwards are at least that new, and replaying deltas is idempotent
+    version = gallery.version
+    ids, names, matrix, _ = gallery._snapshot()
+    matrix = np.ascontiguousarray(matrix, dtype="<f4")
+    header = {
+        "format_version": SNAPSHOT_FORMAT_VERSION,
+        "model_name": gallery.model_name,
+        "distance_metric": gallery.distance_metric,
+        "normalized": gallery.normalized,
+        "version": version,
+        "database_id": database_id,
+        "count": len(ids),
+        "dimension": int(matrix.shape[1]) if matrix.ndim == 2 and len(ids) else 0,
+        "dtype": "<f4",
+        "ids": list(ids),
+        "names": list(names),
+    }
+    header_bytes = json.dumps(header, separators=(",", ":")).encode("utf-8")
+    prefix = len(SNAPSHOT_MAGIC) + 4 + len(header_bytes)
+    padding = -prefix % SNAPSHOT_ALIGNMENT
+
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".gallery_", dir=directory)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(struct.pack("<I", len(header_bytes)))
+            f.write(header_bytes)
+            f.write(b"\0" * padding)
+            if header["count"]:
+                f.write(matrix.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return header
+
+def read_snapshot(path: str) -> Tuple[Dict[str, Any], np.ndarray]:
+    """Read a snapshot header and map its matrix read-only; raises ValueError on a bad file"""
+    with open(path, "rb") as f:
+        if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a gallery snapshot")
+        (header_length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(header_length).decode("utf-8"))
+
+    if header.get("format_version") != SNAPSHOT_FORMAT_VERSION:
+        raise ValueError(f"Unsupported gallery snapshot format {header.get('format_version')}")
+    count, dimension = header["count"], header["dimension"]
+    if len(header["ids"]) != count or len(header["names"]) != count:
+        raise ValueError("Gallery snapshot id table does not match its row count")
+
+    offset = len(SNAPSHOT_MAGIC) + 4 + header_length
+    offset += -offset % SNAPSHOT_ALIGNMENT
+    expected_size = offset + count * dimension * 4
+    if os.path.getsize(path) != expected_size:
+        raise ValueError(f"Gallery snapshot is truncated ({os.path.getsize(path)} of {expected_size} bytes)")
+
+    if count == 0:
+        return header, np.zeros((0, 0), dtype=np.float32)
+    matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset, shape=(count, dimension))
+    return header, matrix
+
+def load_snapshot(path: str, gallery, max_version: Optional[int] = None, database_id: Optional[str] = None) -> bool:
+    """
+    Map a snapshot into gallery if it matches the gallery's model and metric.
+
+    Snapshots written against another database (database_id differs) or newer
+    than max_version (the cluster's current gallery version) are ignored: their
+    version numbers say nothing about this database's change log. Returns True
+    if the gallery now holds the snapshot.
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        header, matrix = read_snapshot(path)
+    except Exception as e:
+        logging.warning(f"⚠️ Ignoring gallery snapshot {path}: {e}")
+        return False
+
+    if (header["model_name"], header["distance_metric"]) != (gallery.model_name, gallery.distance_metric):
+        return False
+    if header["normalized"] != gallery.normalized:
+        return False
+    if database_id is not None and header.get("database_id") != database_id:
+        logging.warning(f"⚠️ Gallery snapshot {path} was written for another database; ignoring it")
+        return False
+    if max_version is not None and header["version"] > max_version:
+        logging.warning(f"⚠️ Gallery snapshot v{header['version']} is ahead of the database (v{max_version}); ignoring it")
+        return False
+
+    gallery.load_arrays(header["ids"], header["names"], matrix, header["version"])
+    return True
+
+def snapshot_entries(path: str) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """Snapshot header and {employee_id, name, embedding} entries, for importing into a database"""
+    header, matrix = read_snapshot(path)
+    entries = [
+        {"employee_id": employee_id, "name": name, "embedding": matrix[row].tolist()}
+        for row, (employee_id, name) in enumerate(zip(header["ids"], header["names"]))
+    ]
+    return header, entries
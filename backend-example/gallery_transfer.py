@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Gallery Export/Import Tool for ITScence
+Exports a model's face embeddings to a gallery snapshot file, or imports one
+into this cluster's database (for moving enrolments between deployments).
+
+Run with: python gallery_transfer.py export --model VGG-Face --output gallery.itsgal
+          python gallery_transfer.py import gallery.itsgal
+"""
+
+import sys
+import logging
+import argparse
+
+from database import db_manager, DATABASE_NAME, MONGODB_URL, EMPLOYEES_COLLECTION
+from gallery import FaceGallery
+from gallery_snapshot import write_snapshot, snapshot_entries
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Metrics whose galleries store the rows L2-normalised; only these can use normalised embeddings as is
+NORMALIZED_METRICS = ("cosine", "euclidean_l2")
+
+def export_gallery(args):
+    # Plain euclidean keeps the stored embeddings as they are, so the file suits any target metric
+    gallery = FaceGallery(args.model, "euclidean")
+    version = db_manager.get_gallery_version()
+    gallery.replace(db_manager.get_face_embeddings(args.model), version)
+    header = write_snapshot(args.output, gallery, db_manager.get_database_id())
+    logger.info(f"✅ Exported {header['count']} {args.model} embeddings (dim {header['dimension']}, v{version}) to {args.output}")
+
+def check_normalization(header, allow_normalized: bool = False):
+    """Refuse L2-normalised rows (a worker's own snapshot file) unless this cluster matches with a normalising metric"""
+    if not header["normalized"]:
+        return
+    state = db_manager.get_cluster_config() or {}
+    metric = (state.get("config") or {}).get("distance_metric")
+    if metric in NORMALIZED_METRICS:
+        return
+    if allow_normalized:
+        logger.warning(f"⚠️ Importing L2-normalised embeddings into a cluster using {metric or 'an unknown metric'}")
+        return
+    raise ValueError(
+        f"Snapshot rows are L2-normalised ({header['distance_metric']}) but this cluster uses {metric or 'an unknown metric'}; "
+        f"re-export with gallery_transfer.py export or pass --allow-normalized"
+    )
+
+def import_gallery(args):
+    header, entries = snapshot_entries(args.input)
+    logger.info(f"📦 Snapshot: {header['count']} {header['model_name']} embeddings ({header['distance_metric']}, v{header['version']})")
+    check_normalization(header, args.allow_normalized)
+
+    if not args.include_unknown:
+        ids = [entry["employee_id"] for entry in entries]
+        known = set(db_manager.db[EMPLOYEES_COLLECTION].distinct("employee_id", {"employee_id": {"$in": ids}}))
+        skipped = len(entries) - len(known)
+        entries = [entry for entry in entries if entry["employee_id"] in known]
+        if skipped:
+            logger.warning(f"⚠️ Skipping {skipped} embeddings for employees not in this database (use --include-unknown to keep them)")
+
+    if not entries:
+        logger.info("ℹ️ Nothing to import")
+        return
+
+    if not args.confirm:
+        logger.warning(f"⚠️ This will replace {header['model_name']} embeddings for {len(entries)} employees")
+        response = input("Are you sure you want to continue? (yes/no): ").lower().strip()
+        if response not in ['yes', 'y']:
+            logger.info("❌ Operation cancelled by user")
+            return
+
+    for start in range(0, len(entries), args.batch_size):
+        batch = entries[start:start + args.batch_size]
+        db_manager.store_face_embeddings(header["model_name"], batch)
+        # Running workers pick the imported rows up as ordinary gallery deltas
+        db_manager.record_gallery_changes("upsert", [entry["employee_id"] for entry in batch])
+    logger.info(f"✅ Imported {len(entries)} embeddings")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Export or import face gallery snapshots")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Write a model's embeddings to a snapshot file")
+    export_parser.add_argument("--model", type=str, default="VGG-Face", help="Model whose embeddings to export")
+    export_parser.add_argument("--output", type=str, required=True, help="Snapshot file to write")
+
+    import_parser = subparsers.add_parser("import", help="Store a snapshot's embeddings in this database")
+    import_parser.add_argument("input", type=str, help="Snapshot file to read")
+    import_parser.add_argument("--include-unknown", action="store_true", help="Also import employees missing from this database")
+    import_parser.add_argument("--batch-size", type=int, default=500, help="Embeddings written per bulk write")
+    import_parser.add_argument("--allow-normalized", action="store_true", help="Import L2-normalised rows even if this cluster's metric needs raw embeddings")
+    import_parser.add_argument("--confirm", action="store_true", help="Skip confirmation prompt")
+
+    args = parser.parse_args()
+
+    logger.info("🚀 Gallery Transfer Tool")
+    logger.info(f"📍 Database: {MONGODB_URL}/{DATABASE_NAME}")
+
+    if not db_manager.connect():
+        logger.error("❌ Failed to connect to database")
+        sys.exit(1)
+
+    try:
+        if args.command == "export":
+            export_gallery(args)
+        else:
+            import_gallery(args)
+    except Exception as e:
+        logger.error(f"❌ Gallery {args.command} failed: {e}")
+        sys.exit(1)
+    finally:
+        db_manager.disconnect()
+
+if __name__ == "__main__":
+    main()
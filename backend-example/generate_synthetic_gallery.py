@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Synthetic Gallery Generator for ITScence
+Bulk-creates synthetic employees with embeddings (and optional placeholder
+face images) so gallery loading, matching and memory can be measured at
+10k-1M enrolments, then evaluates the gallery with generated probes.
+
+Run with: python generate_synthetic_gallery.py --count 100000 --evaluate --probes 1000
+          python generate_synthetic_gallery.py --purge
+"""
+
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+import argparse
+
+import cv2
+import numpy as np
+
+from database import db_manager, DATABASE_NAME, MONGODB_URL, EMPLOYEES_COLLECTION
+from gallery import FaceGallery
+from synthetic_gallery import MODEL_DIMENSIONS, SyntheticIdentities, distance_summary
+
+CONFIG_FILE = "deepface_config.json"
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def active_model():
+    """Model and metric the workers use: the cluster config, else deepface_config.json"""
+    state = db_manager.get_cluster_config()
+    config = state["config"] if state else {}
+    if not config and os.path.exists(CONFIG_FILE):
+        with open(CONFIG_FILE, 'r') as f:
+            config = json.load(f)
+    return config.get("model_name", "VGG-Face"), config.get("distance_metric", "cosine")
+
+def placeholder_image() -> bytes:
+    """A tiny grey JPEG; DeepFace never runs on it (backfill skips synthetic employees)"""
+    _, buffer = cv2.imencode(".jpg", np.full((32, 32, 3), 128, dtype=np.uint8))
+    return buffer.tobytes()
+
+def next_synthetic_index() -> int:
+    """Continue after the last generated identity so repeated runs extend the gallery"""
+    last = db_manager.db[EMPLOYEES_COLLECTION].find_one(
+        {"synthetic": True}, {"_id": 0, "synthetic_index": 1}, sort=[("synthetic_index", -1)]
+    )
+    return last["synthetic_index"] + 1 if last else 0
+
+def synthetic_id_map():
+    """synthetic_index -> employee_id for every generated employee"""
+    return {
+        employee["synthetic_index"]: employee["employee_id"]
+        for employee in db_manager.db[EMPLOYEES_COLLECTION].find(
+            {"synthetic": True}, {"_id": 0, "employee_id": 1, "synthetic_index": 1}
+        )
+    }
+
+def generate(args, identities: SyntheticIdentities, model_name: str):
+    start_index = next_synthetic_index()
+    image = placeholder_image() if args.images else None
+    created = 0
+    started = time.perf_counter()
+
+    for batch_start in range(start_index, start_index + args.count, args.batch_size):
+        batch_count = min(args.batch_size, start_index + args.count - batch_start)
+        employee_ids = asyncio.run(db_manager.allocate_employee_ids(batch_count))
+        vectors = identities.identities(batch_start, batch_count)
+
+        employees = []
+        for offset, employee_id in enumerate(employee_ids):
+            index = batch_start + offset
+            employee = {
+                "employee_id": employee_id,
+                "name": f"Synthetic {index:06d}",
+                "department": "Synthetic",
+                "email": f"synthetic{index}@example.com",
+                "face_enrolled": True,
+                "synthetic": True,
+                "synthetic_index": index,
+            }
+            if image:
+                employee["face_image_id"] = db_manager.put_face_image(employee_id, image, synthetic=True)
+            employees.append(employee)
+
+        db_manager.insert_employees(employees)
+        db_manager.store_face_embeddings(model_name, [
+            {"employee_id": employee["employee_id"], "name": employee["name"], "embedding": vector}
+            for employee, vector in zip(employees, vectors)
+        ])
+        if args.publish_changes:
+            # Running workers pick the new rows up as ordinary gallery deltas
+            db_manager.record_gallery_changes("upsert", employee_ids)
+
+        created += batch_count
+        elapsed = time.perf_counter() - started
+        logger.info(f"📦 {created}/{args.count} employees ({created / elapsed:.0f}/s)")
+
+    if created and not args.publish_changes:
+        db_manager.bump_gallery_version()
+    logger.info(f"✅ Generated {created} synthetic employees ({model_name}, dim {identities.dimension}, {identities.mode})")
+
+def evaluate(args, identities: SyntheticIdentities, model_name: str, distance_metric: str):
+    """Load the gallery the way a worker does and match genuine and impostor probes against it"""
+    started = time.perf_counter()
+    entries = db_manager.get_face_embeddings(model_name)
+    fetched = time.perf_counter()
+    gallery = FaceGallery(model_name, distance_metric)
+    gallery.replace(entries, db_manager.get_gallery_version())
+    loaded = time.perf_counter()
+    del entries
+    stats = gallery.stats()
+    logger.info(
+        f"📥 Gallery load: {stats['size']} rows in {loaded - started:.2f}s "
+        f"(fetch {fetched - started:.2f}s, build {loaded - fetched:.2f}s), "
+        f"matrix {stats['memory_bytes'] / 2 ** 20:.1f} MiB"
+    )
+    if not gallery.size:
+        return
+    if gallery.dimension != identities.dimension:
+        logger.error(f"❌ Gallery dimension {gallery.dimension} does not match --dimension {identities.dimension}")
+        return
+
+    id_map = synthetic_id_map()
+    rng = np.random.default_rng(args.seed)
+    indices = rng.choice(sorted(id_map), size=min(args.probes, len(id_map)), replace=False) if id_map and args.probes else []
+    probes = [identities.probe(int(index)) for index in indices]
+    truth = [id_map[int(index)] for index in indices]
+    probes += [identities.impostor(index) for index in range(args.impostor_probes)]
+    truth += [""] * args.impostor_probes
+
+    matched, distances, latencies = [], [], []
+    for probe in probes:
+        started = time.perf_counter()
+        employee_id, _, distance = gallery.match(probe)
+        latencies.append((time.perf_counter() - started) * 1000)
+        matched.append(employee_id)
+        distances.append(distance)
+
+    genuine = len(indices)
+    distances = np.array(distances)
+    correct = sum(1 for employee_id, expected in zip(matched[:genuine], truth[:genuine]) if employee_id == expected)
+    if probes:
+        logger.info(
+            f"⏱️ Match latency: p50 {np.percentile(latencies, 50):.2f} ms, "
+            f"p95 {np.percentile(latencies, 95):.2f} ms over {len(probes)} probes"
+        )
+    if genuine:
+        logger.info(f"🎯 Top-1 accuracy: {correct / genuine:.4f} ({correct}/{genuine} genuine probes)")
+        logger.info(f"📊 Genuine best distance: {distance_summary(distances[:genuine])}")
+    if args.impostor_probes:
+        logger.info(f"📊 Impostor best distance: {distance_summary(distances[genuine:])}")
+
+    if args.probes_out and probes:
+        # Exact nearest neighbours are the ground truth for recall of any approximate index
+        np.savez(
+            args.probes_out,
+            probes=np.stack(probes).astype(np.float32),
+            true_ids=np.array(truth),
+            exact_ids=np.array(matched),
+            exact_distances=distances.astype(np.float32),
+            model_name=model_name,
+            distance_metric=distance_metric,
+        )
+        logger.info(f"💾 Probes written to {args.probes_out}")
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Generate a synthetic face gallery for scale testing")
+    parser.add_argument("--count", type=int, default=0, help="Synthetic employees to add")
+    parser.add_argument("--model", type=str, help="Model to store embeddings for, default: the active config")
+    parser.add_argument("--metric", type=str, help="Distance metric for --evaluate, default: the active config")
+    parser.add_argument("--dimension", type=int, help="Embedding size, default: the model's")
+    parser.add_argument("--mode", choices=["random", "clustered"], default="clustered", help="Independent identities, or clusters of look-alikes")
+    parser.add_argument("--clusters", type=int, default=100, help="Look-alike clusters in clustered mode")
+    parser.add_argument("--genuine-distance", type=float, default=0.25, help="Mean cosine distance of a probe to its own identity")
+    parser.add_argument("--impostor-distance", type=float, default=0.6, help="Mean cosine distance between identities of one cluster")
+    parser.add_argument("--seed", type=int, default=0, help="Seed; the same seed reproduces the same identities")
+    parser.add_argument("--images", action="store_true", help="Store a placeholder face image per employee in GridFS")
+    parser.add_argument("--batch-size", type=int, default=5000, help="Employees written per bulk write")
+    parser.add_argument("--publish-changes", action="store_true",
+                        help="Log a gallery change per employee for running workers to apply; by default the "
+                             "gallery version is bumped once so they do a single full reload")
+    parser.add_argument("--evaluate", action="store_true", help="Load the gallery and match probes against it")
+    parser.add_argument("--probes", type=int, default=1000, help="Genuine probes for --evaluate")
+    parser.add_argument("--impostor-probes", type=int, default=1000, help="Probes of unenrolled people for --evaluate")
+    parser.add_argument("--probes-out", type=str, help="Write probes and exact matches to this .npz file")
+    parser.add_argument("--purge", action="store_true", help="Delete all synthetic employees, embeddings and images")
+    parser.add_argument("--confirm", action="store_true", help="Skip confirmation prompt")
+
+    args = parser.parse_args()
+
+    logger.info("🚀 Synthetic Gallery Generator")
+    logger.info(f"📍 Database: {MONGODB_URL}/{DATABASE_NAME}")
+
+    if not (args.count or args.evaluate or args.purge):
+        parser.error("nothing to do: pass --count, --evaluate or --purge")
+
+    if not db_manager.connect():
+        logger.error("❌ Failed to connect to database")
+        sys.exit(1)
+
+    try:
+        if args.purge:
+            if not args.confirm:
+                logger.warning("⚠️ This will delete every synthetic employee with their embeddings and images")
+                response = input("Are you sure you want to continue? (yes/no): ").lower().strip()
+                if response not in ['yes', 'y']:
+                    logger.info("❌ Operation cancelled by user")
+                    return
+            result = db_manager.purge_synthetic_employees(args.batch_size, args.publish_changes)
+            logger.info(f"🗑️ Removed {result['employees']} employees, {result['embeddings']} embeddings, {result['images']} images")
+            return
+
+        model_name, distance_metric = active_model()
+        model_name = args.model or model_name
+        distance_metric = args.metric or distance_metric
+        dimension = args.dimension or MODEL_DIMENSIONS.get(model_name)
+        if not dimension:
+            logger.error(f"❌ Unknown embedding size for {model_name}; pass --dimension")
+            sys.exit(1)
+
+        identities = SyntheticIdentities(
+            dimension,
+            mode=args.mode,
+            clusters=args.clusters,
+            impostor_distance=args.impostor_distance,
+            genuine_distance=args.genuine_distance,
+            seed=args.seed
+        )
+        if args.count:
+            generate(args, identities, model_name)
+        if args.evaluate:
+            evaluate(args, identities, model_name, distance_metric)
+    except Exception as e:
+        logger.error(f"❌ Synthetic gallery failed: {e}")
+        sys.exit(1)
+    finally:
+        db_manager.disconnect()
+
+if __name__ == "__main__":
+    main()
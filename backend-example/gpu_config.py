@@ -8,6 +8,8 @@ import os
 import logging
 from typing import Optional
 
+from cpu_tuning import thread_plan
+
 # Set TensorFlow environment variables before importing TensorFlow
 os.environ['TF_CPP_MIN_LOG_LEVEL'] = '2'  # Reduce TensorFlow logging
 os.environ['TF_FORCE_GPU_ALLOW_GROWTH'] = 'true'  # Allow GPU memory growth
@@ -126,9 +128,10 @@ def optimize_for_inference() -> None:
         return
     
     try:
-        # Disable unnecessary TensorFlow features for inference
-        tf.config.threading.set_inter_op_parallelism_threads(0)  # Use all available cores
-        tf.config.threading.set_intra_op_parallelism_threads(0)  # Use all available cores
+        # Thread pools sized to this worker's share of the CPUs (0 = all cores when CPU_TUNING=off)
+        threads = thread_plan()
+        tf.config.threading.set_inter_op_parallelism_threads(threads["tf_inter_op"])
+        tf.config.threading.set_intra_op_parallelism_threads(threads["tf_intra_op"])
         
         # Enable mixed precision if GPU supports it (Ampere+ architecture)
         gpus = tf.config.experimental.list_physical_devices('GPU')
@@ -0,0 +1,68 @@
+"""
+Image ingest for ITScence
+Decodes uploaded frames straight to a bounded processing resolution, so
+detection, the quality gate, liveness and embedding never run on 12 MP frames
+"""
+
+import io
+import os
+from typing import Any, Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+from PIL import Image
+
+# Longest side (pixels) of the frame the pipeline works on; 0 disables the cap
+IMAGE_MAX_SIDE = int(os.getenv("IMAGE_MAX_SIDE", "1280"))
+
+# libjpeg can decode at 1/2, 1/4 and 1/8 scale for a fraction of the full cost
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+def image_size(data: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the file header without decoding the pixels; None if unreadable"""
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            return image.size
+    except Exception:
+        return None
+
+def decode_scale(size: Optional[Tuple[int, int]], max_side: int) -> int:
+    """Largest reduced-decode factor that still leaves the longest side at or above max_side"""
+    if not size or max_side <= 0:
+        return 1
+    longest = max(size)
+    for factor, _ in REDUCED_DECODE_FLAGS:
+        if longest // factor >= max_side:
+            return factor
+    return 1
+
+def decode_image(data: bytes, max_side: int = IMAGE_MAX_SIDE) -> Tuple[Optional[np.ndarray], Dict[str, Any]]:
+    """
+    Decode upload bytes into a BGR frame whose longest side is at most max_side.
+
+    JPEGs are decoded at a reduced scale when they are at least twice the cap,
+    then resized down to the cap. EXIF orientation is applied by the decoder,
+    so the frame is upright. Returns (frame or None, details).
+    """
+    size = image_size(data)
+    scale = decode_scale(size, max_side)
+    flags = dict(REDUCED_DECODE_FLAGS).get(scale, cv2.IMREAD_COLOR)
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), flags)
+    details: Dict[str, Any] = {
+        "bytes": len(data),
+        "original_size": list(size) if size else None,
+        "decode_scale": scale,
+    }
+    if image is None:
+        return None, details
+
+    height, width = image.shape[:2]
+    if max_side > 0 and max(height, width) > max_side:
+        ratio = max_side / max(height, width)
+        image = cv2.resize(image, (max(1, round(width * ratio)), max(1, round(height * ratio))), interpolation=cv2.INTER_AREA)
+    details["processed_size"] = [image.shape[1], image.shape[0]]
+    return image, details
@@ -0,0 +1,159 @@
+"""
+Background persistence of attendance capture images
+Keeps GridFS writes off the attendance request path
+"""
+
+import io
+import os
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Dict, Optional
+
+from PIL import Image, ImageOps
+
+# Queue sizing and backpressure
+ATTENDANCE_IMAGE_QUEUE_SIZE = int(os.getenv("ATTENDANCE_IMAGE_QUEUE_SIZE", "256"))
+ATTENDANCE_IMAGE_WORKERS = int(os.getenv("ATTENDANCE_IMAGE_WORKERS", "2"))
+ATTENDANCE_IMAGE_ENQUEUE_TIMEOUT_MS = float(os.getenv("ATTENDANCE_IMAGE_ENQUEUE_TIMEOUT_MS", "200"))
+# Optional re-encoding before storage (0 keeps the uploaded bytes untouched)
+ATTENDANCE_IMAGE_MAX_SIDE = int(os.getenv("ATTENDANCE_IMAGE_MAX_SIDE", "0"))
+ATTENDANCE_IMAGE_QUALITY = int(os.getenv("ATTENDANCE_IMAGE_QUALITY", "0"))
+
+def reencode_jpeg(image_bytes: bytes, max_side: int = 0, quality: int = 0) -> bytes:
+    """
+    Downscale an image so its longest side is at most max_side and re-encode it
+    as JPEG at the given quality. Returns the input unchanged when both are 0 or
+    when re-encoding would not make it smaller.
+    """
+    if not max_side and not quality:
+        return image_bytes
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        img = ImageOps.exif_transpose(img).convert("RGB")
+        if max_side and max(img.size) > max_side:
+            img.thumbnail((max_side, max_side), Image.LANCZOS)
+        output = io.BytesIO()
+        img.save(output, format="JPEG", quality=quality or 85, optimize=True)
+
+    encoded = output.getvalue()
+    return encoded if len(encoded) < len(image_bytes) else image_bytes
+
+class AttendanceImageQueue:
+    """
+    Bounded queue of attendance images waiting to be stored.
+
+    record_attendance writes the attendance record first, then enqueues the
+    capture. Worker tasks re-encode and store each image in a thread and patch
+    the resulting image_id onto the record. When the queue is full, enqueue
+    waits up to enqueue_timeout for room and then drops the image (the record
+    is kept without a photo); drops are counted in the metrics.
+
+    store_image(employee_id, attendance_type, image_bytes) -> image_id and
+    attach_image(attendance_id, image_id) are blocking callables.
+    """
+
+    def __init__(
+        self,
+        store_image: Callable[[str, str, bytes], str],
+        attach_image: Callable[[str, str], Any],
+        max_queue: int = ATTENDANCE_IMAGE_QUEUE_SIZE,
+        workers: int = ATTENDANCE_IMAGE_WORKERS,
+        enqueue_timeout: float = ATTENDANCE_IMAGE_ENQUEUE_TIMEOUT_MS / 1000,
+        max_side: int = ATTENDANCE_IMAGE_MAX_SIDE,
+        quality: int = ATTENDANCE_IMAGE_QUALITY
+    ):
+        self.store_image = store_image
+        self.attach_image = attach_image
+        self.max_queue = max_queue
+        self.workers = workers
+        self.enqueue_timeout = enqueue_timeout
+        self.max_side = max_side
+        self.quality = quality
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks = []
+        self.metrics = {
+            "enqueued": 0,
+            "stored": 0,
+            "failed": 0,
+            "dropped": 0,
+            "backpressure_waits": 0,
+            "queue_high_water": 0,
+            "bytes_received": 0,
+            "bytes_stored": 0,
+            "last_store_ms": 0.0,
+        }
+
+    @property
+    def running(self) -> bool:
+        return any(not task.done() for task in self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"✅ Attendance image queue started (size={self.max_queue}, workers={self.workers})")
+
+    async def stop(self):
+        """Store everything already queued, then stop the workers"""
+        if not self.running:
+            return
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def enqueue(self, attendance_id: str, employee_id: str, attendance_type: str, image_bytes: bytes) -> bool:
+        """Queue an image for storage. Returns False if it was dropped because the queue stayed full."""
+        if not self.running:
+            return False
+
+        item = (attendance_id, employee_id, attendance_type, image_bytes)
+        if self._queue.full():
+            self.metrics["backpressure_waits"] += 1
+            try:
+                await asyncio.wait_for(self._queue.put(item), self.enqueue_timeout)
+            except asyncio.TimeoutError:
+                self.metrics["dropped"] += 1
+                logging.warning(f"⚠️ Attendance image queue full, dropped image for {attendance_id}")
+                return False
+        else:
+            self._queue.put_nowait(item)
+
+        self.metrics["enqueued"] += 1
+        self.metrics["bytes_received"] += len(image_bytes)
+        self.metrics["queue_high_water"] = max(self.metrics["queue_high_water"], self._queue.qsize())
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            **self.metrics,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "queue_capacity": self.max_queue,
+        }
+
+    def _persist(self, attendance_id: str, employee_id: str, attendance_type: str, image_bytes: bytes) -> int:
+        image_bytes = reencode_jpeg(image_bytes, self.max_side, self.quality)
+        image_id = self.store_image(employee_id, attendance_type, image_bytes)
+        self.attach_image(attendance_id, image_id)
+        return len(image_bytes)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            attendance_id, employee_id, attendance_type, image_bytes = await self._queue.get()
+            started = time.perf_counter()
+            try:
+                stored_bytes = await loop.run_in_executor(
+                    None, self._persist, attendance_id, employee_id, attendance_type, image_bytes
+                )
+                self.metrics["stored"] += 1
+                self.metrics["bytes_stored"] += stored_bytes
+            except Exception as e:
+                self.metrics["failed"] += 1
+                logging.error(f"❌ Failed to store attendance image for {attendance_id}: {e}")
+            finally:
+                self.metrics["last_store_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                self._queue.task_done()
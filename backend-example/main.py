@@ -3,9 +3,9 @@ Face Recognition API Backend using FastAPI, DeepFace, and MongoDB
 Run with: uvicorn main:app --host 0.0.0.0 --port 8000 --reload
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form
+from fastapi import FastAPI, File, UploadFile, HTTPException, Depends, Form, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, Response
+from fastapi.responses import JSONResponse, Response, PlainTextResponse
 from pydantic import BaseModel
 from typing import List, Optional
 import cv2
@@ -15,15 +15,51 @@ import os
 import uuid
 import json
 import tempfile
-from datetime import datetime
+from datetime import datetime, date, timedelta
 import logging
 import math
+import time
+import asyncio
+import secrets
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
 
 # Database imports
 from database import db_manager, get_database
+from presence import PRESENCE_RESYNC_SECONDS
+from gallery import FaceGallery, distance_to_confidence
+from gallery_snapshot import (
+    GALLERY_SNAPSHOT_ENABLED, GALLERY_SNAPSHOT_INTERVAL_SECONDS,
+    snapshot_path, write_snapshot, load_snapshot
+)
+from cluster_sync import ClusterSync
+from request_profiler import ProfiledTimings, StageProfiler, profile_lock
+from admission import AdmissionController, AdmissionRejected, RECOGNITION_MAX_IN_FLIGHT, INFERENCE_THREADS_PER_RECOGNITION
+from priority import PriorityScheduler, PriorityMiddleware, PRIORITY_SCHEDULING
+from prewarm import PrewarmScheduler, PREWARM_ENABLED, PREWARM_PEAK_IN_FLIGHT
+from deadline import Deadline, DeadlineExceeded, DeadlineMetrics, DEADLINE_HEADER
+from face_quality import assess_face_quality, QualityGateMetrics
+from image_ingest import decode_image, IMAGE_MAX_SIDE
+from embedding_probe import (
+    ProbeError, check_model_tag, decode_raw_probes, decode_base64_probes,
+    EMBEDDING_MAX_PROBES, EMBEDDING_MODEL_VERSION, EMBEDDING_MODEL_HEADER, EMBEDDING_MODEL_VERSION_HEADER
+)
+from face_tracking import FaceTracker, appearance_signature
+from face_hint import (
+    FaceHintError, FaceHintMetrics, parse_face_box, scale_area, offset_area,
+    padded_region, check_face_region, whole_frame_area
+)
+from sampling_profiler import stack_sampler, collapsed, top_functions, tracemalloc_top
 
 # Timezone utilities
-from timezone_utils import get_local_now, get_local_time_string, get_local_date_start, format_local_datetime, convert_utc_to_local
+from timezone_utils import get_local_now, get_local_time_string, get_local_date_start, format_local_datetime, convert_utc_to_local, parse_local_datetime
+
+# Size the TensorFlow/OpenCV/BLAS thread pools before DeepFace loads TensorFlow, for the
+# largest inference pool this worker runs (it grows during attendance windows when pre-warming)
+from cpu_tuning import apply_cpu_tuning, tuning_status
+apply_cpu_tuning(inference_threads=max(
+    RECOGNITION_MAX_IN_FLIGHT, PREWARM_PEAK_IN_FLIGHT if PREWARM_ENABLED else 0
+) * INFERENCE_THREADS_PER_RECOGNITION)
 
 # Import DeepFace
 try:
@@ -37,6 +73,18 @@ except ImportError as e:
 
 app = FastAPI(title="ITScence API", version="1.0.0", description="ITS Smart Presence - Face Recognition Attendance System")
 
+# Request priorities: interactive and batch endpoints are throttled during attendance windows
+def in_peak_window() -> bool:
+    """Peak = inside the configured check-in or check-out window"""
+    if PRIORITY_SCHEDULING == "always":
+        return True
+    return not determine_attendance_mode()["schedule_info"]["outside_schedule"]
+
+request_priorities = PriorityScheduler(in_peak_window)
+
+# Registered before CORS so the CORS middleware wraps it, including its 503s
+app.add_middleware(PriorityMiddleware, scheduler=request_priorities)
+
 # CORS configuration
 app.add_middleware(
     CORSMiddleware,
@@ -51,6 +99,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Retry-After"],
 )
 
 # Data models
@@ -77,6 +126,8 @@ class RecognitionResult(BaseModel):
     liveness_score: Optional[float] = None
     is_live: Optional[bool] = None
     message: Optional[str] = None
+    presence: Optional[dict] = None  # Today's last attendance event for the recognized employee
+    timings: Optional[dict] = None  # Per-stage start offset and duration (ms), and the liveness/embedding overlap
     timestamp: str
 
 class DeepFaceConfig(BaseModel):
@@ -100,6 +151,29 @@ class DeepFaceConfig(BaseModel):
     saturation_std_threshold: float = 15  # Lower for webcam (was 20)
     illumination_gradient_min: float = 1.0  # Lower for webcam (was 2.0)
     illumination_gradient_max: float = 12.0  # Higher for webcam (was 8.0)
+    # Quality gate: reject unusable frames right after detection, before liveness and embedding
+    enable_quality_gate: bool = True
+    quality_min_face_size: int = 80  # Shorter side of the face box, in pixels
+    quality_min_edge_margin: float = 0.01  # Gap between face box and frame edge, as a fraction of the frame
+    quality_min_brightness: float = 40  # Mean gray level of the face (0-255)
+    quality_max_brightness: float = 220
+    quality_min_sharpness: float = 30  # Laplacian variance of the face at 128 px wide
+    quality_max_roll_degrees: float = 25  # Head tilt from the eye line
+    quality_max_yaw_offset: float = 0.35  # Eye midpoint offset from the face centre (0 = frontal)
+    # Client face hints: kiosks with their own detector may send a face box or a pre-aligned crop
+    accept_client_face_hints: bool = True
+    client_face_box_mode: str = "narrow"  # narrow: detect only around the box; skip: embed the box as given
+    # Kiosks that compute embeddings on the device; they must run their own liveness check
+    accept_client_embeddings: bool = False
+    # Per-kiosk face tracking: consecutive frames of the same face reuse the last full recognition.
+    # Off by default: the reuse check (box overlap + thumbnail correlation) cannot tell apart two people
+    # who swap places within tracking_max_gap_seconds, so only enable it where one person stands at a kiosk at a time
+    enable_face_tracking: bool = False
+    tracking_reembed_every: int = 5  # Full embedding + match at least every N frames of a track
+    tracking_min_iou: float = 0.5  # Overlap with the previous face box
+    tracking_min_appearance: float = 0.8  # Correlation of 16x16 grayscale face thumbnails
+    tracking_max_gap_seconds: float = 2.0  # Longest pause between frames of one track
+    tracking_uncertainty_margin: float = 0.05  # Matches this close to the confidence threshold are never reused
     # Attendance timing settings - Range-based
     check_in_start: str = "06:00"  # Check-in window start time
     check_in_end: str = "09:00"    # Check-in window end time
@@ -107,6 +181,7 @@ class DeepFaceConfig(BaseModel):
     check_out_end: Optional[str] = "19:00"    # Check-out window end time (optional)
     allow_outside_schedule: bool = True  # Allow attendance outside defined ranges
     outside_schedule_requires_confirmation: bool = True  # Require confirmation for out-of-range attendance
+    duplicate_attendance_window_seconds: float = 120  # Repeat of the same attendance type within this window returns the existing record (0 disables)
 
 # Global configuration
 config = DeepFaceConfig()
@@ -117,6 +192,9 @@ CONFIG_FILE = "deepface_config.json"
 
 os.makedirs(TEMP_DIR, exist_ok=True)
 
+# Token for /api/admin endpoints (sent as X-Admin-Token); admin endpoints are disabled when unset
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN", "")
+
 # Load configuration
 def load_config():
     global config
@@ -268,20 +346,331 @@ def get_mode_message(mode_info: dict) -> str:
         return "Schedule check in progress"
 
 # Database startup and shutdown events
+background_tasks = []  # Long-running per-worker tasks, cancelled on shutdown
+
 @app.on_event("startup")
 async def startup_event():
     """Initialize database connection on startup"""
     success = db_manager.connect()
     if success:
         print("✅ Database connected successfully")
+        await db_manager.attendance_writer.start()
+        await db_manager.attendance_images.start()
+        loaded = await db_manager.refresh_presence()
+        print(f"✅ Presence table loaded ({loaded} employees seen today)")
+        background_tasks.append(asyncio.create_task(presence_resync_loop()))
+        await init_cluster_state()
+        if GALLERY_SNAPSHOT_ENABLED:
+            background_tasks.append(asyncio.create_task(gallery_snapshot_loop()))
     else:
         print("⚠️ Database connection failed - will use fallback mode")
+    if PREWARM_ENABLED:
+        background_tasks.append(asyncio.create_task(prewarm_scheduler.run()))
 
 @app.on_event("shutdown")
 async def shutdown_event():
-    """Close database connection on shutdown"""
+    """Flush pending attendance writes and images, then close database connection on shutdown"""
+    for task in background_tasks:
+        task.cancel()
+    await cluster_sync.stop()
+    await save_gallery_snapshot()
+    await db_manager.attendance_images.stop()
+    await db_manager.attendance_writer.stop()
+    inference_pool.shutdown(wait=False, cancel_futures=True)
     db_manager.disconnect()
 
+# Face gallery of the active model, kept in step across workers by cluster_sync
+gallery = FaceGallery(config.model_name, config.distance_metric)
+gallery_snapshot_version = None  # (model, metric, version) of the last snapshot this worker wrote or mapped
+
+async def load_gallery(use_snapshot: bool = False):
+    """(Re)build the face gallery for the active model, from a snapshot if allowed and usable, else from stored embeddings"""
+    global gallery, gallery_snapshot_version
+    loop = asyncio.get_running_loop()
+    new_gallery = FaceGallery(config.model_name, config.distance_metric)
+    # Read the version first: changes made while loading are re-applied by cluster_sync
+    version = await loop.run_in_executor(None, db_manager.get_gallery_version)
+
+    if use_snapshot and GALLERY_SNAPSHOT_ENABLED and await loop.run_in_executor(None, load_snapshot_if_current, new_gallery, version):
+        gallery = new_gallery
+        gallery_snapshot_version = (gallery.model_name, gallery.distance_metric, gallery.version)
+        print(f"✅ Face gallery mapped from snapshot: {gallery.size} employees ({config.model_name}, v{gallery.version} of v{version})")
+        return
+
+    entries = await loop.run_in_executor(None, db_manager.get_face_embeddings, config.model_name)
+    entries += await backfill_face_embeddings({entry["employee_id"] for entry in entries})
+    new_gallery.replace(entries, version)
+    gallery = new_gallery
+    print(f"✅ Face gallery loaded: {gallery.size} employees ({config.model_name}, v{version})")
+    await save_gallery_snapshot()
+
+def load_snapshot_if_current(new_gallery: FaceGallery, latest_version: int) -> bool:
+    """Map the on-disk snapshot if cluster_sync can bring it up to date from the change log"""
+    path = snapshot_path(new_gallery.model_name, new_gallery.distance_metric)
+    if not load_snapshot(path, new_gallery, max_version=latest_version, database_id=db_manager.get_database_id()):
+        return False
+    if new_gallery.version == latest_version:
+        return True
+    # The deltas since the snapshot must still be in the (TTL-trimmed) change log
+    changes = db_manager.get_gallery_changes(new_gallery.version, limit=1)
+    return bool(changes) and changes[0]["seq"] == new_gallery.version + 1
+
+async def save_gallery_snapshot():
+    """Write the current gallery to its snapshot file if it changed since the last write"""
+    global gallery_snapshot_version
+    current = gallery
+    key = (current.model_name, current.distance_metric, current.version)
+    if not GALLERY_SNAPSHOT_ENABLED or key == gallery_snapshot_version:
+        return
+    try:
+        path = snapshot_path(current.model_name, current.distance_metric)
+        await asyncio.get_running_loop().run_in_executor(
+            None, lambda: write_snapshot(path, current, db_manager.get_database_id())
+        )
+        gallery_snapshot_version = key
+    except Exception as e:
+        logging.error(f"Gallery snapshot error: {str(e)}")
+
+async def gallery_snapshot_loop():
+    """Periodically persist the gallery so restarted workers map it instead of rebuilding"""
+    while True:
+        await asyncio.sleep(GALLERY_SNAPSHOT_INTERVAL_SECONDS)
+        await save_gallery_snapshot()
+
+async def backfill_face_embeddings(known_ids: set) -> list:
+    """Compute and store embeddings for enrolled employees that have none for the active model"""
+    if not DEEPFACE_AVAILABLE:
+        return []
+    loop = asyncio.get_running_loop()
+    entries = []
+    # Only employees without a stored embedding have their image downloaded, off the event loop
+    missing = await loop.run_in_executor(None, db_manager.get_employees_missing_embeddings, config.model_name, known_ids)
+    for employee in missing:
+        try:
+            image_data = await loop.run_in_executor(None, db_manager.read_face_image, employee["face_image_id"])
+            if not image_data:
+                continue
+            img = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+            embedding = await loop.run_in_executor(None, compute_embedding, img)
+            await loop.run_in_executor(
+                None, db_manager.store_face_embedding,
+                employee["employee_id"], employee["name"], config.model_name, embedding
+            )
+            entries.append({"employee_id": employee["employee_id"], "name": employee["name"], "embedding": embedding})
+        except Exception as e:
+            print(f"⚠️ Could not compute embedding for {employee['employee_id']}: {e}")
+    if entries:
+        print(f"✅ Backfilled {len(entries)} {config.model_name} embeddings")
+    return entries
+
+async def apply_cluster_config(config_data: dict):
+    """Adopt a config published by another worker"""
+    global config
+    previous = config
+    config = DeepFaceConfig(**config_data)
+    save_config()
+    if (previous.model_name, previous.distance_metric) != (config.model_name, config.distance_metric):
+        await load_gallery(use_snapshot=True)
+
+cluster_sync = ClusterSync(
+    db_manager,
+    get_gallery=lambda: gallery,
+    on_config=apply_cluster_config,
+    on_gallery_reload=load_gallery
+)
+
+async def init_cluster_state():
+    """Adopt the cluster-wide config (or seed it from this worker), load the gallery and start syncing"""
+    global config
+    loop = asyncio.get_running_loop()
+    state = await loop.run_in_executor(None, db_manager.get_cluster_config)
+    if state and state.get("config"):
+        cluster_sync.config_version = state["version"]
+        config = DeepFaceConfig(**state["config"])
+        save_config()
+    else:
+        await cluster_sync.publish_config(config.dict())
+    await load_gallery(use_snapshot=True)
+    await cluster_sync.start()
+
+async def presence_resync_loop():
+    """Periodically merge today's presence from the database to pick up other workers' writes"""
+    while True:
+        await asyncio.sleep(PRESENCE_RESYNC_SECONDS)
+        try:
+            await db_manager.refresh_presence()
+        except Exception as e:
+            logging.error(f"Presence resync error: {str(e)}")
+
+def presence_to_response(entry: Optional[dict]) -> Optional[dict]:
+    """Format a presence table entry for API responses"""
+    if not entry:
+        return None
+    return {
+        "employee_id": entry["employee_id"],
+        "employee_name": entry.get("employee_name"),
+        "last_event_type": entry["last_event_type"],
+        "last_event_at": entry["last_event_at"].isoformat(),
+        "checked_in": entry["last_event_type"] == "check-in",
+        "attendance_id": entry.get("attendance_id")
+    }
+
+# Recognition admission control: bounded in-flight work on a dedicated inference pool
+recognition_admission = AdmissionController()
+recognition_deadlines = DeadlineMetrics()
+quality_gate = QualityGateMetrics()
+face_hints = FaceHintMetrics()
+face_tracker = FaceTracker(lambda: config)
+# Two threads per admitted recognition, so its liveness and embedding stages overlap even at the
+# in-flight limit instead of queueing behind each other's (or the next request's decode)
+inference_pool_size = RECOGNITION_MAX_IN_FLIGHT * INFERENCE_THREADS_PER_RECOGNITION
+inference_pool = ThreadPoolExecutor(max_workers=inference_pool_size, thread_name_prefix="inference")
+
+def resize_inference_pool(in_flight: int) -> dict:
+    """Admit `in_flight` recognitions on a pool sized for them; work already on the old pool finishes there"""
+    global inference_pool, inference_pool_size
+    previous = recognition_admission.max_in_flight
+    workers = in_flight * INFERENCE_THREADS_PER_RECOGNITION
+    if workers != inference_pool_size:
+        old_pool = inference_pool
+        inference_pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="inference")
+        inference_pool_size = workers
+        old_pool.shutdown(wait=False)
+    recognition_admission.resize(in_flight)
+    return {"from": previous, "to": in_flight, "threads": workers}
+
+def recognition_client(request: Request) -> str:
+    """Fairness key: the kiosk's X-Kiosk-Id, else its address as seen by nginx"""
+    return (
+        request.headers.get("X-Kiosk-Id")
+        or request.headers.get("X-Real-IP")
+        or (request.client.host if request.client else "unknown")
+    )
+
+def tracking_key(request: Request) -> Optional[str]:
+    """Face tracks are kept per kiosk (X-Kiosk-Id), and per session when it sends X-Session-Id"""
+    kiosk = request.headers.get("X-Kiosk-Id")
+    if not kiosk:
+        return None
+    session = request.headers.get("X-Session-Id")
+    return f"{kiosk}/{session}" if session else kiosk
+
+def overloaded_response(e: AdmissionRejected) -> JSONResponse:
+    load = recognition_admission.load()
+    return JSONResponse(
+        status_code=503,
+        content={"success": False, "message": f"Server busy: {e.reason}. Please try again.", "timestamp": get_local_now().isoformat()},
+        headers={"Retry-After": str(e.retry_after), "X-Queue-Depth": str(load["queued"])}
+    )
+
+# Schedule-driven pre-warming around the attendance windows
+def attendance_windows() -> list:
+    windows = [("check-in", time_to_minutes(config.check_in_start), time_to_minutes(config.check_in_end))]
+    if config.check_out_start and config.check_out_end:
+        windows.append(("check-out", time_to_minutes(config.check_out_start), time_to_minutes(config.check_out_end)))
+    return windows
+
+def warmup_inference() -> int:
+    """One detection + embedding pass; a blank frame has no face, so the model runs on the whole frame"""
+    frame = np.full((480, 640, 3), 127, dtype=np.uint8)
+    representations = DeepFace.represent(
+        img_path=frame,
+        model_name=config.model_name,
+        detector_backend=config.detector_backend,
+        enforce_detection=False,
+        align=config.align
+    )
+    return len(representations[0]["embedding"])
+
+async def prewarm_models():
+    if not DEEPFACE_AVAILABLE:
+        return "skipped: DeepFace not available"
+    await asyncio.get_running_loop().run_in_executor(inference_pool, lambda: DeepFace.build_model(model_name=config.model_name))
+    return config.model_name
+
+async def prewarm_inferences():
+    if not DEEPFACE_AVAILABLE:
+        return "skipped: DeepFace not available"
+    # One pass per inference thread so each thread's first-call setup happens now
+    loop = asyncio.get_running_loop()
+    await asyncio.gather(*[loop.run_in_executor(inference_pool, warmup_inference) for _ in range(inference_pool_size)])
+    return inference_pool_size
+
+async def prewarm_grow_pool():
+    return resize_inference_pool(PREWARM_PEAK_IN_FLIGHT)
+
+async def prewarm_shrink_pool():
+    return resize_inference_pool(RECOGNITION_MAX_IN_FLIGHT)
+
+async def prewarm_gallery():
+    # A worker that started inside a window (or one cluster_sync kept current) already has it
+    version = await asyncio.get_running_loop().run_in_executor(None, db_manager.get_gallery_version)
+    if (gallery.model_name, gallery.distance_metric) == (config.model_name, config.distance_metric) and gallery.version >= version:
+        return f"current: {gallery.size} employees (v{gallery.version})"
+    await load_gallery(use_snapshot=True)
+    return gallery.stats()["size"]
+
+prewarm_scheduler = PrewarmScheduler(
+    attendance_windows,
+    get_current_time_minutes,
+    ramp_up=[
+        ("inference_pool", prewarm_grow_pool),
+        ("load_models", prewarm_models),
+        ("warmup_inferences", prewarm_inferences),
+        ("refresh_gallery", prewarm_gallery),
+        ("refresh_presence", db_manager.refresh_presence),
+    ],
+    ramp_down=[
+        ("inference_pool", prewarm_shrink_pool),
+    ]
+)
+
+# Recognition stage timings
+pipeline_metrics = {"runs": 0, "overlap_ms_total": 0.0, "embeddings_dropped": 0}
+
+def timed(timings: dict, stage: str, started: float, fn, *args):
+    """
+    Run fn(*args), recording its start offset from `started` and its duration in timings[stage]
+    (and in the request's StageProfiler when timings is a ProfiledTimings)
+    """
+    begin = time.perf_counter()
+    profiler = getattr(timings, "profiler", None)
+    try:
+        if profiler is None:
+            return fn(*args)
+        with profiler.stage(stage):
+            return fn(*args)
+    finally:
+        timings[stage] = {
+            "start_ms": round((begin - started) * 1000, 1),
+            "ms": round((time.perf_counter() - begin) * 1000, 1)
+        }
+
+def stage_overlap_ms(timings: dict, first: str, second: str) -> float:
+    if first not in timings or second not in timings:
+        return 0.0
+    a, b = timings[first], timings[second]
+    overlap = min(a["start_ms"] + a["ms"], b["start_ms"] + b["ms"]) - max(a["start_ms"], b["start_ms"])
+    return round(max(0.0, overlap), 1)
+
+def timing_summary(timings: dict, started: float) -> dict:
+    return {
+        "stages": dict(timings),
+        "liveness_embedding_overlap_ms": stage_overlap_ms(timings, "liveness", "embedding"),
+        "total_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+def record_pipeline_overlap(timings: dict):
+    pipeline_metrics["runs"] += 1
+    pipeline_metrics["overlap_ms_total"] += stage_overlap_ms(timings, "liveness", "embedding")
+
+def discard_task(task: asyncio.Future):
+    """Cancel a task we no longer need, or consume its result so errors aren't reported as unhandled"""
+    if not task.done():
+        task.cancel()
+    elif not task.cancelled():
+        task.exception()
+
 # Helper functions
 def save_temp_image(image_data: str) -> str:
     """Save base64 image data to temporary file"""
@@ -308,15 +697,15 @@ def cleanup_temp_file(file_path: str):
     except Exception as e:
         print(f"Warning: Could not cleanup temp file {file_path}: {e}")
 
-def verify_face_in_image(image_path: str) -> bool:
-    """Verify that there's a valid face in the image"""
+def verify_face_in_image(image) -> bool:
+    """Verify that there's a valid face in the image (path or BGR array)"""
     try:
         if not DEEPFACE_AVAILABLE:
             return True  # Skip verification if DeepFace not available
             
         # Try to detect faces
         faces = DeepFace.extract_faces(
-            img_path=image_path,
+            img_path=image,
             detector_backend=config.detector_backend,
             enforce_detection=False
         )
@@ -325,15 +714,109 @@ def verify_face_in_image(image_path: str) -> bool:
         print(f"Face verification error: {e}")
         return False
 
+def find_faces(image: np.ndarray) -> list:
+    faces = DeepFace.extract_faces(
+        img_path=image,
+        detector_backend=config.detector_backend,
+        enforce_detection=False,
+        align=config.align
+    )
+    if config.enforce_detection:
+        # With enforce_detection off, DeepFace reports "no face" as the whole frame with confidence 0
+        faces = [face for face in faces if face.get("confidence", 1) > 0]
+    return faces
+
+def face_to_bgr(face: np.ndarray) -> np.ndarray:
+    """DeepFace returns faces as RGB floats in [0, 1]; the skip detector expects a BGR frame"""
+    if face.dtype != np.uint8:
+        face = np.clip(face * 255, 0, 255).astype(np.uint8)
+    return cv2.cvtColor(face, cv2.COLOR_RGB2BGR)
+
+def resolve_face_hint(image: np.ndarray, ingest: dict, face_box: Optional[str], pre_cropped: bool) -> Optional[dict]:
+    """Validate a client face hint against the decoded frame; None means full server-side detection"""
+    if not config.accept_client_face_hints or not (face_box or pre_cropped):
+        return None
+    try:
+        if pre_cropped:
+            hint = {"mode": "crop", "area": check_face_region(image, whole_frame_area(image))}
+        else:
+            # The box is in upload pixels; the frame may have been downscaled on decode
+            original, processed = ingest.get("original_size"), ingest.get("processed_size")
+            ratio = max(processed) / max(original) if original and processed else 1.0
+            area = check_face_region(image, scale_area(parse_face_box(face_box), ratio))
+            hint = {"mode": "skip" if config.client_face_box_mode == "skip" else "narrow", "area": area}
+    except FaceHintError as e:
+        face_hints.rejected[e.reason] += 1
+        print(f"⚠️ Client {e}; using full detection")
+        return None
+    face_hints.used[hint["mode"]] += 1
+    return hint
+
+def detect_face_quality(image: np.ndarray, hint: Optional[dict] = None) -> dict:
+    """
+    Face detection on a decoded BGR frame followed by the quality gate on the
+    largest face. With a client hint, detection only runs around the hinted box
+    ("narrow") or not at all ("skip", "crop"), and the face crop to embed is
+    returned as face. Returns face_found, and when the gate ran, its quality
+    result and cost.
+    """
+    face = None
+    if hint and hint["mode"] in ("skip", "crop"):
+        area = hint["area"]
+        face = image[area["y"]:area["y"] + area["h"], area["x"]:area["x"] + area["w"]]
+    else:
+        faces, narrowed = [], False
+        if hint:
+            height, width = image.shape[:2]
+            x0, y0, x1, y1 = padded_region(hint["area"], width, height)
+            faces = [
+                dict(found, facial_area=offset_area(found["facial_area"], x0, y0))
+                for found in find_faces(image[y0:y1, x0:x1])
+            ]
+            narrowed = bool(faces)
+            if not narrowed:
+                face_hints.fallbacks += 1
+        if not faces:
+            faces = find_faces(image)
+        if not faces:
+            return {"face_found": False}
+        largest = max(faces, key=lambda found: found["facial_area"]["w"] * found["facial_area"]["h"])
+        area = largest["facial_area"]
+        if narrowed:
+            # Embed the face detection already aligned instead of detecting again
+            face = face_to_bgr(largest["face"])
+
+    if not config.enable_quality_gate:
+        return {"face_found": True, "area": area, "face": face}
+
+    started = time.perf_counter()
+    quality = assess_face_quality(image, area, config, check_edge_margin=not (hint and hint["mode"] == "crop"))
+    return {"face_found": True, "area": area, "face": face, "quality": quality, "gate_ms": (time.perf_counter() - started) * 1000}
+
+def compute_embedding(img, detector_backend: Optional[str] = None) -> list:
+    """
+    Embedding of the largest face in an image (path or BGR array) with the active model.
+    detector_backend="skip" embeds the image as a face crop without detecting again.
+    """
+    representations = DeepFace.represent(
+        img_path=img,
+        model_name=config.model_name,
+        detector_backend=detector_backend or config.detector_backend,
+        enforce_detection=config.enforce_detection,
+        align=config.align
+    )
+    largest = max(representations, key=lambda r: r.get("facial_area", {}).get("w", 0) * r.get("facial_area", {}).get("h", 0))
+    return largest["embedding"]
+
 # Anti-spoofing detection functions
-def detect_liveness_features(image_path: str) -> dict:
+def detect_liveness_features(image) -> dict:
     """
-    Detect liveness features to prevent photo spoofing.
+    Detect liveness features to prevent photo spoofing (image path or BGR array).
     Returns a dictionary with various liveness indicators.
     """
     try:
         # Read the image
-        img = cv2.imread(image_path)
+        img = cv2.imread(image) if isinstance(image, str) else image
         if img is None:
             return {"error": "Could not read image"}
         
@@ -345,24 +828,14 @@ def detect_liveness_features(image_path: str) -> dict:
         # 1. Texture Analysis - Real faces have more texture variation than photos
         # Calculate Local Binary Pattern variance
         def local_binary_pattern_variance(gray_img):
-            """Calculate texture variance using simplified LBP concept"""
-            height, width = gray_img.shape
-            variance_sum = 0
-            count = 0
-            
-            for y in range(1, height-1):
-                for x in range(1, width-1):
-                    center = gray_img[y, x]
-                    neighbors = [
-                        gray_img[y-1, x-1], gray_img[y-1, x], gray_img[y-1, x+1],
-                        gray_img[y, x+1], gray_img[y+1, x+1], gray_img[y+1, x],
-                        gray_img[y+1, x-1], gray_img[y, x-1]
-                    ]
-                    variance = np.var(neighbors)
-                    variance_sum += variance
-                    count += 1
-            
-            return variance_sum / count if count > 0 else 0
+            """Mean variance of each interior pixel's 8 neighbours (simplified LBP concept), from 3x3 box sums"""
+            if gray_img.shape[0] < 3 or gray_img.shape[1] < 3:
+                return 0
+            g = gray_img.astype(np.float64)
+            center = g[1:-1, 1:-1]
+            neighbour_sum = cv2.boxFilter(g, -1, (3, 3), normalize=False)[1:-1, 1:-1] - center
+            neighbour_sq_sum = cv2.boxFilter(g * g, -1, (3, 3), normalize=False)[1:-1, 1:-1] - center * center
+            return np.mean(neighbour_sq_sum / 8 - (neighbour_sum / 8) ** 2)
         
         texture_variance = local_binary_pattern_variance(gray)
         
@@ -494,7 +967,7 @@ def calculate_liveness_score(features: dict) -> dict:
 # API Endpoints
 @app.get("/")
 async def root():
-    db_stats = await db_manager.get_stats()
+    db_stats = await db_manager.get_cached_stats()
     return {
         "message": "ITScence API is running",
         "version": "1.0.0",
@@ -528,11 +1001,24 @@ async def update_config(new_config: DeepFaceConfig):
         valid_detectors = ["opencv", "ssd", "dlib", "mtcnn", "retinaface", "mediapipe"]
         if new_config.detector_backend not in valid_detectors:
             raise HTTPException(status_code=400, detail=f"Invalid detector. Must be one of: {valid_detectors}")
-        
+
+        # Validate client face box handling
+        valid_box_modes = ["narrow", "skip"]
+        if new_config.client_face_box_mode not in valid_box_modes:
+            raise HTTPException(status_code=400, detail=f"Invalid client face box mode. Must be one of: {valid_box_modes}")
+
+        previous = config
         config = new_config
         save_config()
         
+        # Every other worker picks the new version up from MongoDB
+        await cluster_sync.publish_config(config.dict())
+        if (previous.model_name, previous.distance_metric) != (config.model_name, config.distance_metric):
+            await load_gallery(use_snapshot=True)
+        
         return config
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -547,10 +1033,84 @@ async def get_available_models():
     }
 
 @app.post("/api/recognize-face", response_model=RecognitionResult)
-async def recognize_face(file: UploadFile = File(...)):
-    """Recognize face from uploaded image"""
-    temp_path = None
-    temp_files = []
+async def recognize_face(
+    request: Request,
+    file: UploadFile = File(...),
+    face_box: Optional[str] = Form(None),
+    pre_cropped: bool = Form(False)
+):
+    """
+    Recognize face from uploaded image (503 with Retry-After when the worker is saturated).
+    Work stops once the X-Request-Timeout-Ms budget (or the server default) runs out
+    or the client disconnects.
+    Kiosks with their own face detector may send face_box (JSON x/y/w/h in upload
+    pixels, optionally left_eye/right_eye as [x, y]) or pre_cropped=true when the
+    upload is already an aligned face crop, so the server can narrow or skip detection.
+    """
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), request.is_disconnected)
+    try:
+        await deadline.guard(
+            recognition_admission.acquire(recognition_client(request)), "queue",
+            undo=lambda _: recognition_admission.release()
+        )
+        try:
+            result = await run_recognition(file, deadline, face_box, pre_cropped, tracking_key(request))
+        finally:
+            recognition_admission.release()
+        recognition_deadlines.completed += 1
+        return result
+    except AdmissionRejected as e:
+        logging.warning(f"⚠️ Recognition shed: {e.reason} ({recognition_admission.load()})")
+        return overloaded_response(e)
+    except DeadlineExceeded as e:
+        recognition_deadlines.record_drop(e)
+        logging.warning(f"⏱️ Recognition dropped: {e} (budget {deadline.seconds:.1f}s)")
+        return JSONResponse(
+            status_code=504,
+            content={"success": False, "message": f"Request abandoned: {e}", "timestamp": get_local_now().isoformat()}
+        )
+
+async def check_liveness(image: np.ndarray, deadline: Deadline, timings: dict, started: float) -> dict:
+    """Anti-spoofing / liveness detection on the inference pool (if enabled)"""
+    if not config.enable_liveness_detection:
+        print("⚠️ Liveness detection disabled")
+        return {
+            'liveness_score': 1.0,
+            'is_live': True,
+            'reason': 'Liveness detection disabled'
+        }
+    print("🔍 Performing liveness detection...")
+    loop = asyncio.get_running_loop()
+    liveness_features = await deadline.guard(
+        loop.run_in_executor(inference_pool, timed, timings, "liveness", started, detect_liveness_features, image), "liveness"
+    )
+    liveness_result = calculate_liveness_score(liveness_features)
+    print(f"📊 Liveness Score: {liveness_result['liveness_score']}, Live: {liveness_result['is_live']}")
+    print(f"📋 Reason: {liveness_result['reason']}")
+    return liveness_result
+
+def liveness_failed(liveness_result: dict, timings: dict, started: float) -> RecognitionResult:
+    return RecognitionResult(
+        success=False,
+        liveness_score=liveness_result['liveness_score'],
+        is_live=False,
+        message=f"Anti-spoofing failed: {liveness_result['reason']}",
+        timings=timing_summary(timings, started),
+        timestamp=get_local_now().isoformat()
+    )
+
+async def run_recognition(
+    file: UploadFile,
+    deadline: Deadline,
+    face_box: Optional[str] = None,
+    pre_cropped: bool = False,
+    kiosk: Optional[str] = None,
+    profiler: Optional[StageProfiler] = None
+) -> RecognitionResult:
+    """The recognize-face pipeline; CPU-bound stages run on the inference pool"""
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    timings = ProfiledTimings(profiler) if profiler else {}
     
     try:
         if not DEEPFACE_AVAILABLE:
@@ -560,158 +1120,137 @@ async def recognize_face(file: UploadFile = File(...)):
                 timestamp=get_local_now().isoformat()
             )
 
-        # Save uploaded file temporarily
-        temp_path = os.path.join(TEMP_DIR, f"recognition_{uuid.uuid4()}.jpg")
-        temp_files.append(temp_path)
-        
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # Decode once, capped to IMAGE_MAX_SIDE; detection, quality, liveness and embedding share the frame.
+        # Recognition never stores the upload, so the original bytes are dropped after decoding
+        content = await file.read()
+        image, ingest = await deadline.guard(loop.run_in_executor(inference_pool, timed, timings, "decode", started, decode_image, content), "decode")
+        del content
+        if image is None:
+            return RecognitionResult(
+                success=False,
+                message="Could not read the uploaded image",
+                timestamp=get_local_now().isoformat()
+            )
 
-        # Verify there's a face in the image
-        if not verify_face_in_image(temp_path):
+        # Verify there's a usable face in the image, around the client's face box if it sent one
+        hint = resolve_face_hint(image, ingest, face_box, pre_cropped)
+        detection = await deadline.guard(loop.run_in_executor(inference_pool, timed, timings, "detection", started, detect_face_quality, image, hint), "detection")
+        if hint:
+            timings["detection"]["face_hint"] = hint["mode"]
+        if not detection["face_found"]:
             return RecognitionResult(
                 success=False,
                 message="No face detected in the image",
                 timestamp=get_local_now().isoformat()
             )
-
-        # Perform anti-spoofing / liveness detection (if enabled)
-        if config.enable_liveness_detection:
-            print("🔍 Performing liveness detection...")
-            liveness_features = detect_liveness_features(temp_path)
-            liveness_result = calculate_liveness_score(liveness_features)
-            
-            print(f"📊 Liveness Score: {liveness_result['liveness_score']}, Live: {liveness_result['is_live']}")
-            print(f"📋 Reason: {liveness_result['reason']}")
-            
-            # Check if face passes liveness test
-            if not liveness_result['is_live']:
+        quality = detection.get("quality")
+        if quality:
+            quality_gate.record_check(quality["passed"], quality["reason"], detection["gate_ms"])
+            if not quality["passed"]:
+                print(f"🚫 Quality gate: {quality['reason']} {quality['metrics']}")
                 return RecognitionResult(
                     success=False,
-                    liveness_score=liveness_result['liveness_score'],
-                    is_live=False,
-                    message=f"Anti-spoofing failed: {liveness_result['reason']}",
+                    message=quality["message"],
                     timestamp=get_local_now().isoformat()
                 )
-        else:
-            print("⚠️ Liveness detection disabled")
-            liveness_result = {
-                'liveness_score': 1.0,
-                'is_live': True,
-                'reason': 'Liveness detection disabled'
-            }
 
-        # Get all enrolled face images from database
-        face_images = await db_manager.get_all_face_images()
-        
-        if not face_images:
+        # Match against the in-memory gallery of enrolled embeddings
+        if gallery.size == 0:
             return RecognitionResult(
                 success=False,
                 message="No enrolled faces found. Please enroll employees first.",
                 timestamp=get_local_now().isoformat()
             )
 
-        # Create temporary face database for recognition
-        face_db_dir = os.path.join(TEMP_DIR, f"face_db_{uuid.uuid4()}")
-        os.makedirs(face_db_dir, exist_ok=True)
-        
-        try:
-            # Save all face images to temporary directory
-            for face_data in face_images:
-                face_file_path = os.path.join(face_db_dir, f"{face_data['employee_id']}_face.jpg")
-                with open(face_file_path, 'wb') as f:
-                    f.write(face_data['image_data'])
-                temp_files.append(face_file_path)
-
-            # Perform face recognition
-            result = DeepFace.find(
-                img_path=temp_path,
-                db_path=face_db_dir,
-                model_name=config.model_name,
-                distance_metric=config.distance_metric,
-                detector_backend=config.detector_backend,
-                enforce_detection=config.enforce_detection,
-                align=config.align,
-                silent=True
-            )
-
-            if len(result) > 0 and not result[0].empty:
-                # Face found - extract employee info
-                best_match = result[0].iloc[0]
-                identity_path = best_match['identity']
-                
-                # Try to get distance from different possible column names
-                distance = None
-                possible_distance_columns = [config.distance_metric, 'distance', f'{config.distance_metric}_distance']
-                
-                for col_name in possible_distance_columns:
-                    if col_name in best_match.index:
-                        distance = best_match[col_name]
-                        break
-                
-                if distance is None:
-                    # Fallback: use the last numeric column (usually the distance)
-                    numeric_columns = [col for col in best_match.index if isinstance(best_match[col], (int, float))]
-                    if numeric_columns:
-                        distance = best_match[numeric_columns[-1]]
-                    else:
-                        distance = 0.5
-                        print(f"⚠️ Could not find distance column. Available columns: {list(best_match.index)}")
-                
-                # Convert distance to confidence based on metric type
-                if config.distance_metric == "cosine":
-                    confidence = (1 - distance)
-                elif config.distance_metric in ["euclidean", "euclidean_l2"]:
-                    confidence = max(0, (1 - min(distance, 2) / 2))
-                else:
-                    confidence = max(0, (1 - distance))
-                
-                # Ensure confidence is within valid range (0-1)
-                confidence = max(0, min(1, confidence))
-                
-                if confidence >= config.confidence_threshold:
-                    # Extract employee ID from filename
-                    filename_base = os.path.basename(identity_path)
-                    employee_id = filename_base.split('_')[0]
-                    
-                    # Find employee in database
-                    employee_data = await db_manager.get_employee(employee_id)
-                    
-                    if employee_data:
-                        employee = Employee(
-                            id=employee_data["employee_id"],
-                            name=employee_data["name"],
-                            department=employee_data.get("department"),
-                            email=employee_data.get("email"),
-                            face_enrolled=employee_data.get("face_enrolled", False)
-                        )
-                        
-                        return RecognitionResult(
-                            success=True,
-                            employee=employee,
-                            confidence=round(confidence, 4),
-                            liveness_score=liveness_result['liveness_score'],
-                            is_live=liveness_result['is_live'],
-                            message=liveness_result['reason'],
-                            timestamp=get_local_now().isoformat()
-                        )
-
+        # The same face as this kiosk's previous frames: reuse that recognition, skipping embedding and matching
+        tracking = config.enable_face_tracking and kiosk is not None
+        signature = appearance_signature(image, detection["area"]) if tracking else None
+        track = face_tracker.continue_track(kiosk, detection["area"], signature) if tracking else None
+        if track:
+            # The identity is reused, but every frame still gets its own liveness check (a few ms of
+            # OpenCV/numpy filters), so a photo swapped in at the same spot does not inherit the previous pass
+            liveness_result = await check_liveness(image, deadline, timings, started)
+            if not liveness_result['is_live']:
+                face_tracker.end(kiosk)
+                return liveness_failed(liveness_result, timings, started)
             return RecognitionResult(
-                success=False,
-                message=f"Face not recognized or confidence below {config.confidence_threshold:.1%}",
+                success=True,
+                employee=track["employee"],
+                confidence=round(track["confidence"], 4),
+                liveness_score=liveness_result['liveness_score'],
+                is_live=liveness_result['is_live'],
+                message=f"Tracked face ({track['frames_since_embedding']} frame(s) since the last full recognition)",
+                presence=presence_to_response(db_manager.presence.get(track["employee_id"])),
+                timings=timing_summary(timings, started),
                 timestamp=get_local_now().isoformat()
             )
+        downstream_started = time.perf_counter()
 
+        # Embedding starts right away, alongside liveness; a failed liveness check drops it.
+        # A face crop from a hinted detection is embedded as is, without detecting again
+        face = detection.get("face")
+        embed_args = (face, "skip") if face is not None else (image,)
+        embedding_task = asyncio.ensure_future(deadline.guard(
+            loop.run_in_executor(inference_pool, timed, timings, "embedding", started, compute_embedding, *embed_args), "embedding"
+        ))
+        try:
+            liveness_result = await check_liveness(image, deadline, timings, started)
+            if not liveness_result['is_live']:
+                pipeline_metrics["embeddings_dropped"] += 1
+                if tracking:
+                    face_tracker.end(kiosk)
+                return liveness_failed(liveness_result, timings, started)
+
+            embedding = await embedding_task
         finally:
-            # Clean up temporary face database
-            try:
-                import shutil
-                if os.path.exists(face_db_dir):
-                    shutil.rmtree(face_db_dir)
-            except Exception as e:
-                print(f"Warning: Could not cleanup face database: {e}")
+            discard_task(embedding_task)
+
+        employee_id, _, distance = await deadline.guard(
+            loop.run_in_executor(inference_pool, timed, timings, "matching", started, gallery.match, embedding), "matching"
+        )
+        if quality:
+            quality_gate.record_downstream((time.perf_counter() - downstream_started) * 1000)
+        record_pipeline_overlap(timings)
+        confidence = distance_to_confidence(distance, config.distance_metric)
+
+        if confidence >= config.confidence_threshold:
+            # Find employee in database
+            employee_data = await deadline.guard(db_manager.get_employee(employee_id), "employee_lookup")
+            
+            if employee_data:
+                employee = Employee(
+                    id=employee_data["employee_id"],
+                    name=employee_data["name"],
+                    department=employee_data.get("department"),
+                    email=employee_data.get("email"),
+                    face_enrolled=employee_data.get("face_enrolled", False)
+                )
+                if tracking:
+                    face_tracker.update(kiosk, detection["area"], signature, employee, confidence, liveness_result['liveness_score'], embedding)
+                
+                return RecognitionResult(
+                    success=True,
+                    employee=employee,
+                    confidence=round(confidence, 4),
+                    liveness_score=liveness_result['liveness_score'],
+                    is_live=liveness_result['is_live'],
+                    message=liveness_result['reason'],
+                    presence=presence_to_response(db_manager.presence.get(employee.id)),
+                    timings=timing_summary(timings, started),
+                    timestamp=get_local_now().isoformat()
+                )
 
+        if tracking:
+            face_tracker.end(kiosk)
+        return RecognitionResult(
+            success=False,
+            message=f"Face not recognized or confidence below {config.confidence_threshold:.1%}",
+            timings=timing_summary(timings, started),
+            timestamp=get_local_now().isoformat()
+        )
+
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         error_message = str(e)
         logging.error(f"Face recognition error: {error_message}")
@@ -735,11 +1274,108 @@ async def recognize_face(file: UploadFile = File(...)):
                 message=f"Recognition failed: {error_message}",
                 timestamp=get_local_now().isoformat()
             )
-    
-    finally:
-        # Clean up all temporary files
-        for temp_file in temp_files:
-            cleanup_temp_file(temp_file)
+
+# Embedding-only recognition for kiosks that compute the embedding on the device
+embedding_probe_metrics = {"requests": 0, "probes": 0, "recognized": 0, "rejected": 0}
+
+def require_client_embeddings():
+    if not config.accept_client_embeddings:
+        raise HTTPException(status_code=403, detail="Client-computed embeddings are not accepted by this server")
+
+async def match_probe_request(request: Request, max_probes: int) -> List[RecognitionResult]:
+    """
+    Decode the probes of an embedding request, check their model tag against
+    the gallery and match them in one pass. The body is either raw float32
+    vectors with the X-Embedding-Model / X-Embedding-Model-Version headers, or
+    JSON {model_name, model_version, embedding | embeddings} in base64.
+    """
+    embedding_probe_metrics["requests"] += 1
+    body = await request.body()
+    try:
+        if request.headers.get("content-type", "").startswith("application/json"):
+            try:
+                payload = json.loads(body)
+                values = payload["embeddings"] if "embeddings" in payload else [payload["embedding"]]
+                model_name, model_version = payload.get("model_name"), payload.get("model_version")
+            except (ValueError, KeyError, TypeError, AttributeError):
+                raise ProbeError("JSON body must have model_name, model_version and embedding or embeddings")
+            check_model_tag(model_name, model_version, gallery.model_name)
+            probes = decode_base64_probes(values, gallery.dimension, max_probes)
+        else:
+            check_model_tag(request.headers.get(EMBEDDING_MODEL_HEADER), request.headers.get(EMBEDDING_MODEL_VERSION_HEADER), gallery.model_name)
+            probes = decode_raw_probes(body, gallery.dimension, max_probes)
+    except ProbeError as e:
+        embedding_probe_metrics["rejected"] += 1
+        raise HTTPException(status_code=e.status_code, detail=str(e))
+
+    embedding_probe_metrics["probes"] += len(probes)
+    loop = asyncio.get_running_loop()
+    matches = await loop.run_in_executor(None, gallery.match_many, probes)
+    accepted = [
+        match if match and distance_to_confidence(match[2], config.distance_metric) >= config.confidence_threshold else None
+        for match in matches
+    ]
+    employees = await asyncio.gather(*(db_manager.get_employee(match[0]) for match in accepted if match))
+    found = iter(employees)
+
+    results = []
+    for match in accepted:
+        employee_data = next(found) if match else None
+        if not employee_data:
+            results.append(RecognitionResult(
+                success=False,
+                message=f"Face not recognized or confidence below {config.confidence_threshold:.1%}",
+                timestamp=get_local_now().isoformat()
+            ))
+            continue
+        embedding_probe_metrics["recognized"] += 1
+        results.append(RecognitionResult(
+            success=True,
+            employee=Employee(
+                id=employee_data["employee_id"],
+                name=employee_data["name"],
+                department=employee_data.get("department"),
+                email=employee_data.get("email"),
+                face_enrolled=employee_data.get("face_enrolled", False)
+            ),
+            confidence=round(distance_to_confidence(match[2], config.distance_metric), 4),
+            message="Matched device-computed embedding (liveness checked on the device)",
+            presence=presence_to_response(db_manager.presence.get(employee_data["employee_id"])),
+            timestamp=get_local_now().isoformat()
+        ))
+    return results
+
+@app.get("/api/recognize-embedding/model")
+async def get_embedding_model():
+    """The model tag, size and metric a kiosk's embeddings must match"""
+    return {
+        "accepted": config.accept_client_embeddings,
+        "model_name": gallery.model_name,
+        "model_version": EMBEDDING_MODEL_VERSION,
+        "dimension": gallery.dimension,
+        "distance_metric": gallery.distance_metric,
+        "max_probes": EMBEDDING_MAX_PROBES
+    }
+
+@app.post("/api/recognize-embedding", response_model=RecognitionResult)
+async def recognize_embedding(request: Request):
+    """Recognize one device-computed probe embedding (see match_probe_request for the body)"""
+    require_client_embeddings()
+    if gallery.size == 0:
+        return RecognitionResult(
+            success=False,
+            message="No enrolled faces found. Please enroll employees first.",
+            timestamp=get_local_now().isoformat()
+        )
+    return (await match_probe_request(request, max_probes=1))[0]
+
+@app.post("/api/recognize-embeddings", response_model=List[RecognitionResult])
+async def recognize_embeddings(request: Request):
+    """Recognize up to EMBEDDING_MAX_PROBES device-computed probe embeddings in one call"""
+    require_client_embeddings()
+    if gallery.size == 0:
+        raise HTTPException(status_code=409, detail="No enrolled faces found. Please enroll employees first.")
+    return await match_probe_request(request, EMBEDDING_MAX_PROBES)
 
 @app.post("/api/attendance", response_model=AttendanceRecord)
 async def record_attendance(
@@ -748,36 +1384,32 @@ async def record_attendance(
     confidence: float = Form(...),
     file: UploadFile = File(None)
 ):
-    """Record attendance for an employee with optional captured image"""
-    temp_path = None
-    
+    """
+    Record attendance for an employee with optional captured image.
+    The image is stored in the background after the record is written;
+    its photo URL starts serving once storage completes.
+    """
     try:
+        # Repeated submission of the same event (e.g. a kiosk retry) returns the existing record
+        duplicate = db_manager.presence.find_duplicate(employee_id, type, config.duplicate_attendance_window_seconds)
+        if duplicate and duplicate.get("attendance_id"):
+            print(f"ℹ️ Duplicate {type} for {employee_id} suppressed")
+            return AttendanceRecord(
+                id=duplicate["attendance_id"],
+                employee_id=employee_id,
+                employee_name=duplicate.get("employee_name") or "",
+                type=type,
+                timestamp=duplicate["last_event_at"].isoformat(),
+                confidence=duplicate.get("confidence") or confidence,
+                image_url=None
+            )
+        
         # Find employee in database
         employee_data = await db_manager.get_employee(employee_id)
         if not employee_data:
             raise HTTPException(status_code=404, detail="Employee not found")
         
-        # Handle captured image if provided
-        image_id = None
-        if file:
-            try:
-                # Save uploaded file temporarily
-                temp_path = os.path.join(TEMP_DIR, f"attendance_{uuid.uuid4()}.jpg")
-                with open(temp_path, "wb") as buffer:
-                    content = await file.read()
-                    buffer.write(content)
-                
-                # Read image data for storage
-                with open(temp_path, 'rb') as f:
-                    image_data = base64.b64encode(f.read()).decode('utf-8')
-                
-                # Store attendance image in GridFS
-                image_id = await db_manager.store_attendance_image(employee_id, type, image_data)
-                print(f"✅ Stored attendance image: {image_id}")
-                
-            except Exception as e:
-                print(f"⚠️ Failed to store attendance image: {e}")
-                # Continue without image if storage fails
+        image_bytes = await file.read() if file else None
         
         # Create attendance record
         attendance_data = {
@@ -787,12 +1419,21 @@ async def record_attendance(
             "type": type,
             "timestamp": get_local_now(),  # Use local timezone
             "confidence": confidence,
-            "image_id": image_id
+            "image_id": None
         }
         
         # Store in database
         attendance_record = await db_manager.create_attendance(attendance_data)
         
+        # Hand the captured image to the background persistence queue
+        image_queued = False
+        if image_bytes:
+            image_queued = await db_manager.attendance_images.enqueue(
+                attendance_record["attendance_id"], employee_id, type, image_bytes
+            )
+            if not image_queued:
+                print(f"⚠️ Attendance image not stored for {attendance_record['attendance_id']}")
+        
         # Convert to response format with local timezone
         timestamp_str = attendance_record["timestamp"]
         if isinstance(attendance_record["timestamp"], datetime):
@@ -811,56 +1452,148 @@ async def record_attendance(
             type=attendance_record["type"],
             timestamp=timestamp_str,
             confidence=attendance_record["confidence"],
-            image_url=f"/api/attendance/{attendance_record['attendance_id']}/photo" if image_id else None
+            image_url=f"/api/attendance/{attendance_record['attendance_id']}/photo" if image_queued else None
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Attendance recording error: {str(e)}")
         raise HTTPException(status_code=500, detail=str(e))
-    
-    finally:
-        if temp_path:
-            cleanup_temp_file(temp_path)
 
 @app.get("/api/attendance", response_model=List[AttendanceRecord])
-async def get_attendance_history(limit: int = 50):
-    """Get attendance history with timezone conversion"""
+async def get_attendance_history(
+    response: Response,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    employee_id: Optional[str] = None,
+    type: Optional[str] = None,
+    start: Optional[str] = None,
+    end: Optional[str] = None
+):
+    """
+    Get attendance history, newest first, with keyset pagination.
+    Pass the X-Next-Cursor response header back as `cursor` to fetch the next page.
+    `start`/`end` accept ISO dates or datetimes in local time; a date-only `end` is inclusive.
+    """
     try:
-        attendance_records = await db_manager.get_attendance_history(limit=limit)
-        
-        # Convert to response format with timezone conversion
+        try:
+            start_dt = parse_local_datetime(start) if start else None
+            end_dt = parse_local_datetime(end, end_of_day=True) if end else None
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid date range: {str(e)}")
+
+        try:
+            attendance_records, next_cursor = await db_manager.get_attendance_page(
+                limit=limit,
+                cursor=cursor,
+                employee_id=employee_id,
+                attendance_type=type,
+                start=start_dt,
+                end=end_dt
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        if next_cursor:
+            response.headers["X-Next-Cursor"] = next_cursor
+
+        # Build plain dicts; response_model validates them once on the way out
         result = []
         for record in attendance_records:
-            # Convert timestamp to local timezone if it's a datetime object
-            timestamp_str = record["timestamp"]
-            if isinstance(record["timestamp"], datetime):
-                # Check if timestamp has timezone info
-                if record["timestamp"].tzinfo is None:
-                    # Assume UTC if no timezone info (for existing records)
-                    import pytz
-                    utc_dt = record["timestamp"].replace(tzinfo=pytz.UTC)
-                    local_dt = convert_utc_to_local(utc_dt)
-                    timestamp_str = local_dt.isoformat()
-                else:
-                    # Already has timezone info, convert to local
-                    local_dt = convert_utc_to_local(record["timestamp"])
-                    timestamp_str = local_dt.isoformat()
-            
-            result.append(AttendanceRecord(
-                id=record.get("attendance_id", str(record.get("_id", ""))),
-                employee_id=record["employee_id"],
-                employee_name=record["employee_name"],
-                type=record["type"],
-                timestamp=timestamp_str,
-                confidence=record["confidence"],
-                image_url=f"/api/attendance/{record.get('attendance_id', str(record.get('_id', '')))}/photo" if record.get("image_id") else None
-            ))
-        
+            record_id = record.get("attendance_id", record["_id"])
+            timestamp = record["timestamp"]
+            if isinstance(timestamp, datetime):
+                # Naive timestamps from MongoDB are UTC; convert to local timezone
+                timestamp = convert_utc_to_local(timestamp).isoformat()
+
+            result.append({
+                "id": record_id,
+                "employee_id": record["employee_id"],
+                "employee_name": record["employee_name"],
+                "type": record["type"],
+                "timestamp": timestamp,
+                "confidence": record["confidence"],
+                "image_url": f"/api/attendance/{record_id}/photo" if record.get("image_id") else None
+            })
+
         return result
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Error getting attendance history: {str(e)}")
         return []
 
+def get_period_date_range(period: str, day: date) -> tuple:
+    """Get the inclusive (start, end) local dates of the day, week (Mon-Sun) or month containing `day`"""
+    if period == "day":
+        return day, day
+    if period == "week":
+        start = day - timedelta(days=day.weekday())
+        return start, start + timedelta(days=6)
+    if period == "month":
+        start = day.replace(day=1)
+        next_month = (start + timedelta(days=32)).replace(day=1)
+        return start, next_month - timedelta(days=1)
+    raise ValueError("period must be one of: day, week, month")
+
+@app.get("/api/attendance/summary")
+async def get_attendance_summary(period: str = "day", date: Optional[str] = None):
+    """
+    Get per-employee daily attendance summaries (first check-in, last check-out, status)
+    for the whole company over a day, week or month. `date` defaults to today (local time).
+    """
+    try:
+        try:
+            day = datetime.strptime(date, "%Y-%m-%d").date() if date else get_local_now().date()
+            start_date, end_date = get_period_date_range(period, day)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        summaries = await db_manager.get_attendance_summaries(start_date.isoformat(), end_date.isoformat())
+
+        check_in_end = time_to_minutes(config.check_in_end)
+        for summary in summaries:
+            first_check_in = summary.get("first_check_in")
+            if isinstance(first_check_in, datetime):
+                local_check_in = convert_utc_to_local(first_check_in)
+                summary["late"] = local_check_in.hour * 60 + local_check_in.minute > check_in_end
+            else:
+                summary["late"] = False
+            for field in ("first_check_in", "last_check_out", "last_event_at", "updated_at"):
+                if isinstance(summary.get(field), datetime):
+                    summary[field] = convert_utc_to_local(summary[field]).isoformat()
+
+        return {
+            "period": period,
+            "start_date": start_date.isoformat(),
+            "end_date": end_date.isoformat(),
+            "count": len(summaries),
+            "summaries": summaries
+        }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error getting attendance summary: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/api/presence")
+async def get_presence():
+    """Whole-company presence for today, served from the in-process presence table"""
+    entries = sorted(db_manager.presence.snapshot(), key=lambda entry: entry["employee_id"])
+    return {
+        **db_manager.presence.stats(),
+        "employees": [presence_to_response(entry) for entry in entries]
+    }
+
+@app.get("/api/presence/{employee_id}")
+async def get_employee_presence(employee_id: str):
+    """Today's last attendance event for one employee (null if none yet today)"""
+    return {
+        "employee_id": employee_id,
+        "presence": presence_to_response(db_manager.presence.get(employee_id))
+    }
+
 @app.get("/api/employees", response_model=List[Employee])
 async def get_employees():
     """Get all employees"""
@@ -890,8 +1623,6 @@ async def enroll_employee(
     file: UploadFile = File(...)
 ):
     """Enroll a new employee with their face"""
-    temp_path = None
-    
     try:
         # Validate input
         if not name.strip():
@@ -900,23 +1631,27 @@ async def enroll_employee(
         if not DEEPFACE_AVAILABLE:
             raise HTTPException(status_code=500, detail="DeepFace is not available")
         
-        # Generate employee ID
-        existing_employees = await db_manager.get_all_employees()
-        employee_id = f"EMP{len(existing_employees) + 1:03d}"
-        
-        # Save uploaded file temporarily
-        temp_path = os.path.join(TEMP_DIR, f"enroll_{uuid.uuid4()}.jpg")
-        with open(temp_path, "wb") as buffer:
-            content = await file.read()
-            buffer.write(content)
+        # The original upload is kept as the profile photo; faces are processed at the capped resolution
+        content = await file.read()
+        image, _ = decode_image(content)
+        if image is None:
+            raise HTTPException(status_code=400, detail="Could not read the uploaded image")
         
         # Verify there's a valid face in the image
-        if not verify_face_in_image(temp_path):
+        if not verify_face_in_image(image):
             raise HTTPException(status_code=400, detail="No valid face detected in the image")
         
+        # Compute the gallery embedding once, at enrollment time
+        try:
+            embedding = compute_embedding(image)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Could not compute face embedding: {str(e)}")
+        
+        # Allocate employee ID (atomic counter, safe across workers)
+        employee_id = await db_manager.allocate_employee_id()
+        
         # Read image data for storage
-        with open(temp_path, 'rb') as f:
-            image_data = base64.b64encode(f.read()).decode('utf-8')
+        image_data = base64.b64encode(content).decode('utf-8')
         
         # Create employee data
         employee_data = {
@@ -930,6 +1665,12 @@ async def enroll_employee(
         # Store employee and face image in database
         created_employee = await db_manager.create_employee(employee_data, image_data)
         
+        # Store the embedding, apply it locally and announce it to the other workers
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, db_manager.store_face_embedding, employee_id, name, config.model_name, embedding)
+        gallery.upsert(employee_id, name, embedding)
+        await cluster_sync.publish_gallery_change("upsert", employee_id)
+        
         # Convert to response format
         return Employee(
             id=created_employee["employee_id"],
@@ -944,10 +1685,6 @@ async def enroll_employee(
     except Exception as e:
         logging.error(f"Employee enrollment error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Enrollment failed: {str(e)}")
-    
-    finally:
-        if temp_path:
-            cleanup_temp_file(temp_path)
 
 @app.delete("/api/employees/{employee_id}")
 async def delete_employee(employee_id: str):
@@ -962,6 +1699,8 @@ async def delete_employee(employee_id: str):
         success = await db_manager.delete_employee(employee_id)
         
         if success:
+            gallery.remove(employee_id)
+            await cluster_sync.publish_gallery_change("delete", employee_id)
             return {"message": f"Employee {employee['name']} deleted successfully"}
         else:
             raise HTTPException(status_code=500, detail="Failed to delete employee")
@@ -1003,6 +1742,10 @@ async def update_employee(
         if not success:
             raise HTTPException(status_code=500, detail="Failed to update employee")
         
+        # Gallery entries carry the employee name
+        if updated_data["name"] != existing_employee["name"]:
+            await cluster_sync.publish_gallery_change("upsert", employee_id)
+        
         # Get the updated employee data
         updated_employee = await db_manager.get_employee(employee_id)
         
@@ -1086,10 +1829,15 @@ async def get_attendance_photo(attendance_id: str):
         logging.error(f"Attendance photo retrieval error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Failed to get attendance photo: {str(e)}")
 
+@app.get("/livez")
+async def liveness_probe():
+    """Liveness probe - confirms the worker is serving requests; never touches MongoDB"""
+    return {"status": "alive"}
+
 @app.get("/health")
 async def health_check():
-    """Health check endpoint"""
-    db_stats = await db_manager.get_stats()
+    """Health check endpoint (database stats served from the in-process cache)"""
+    db_stats = await db_manager.get_cached_stats()
     
     return {
         "status": "healthy",
@@ -1102,10 +1850,151 @@ async def health_check():
         "database": db_stats
     }
 
+@app.get("/api/metrics")
+async def get_metrics():
+    """Per-worker pipeline metrics (queues, batching, backpressure)"""
+    return {
+        "timestamp": get_local_now().isoformat(),
+        "pid": os.getpid(),
+        "attendance_writer": db_manager.attendance_writer.stats(),
+        "attendance_summary": db_manager.summary_stats(),
+        "attendance_images": db_manager.attendance_images.stats(),
+        "presence": db_manager.presence.stats(),
+        "gallery": gallery.stats(),
+        "cluster_sync": cluster_sync.stats(),
+        "recognition_admission": recognition_admission.stats(),
+        "recognition_deadlines": recognition_deadlines.stats(),
+        "quality_gate": quality_gate.stats(),
+        "face_hints": face_hints.stats(),
+        "embedding_probes": embedding_probe_metrics,
+        "face_tracking": face_tracker.stats(),
+        "cpu_tuning": tuning_status(),
+        "recognition_pipeline": {
+            **pipeline_metrics,
+            "avg_overlap_ms": round(pipeline_metrics["overlap_ms_total"] / pipeline_metrics["runs"], 1) if pipeline_metrics["runs"] else 0.0
+        },
+        "request_priorities": request_priorities.stats(),
+        "inference_pool": {"workers": inference_pool_size, "threads_per_recognition": INFERENCE_THREADS_PER_RECOGNITION},
+        "prewarm": prewarm_scheduler.stats() if PREWARM_ENABLED else {"enabled": False},
+        "profiling": {"cpu_sampling": stack_sampler.running, "tracemalloc": tracemalloc.is_tracing()}
+    }
+
+@app.get("/api/recognition/load")
+async def get_recognition_load():
+    """This worker's recognition queue depth, cheap enough to poll for load balancing and autoscaling"""
+    return {"pid": os.getpid(), **recognition_admission.load()}
+
+def require_admin_token(x_admin_token: Optional[str] = Header(None)):
+    """Dependency for admin endpoints: the X-Admin-Token header must match ADMIN_API_TOKEN"""
+    if not ADMIN_API_TOKEN:
+        raise HTTPException(status_code=404, detail="Admin endpoints are disabled (ADMIN_API_TOKEN not set)")
+    if not x_admin_token or not secrets.compare_digest(x_admin_token, ADMIN_API_TOKEN):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+@app.get("/api/admin/profile/cpu", dependencies=[Depends(require_admin_token)])
+async def profile_cpu(seconds: float = 10, interval_ms: Optional[float] = None, format: str = "collapsed", top: int = 25):
+    """
+    Sample every thread of this worker for `seconds` while it keeps serving.
+    format=collapsed returns flamegraph.pl/speedscope input; format=json returns
+    the stacks with the top functions by self time.
+    """
+    if format not in ("collapsed", "json"):
+        raise HTTPException(status_code=400, detail="format must be 'collapsed' or 'json'")
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+
+    kwargs = {"interval_ms": interval_ms} if interval_ms else {}
+    loop = asyncio.get_running_loop()
+    # The sampler runs on its own thread so the event loop is sampled, not blocked
+    profile = await loop.run_in_executor(None, lambda: stack_sampler.sample(seconds, **kwargs))
+    if profile is None:
+        raise HTTPException(status_code=409, detail="A CPU profile is already running on this worker")
+
+    print(f"🔬 CPU profile: {profile['samples']} samples over {profile['duration_s']}s (pid {os.getpid()})")
+    if format == "collapsed":
+        return PlainTextResponse(collapsed(profile), headers={"X-Worker-Pid": str(os.getpid())})
+    return {"pid": os.getpid(), **profile, "top_functions": top_functions(profile, top)}
+
+@app.get("/api/admin/profile/memory", dependencies=[Depends(require_admin_token)])
+async def profile_memory(seconds: float = 10, top: int = 25, group_by: str = "lineno"):
+    """Top Python allocators of this worker over a `seconds` window; tracemalloc runs only during it"""
+    if group_by not in ("lineno", "filename", "traceback"):
+        raise HTTPException(status_code=400, detail="group_by must be 'lineno', 'filename' or 'traceback'")
+    if seconds <= 0:
+        raise HTTPException(status_code=400, detail="seconds must be positive")
+    loop = asyncio.get_running_loop()
+    # tracemalloc is process-global: don't overlap the debug endpoint's per-request profile
+    async with profile_lock:
+        result = await loop.run_in_executor(None, tracemalloc_top, seconds, top, group_by)
+    return {"pid": os.getpid(), **result}
+
 # Debug endpoint for troubleshooting
+async def profile_recognition(request: Request, file: UploadFile, face_box: Optional[str], pre_cropped: bool, cprofile_top: int) -> dict:
+    """
+    Run one frame through run_recognition, as /api/recognize-face would, with each
+    stage recorded by a StageProfiler. The stages still run on the inference pool,
+    behind recognition admission and a deadline; face tracking is not used, so every
+    frame gets a full recognition.
+    """
+    profiler = StageProfiler(cprofile_top)
+    result = {
+        "model_name": config.model_name,
+        "detector_backend": config.detector_backend,
+        "distance_metric": config.distance_metric,
+        "liveness_enabled": config.enable_liveness_detection,
+        "image_max_side": IMAGE_MAX_SIDE,
+        # Exact search: one matrix-vector product over the whole gallery
+        "matcher": "exact_memory_mapped" if gallery.stats()["memory_mapped"] else "exact_in_memory",
+        "gallery": gallery.stats(),
+    }
+
+    deadline = Deadline.from_header(request.headers.get(DEADLINE_HEADER), request.is_disconnected)
+    async with profile_lock:
+        try:
+            await deadline.guard(
+                recognition_admission.acquire(recognition_client(request)), "queue",
+                undo=lambda _: recognition_admission.release()
+            )
+        except AdmissionRejected as e:
+            result["outcome"] = f"overloaded_{e.reason}"
+            return result
+        except DeadlineExceeded as e:
+            result["outcome"] = "deadline_exceeded"
+            result["error"] = str(e)
+            return result
+
+        profiler.start()
+        try:
+            recognition = await run_recognition(file, deadline, face_box, pre_cropped, profiler=profiler)
+            result["outcome"] = "recognized" if recognition.success else "not_recognized"
+            result["recognition"] = recognition.dict(exclude={"presence"})
+        except DeadlineExceeded as e:
+            result["outcome"] = "deadline_exceeded"
+            result["error"] = str(e)
+        finally:
+            recognition_admission.release()
+            result["profile"] = profiler.stop()
+        return result
+
 @app.post("/api/debug-face")
-async def debug_face_recognition(file: UploadFile = File(...)):
-    """Debug face recognition - shows detailed information about the process"""
+async def debug_face_recognition(
+    request: Request,
+    file: UploadFile = File(...),
+    face_box: Optional[str] = Form(None),
+    pre_cropped: bool = Form(False),
+    profile: bool = False,
+    cprofile_top: int = 0,
+    x_admin_token: Optional[str] = Header(None)
+):
+    """
+    Debug face recognition - shows detailed information about the process.
+    With ?profile=true (admin only: X-Admin-Token), runs the real recognition pipeline
+    and reports wall/CPU time and peak memory per stage; cprofile_top=N adds the N
+    most expensive functions.
+    """
+    if profile:
+        require_admin_token(x_admin_token)
+
     temp_path = None
     temp_files = []
     
@@ -1113,6 +2002,9 @@ async def debug_face_recognition(file: UploadFile = File(...)):
         if not DEEPFACE_AVAILABLE:
             return {"error": "DeepFace is not available"}
         
+        if profile:
+            return await profile_recognition(request, file, face_box, pre_cropped, cprofile_top)
+
         # Save uploaded file
         temp_path = os.path.join(TEMP_DIR, f"debug_{uuid.uuid4()}.jpg")
         temp_files.append(temp_path)
@@ -1124,7 +2016,7 @@ async def debug_face_recognition(file: UploadFile = File(...)):
         debug_info = {
             "config": config.dict(),
             "steps": [],
-            "database_stats": await db_manager.get_stats()
+            "database_stats": await db_manager.get_cached_stats()
         }
         
         # Step 1: Face detection
@@ -1148,10 +2040,10 @@ async def debug_face_recognition(file: UploadFile = File(...)):
             return debug_info
         
         # Step 2: Get enrolled faces
-        face_images = await db_manager.get_all_face_images()
-        debug_info["enrolled_faces"] = len(face_images)
+        debug_info["enrolled_faces"] = gallery.size
+        debug_info["gallery"] = gallery.stats()
         
-        if not face_images:
+        if gallery.size == 0:
             debug_info["steps"].append({
                 "step": "face_recognition",
                 "success": False,
@@ -1164,7 +2056,7 @@ async def debug_face_recognition(file: UploadFile = File(...)):
             debug_info["steps"].append({
                 "step": "database_faces_loaded",
                 "success": True,
-                "count": len(face_images)
+                "count": gallery.size
             })
             
             # Just test if we can process the uploaded image
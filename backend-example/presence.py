@@ -0,0 +1,89 @@
+"""
+Hot per-employee presence table for today's attendance state
+Answers "is this person checked in right now" without a MongoDB query
+"""
+
+import os
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from timezone_utils import get_local_date_start, convert_utc_to_local
+
+# How often each worker re-syncs from the daily summaries to pick up writes made by other workers
+PRESENCE_RESYNC_SECONDS = float(os.getenv("PRESENCE_RESYNC_SECONDS", "30"))
+
+class PresenceTable:
+    """
+    In-process map of employee_id -> today's last attendance event.
+
+    Entries hold the last event type and time, the attendance_id and confidence
+    of that event, and the employee name. The table is cleared the first time
+    it is touched after local midnight (get_local_date_start changes), so it
+    only ever describes today.
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._day: Optional[datetime] = None
+        self._lock = threading.Lock()
+
+    def _rollover(self):
+        today = get_local_date_start()
+        if self._day != today:
+            self._entries = {}
+            self._day = today
+
+    def record(self, attendance: Dict[str, Any]):
+        """Apply an attendance record (from create_attendance) if it is today's latest event"""
+        self.merge([{
+            "employee_id": attendance["employee_id"],
+            "employee_name": attendance["employee_name"],
+            "last_event_type": attendance["type"],
+            "last_event_at": attendance["timestamp"],
+            "attendance_id": attendance.get("attendance_id"),
+            "confidence": attendance.get("confidence"),
+        }])
+
+    def merge(self, entries: Iterable[Dict[str, Any]]):
+        """Merge entries, keeping whichever event is newer per employee; ignores events from other days"""
+        with self._lock:
+            self._rollover()
+            for entry in entries:
+                event_at = convert_utc_to_local(entry["last_event_at"])
+                if event_at < self._day:
+                    continue
+                current = self._entries.get(entry["employee_id"])
+                if current is None or event_at >= current["last_event_at"]:
+                    self._entries[entry["employee_id"]] = {**entry, "last_event_at": event_at}
+
+    def get(self, employee_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            self._rollover()
+            entry = self._entries.get(employee_id)
+            return dict(entry) if entry else None
+
+    def find_duplicate(self, employee_id: str, attendance_type: str, window_seconds: float) -> Optional[Dict[str, Any]]:
+        """Return today's last event if it has the same type and happened within window_seconds"""
+        if window_seconds <= 0:
+            return None
+        entry = self.get(employee_id)
+        if not entry or entry["last_event_type"] != attendance_type:
+            return None
+        age = (datetime.now(entry["last_event_at"].tzinfo) - entry["last_event_at"]).total_seconds()
+        return entry if age <= window_seconds else None
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            self._rollover()
+            return [dict(entry) for entry in self._entries.values()]
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self.snapshot()
+        checked_in = sum(1 for entry in entries if entry["last_event_type"] == "check-in")
+        return {
+            "date": self._day.date().isoformat() if self._day else None,
+            "seen_today": len(entries),
+            "checked_in": checked_in,
+            "checked_out": len(entries) - checked_in,
+        }
@@ -0,0 +1,133 @@
+"""
+Schedule-driven pre-warming for ITScence
+Ramps capacity up shortly before each attendance window and back down after it
+"""
+
+import os
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+PREWARM_ENABLED = os.getenv("PREWARM_ENABLED", "true").lower() == "true"
+# Ramp up this long before a window opens, and down this long after it closes
+PREWARM_LEAD_MINUTES = int(os.getenv("PREWARM_LEAD_MINUTES", "15"))
+PREWARM_COOLDOWN_MINUTES = int(os.getenv("PREWARM_COOLDOWN_MINUTES", "15"))
+PREWARM_CHECK_SECONDS = float(os.getenv("PREWARM_CHECK_SECONDS", "30"))
+# Inference threads (and recognitions in flight) while ramped up
+PREWARM_PEAK_IN_FLIGHT = int(os.getenv("PREWARM_PEAK_IN_FLIGHT", "4"))
+
+MINUTES_PER_DAY = 24 * 60
+
+Step = Tuple[str, Callable[[], Awaitable[Any]]]
+
+def format_minutes(minutes: int) -> str:
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+def in_range(minute: int, start: int, end: int) -> bool:
+    """start <= minute <= end on a 24h clock; the range may wrap past midnight"""
+    start, end = start % MINUTES_PER_DAY, end % MINUTES_PER_DAY
+    if start <= end:
+        return start <= minute <= end
+    return minute >= start or minute <= end
+
+class PrewarmScheduler:
+    """
+    Runs ramp-up steps when the clock enters [window start - lead, window end +
+    cooldown] of any attendance window, and ramp-down steps when it leaves.
+
+    windows() returns (name, start_minute, end_minute) tuples and is re-read on
+    every check, so schedule changes apply without a restart. Each step is an
+    async callable whose return value is recorded as the step's detail; a
+    failing step is logged and recorded but does not stop the others.
+    """
+
+    def __init__(
+        self,
+        windows: Callable[[], List[Tuple[str, int, int]]],
+        clock: Callable[[], int],
+        ramp_up: List[Step],
+        ramp_down: List[Step],
+        lead_minutes: int = PREWARM_LEAD_MINUTES,
+        cooldown_minutes: int = PREWARM_COOLDOWN_MINUTES,
+        check_interval: float = PREWARM_CHECK_SECONDS
+    ):
+        self.windows = windows
+        self.clock = clock
+        self.ramp_up = ramp_up
+        self.ramp_down = ramp_down
+        self.lead_minutes = lead_minutes
+        self.cooldown_minutes = cooldown_minutes
+        self.check_interval = check_interval
+        self.active_window: Optional[str] = None
+        self.actions: Deque[Dict[str, Any]] = deque(maxlen=20)
+
+    def plan(self) -> List[Dict[str, str]]:
+        return [
+            {
+                "window": name,
+                "opens": format_minutes(start),
+                "closes": format_minutes(end),
+                "ramp_up_at": format_minutes(start - self.lead_minutes),
+                "ramp_down_at": format_minutes(end + self.cooldown_minutes),
+            }
+            for name, start, end in self.windows()
+        ]
+
+    def due_window(self, minute: int) -> Optional[str]:
+        for name, start, end in self.windows():
+            if in_range(minute, start - self.lead_minutes, end + self.cooldown_minutes):
+                return name
+        return None
+
+    async def _run_steps(self, action: str, window: Optional[str], steps: List[Step]):
+        started = time.perf_counter()
+        results = []
+        for name, step in steps:
+            step_started = time.perf_counter()
+            try:
+                detail = await step()
+                results.append({"step": name, "success": True, "ms": round((time.perf_counter() - step_started) * 1000, 1), "detail": detail})
+            except Exception as e:
+                logging.error(f"❌ Prewarm step {name} failed: {e}")
+                results.append({"step": name, "success": False, "ms": round((time.perf_counter() - step_started) * 1000, 1), "error": str(e)})
+        self.actions.append({
+            "action": action,
+            "window": window,
+            "at": format_minutes(self.clock()),
+            "ms": round((time.perf_counter() - started) * 1000, 1),
+            "steps": results,
+        })
+        logging.info(f"🔥 Prewarm {action} ({window or 'idle'}) done in {self.actions[-1]['ms']:.0f}ms")
+
+    async def check(self):
+        """Ramp up or down if the clock crossed a boundary since the last check"""
+        window = self.due_window(self.clock())
+        if window and not self.active_window:
+            self.active_window = window
+            await self._run_steps("ramp_up", window, self.ramp_up)
+        elif not window and self.active_window:
+            previous, self.active_window = self.active_window, None
+            await self._run_steps("ramp_down", previous, self.ramp_down)
+        elif window:
+            self.active_window = window
+
+    async def run(self):
+        while True:
+            try:
+                await self.check()
+            except Exception as e:
+                logging.error(f"Prewarm scheduler error: {str(e)}")
+            await asyncio.sleep(self.check_interval)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "lead_minutes": self.lead_minutes,
+            "cooldown_minutes": self.cooldown_minutes,
+            "ramped_up": self.active_window is not None,
+            "active_window": self.active_window,
+            "plan": self.plan(),
+            "actions": list(self.actions),
+        }
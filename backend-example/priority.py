@@ -0,0 +1,190 @@
+"""
+Schedule-aware request priorities for ITScence
+Kiosk traffic is never limited; interactive and batch endpoints get small
+per-class concurrency limits during the attendance windows
+"""
+
+import os
+import re
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from starlette.responses import JSONResponse
+
+CRITICAL = "critical"
+INTERACTIVE = "interactive"
+BATCH = "batch"
+PRIORITY_CLASSES = (CRITICAL, INTERACTIVE, BATCH)
+
+# "schedule": limit during the check-in/check-out windows, "always", or "off"
+PRIORITY_SCHEDULING = os.getenv("PRIORITY_SCHEDULING", "schedule").lower()
+# Concurrent requests per class per worker, during peak and outside it
+PRIORITY_PEAK_INTERACTIVE = int(os.getenv("PRIORITY_PEAK_INTERACTIVE", "4"))
+PRIORITY_PEAK_BATCH = int(os.getenv("PRIORITY_PEAK_BATCH", "2"))
+PRIORITY_OFFPEAK_INTERACTIVE = int(os.getenv("PRIORITY_OFFPEAK_INTERACTIVE", "32"))
+PRIORITY_OFFPEAK_BATCH = int(os.getenv("PRIORITY_OFFPEAK_BATCH", "8"))
+# How long a request may wait for its class's slot before it is deferred with 503
+PRIORITY_INTERACTIVE_WAIT_SECONDS = float(os.getenv("PRIORITY_INTERACTIVE_WAIT_SECONDS", "10"))
+PRIORITY_BATCH_WAIT_SECONDS = float(os.getenv("PRIORITY_BATCH_WAIT_SECONDS", "5"))
+PRIORITY_RETRY_AFTER_SECONDS = int(os.getenv("PRIORITY_RETRY_AFTER_SECONDS", "15"))
+
+# (method or None for any, path pattern, class); first match wins, default interactive
+ROUTE_CLASSES: List[Tuple[Optional[str], "re.Pattern", str]] = [
+    ("POST", re.compile(r"^/api/recognize-face$"), CRITICAL),
+    (None, re.compile(r"^/api/recognize-embedding(s|/model)?$"), CRITICAL),
+    ("POST", re.compile(r"^/api/attendance$"), CRITICAL),
+    ("GET", re.compile(r"^/api/attendance/mode$"), CRITICAL),
+    ("GET", re.compile(r"^/api/presence/[^/]+$"), CRITICAL),
+    ("GET", re.compile(r"^/api/recognition/load$"), CRITICAL),
+    (None, re.compile(r"^/(livez|health)$"), CRITICAL),
+    ("GET", re.compile(r"^/api/(attendance|employees)/[^/]+/photo$"), BATCH),
+    (None, re.compile(r"^/api/debug-face$"), BATCH),
+    (None, re.compile(r"^/api/admin/"), BATCH),
+]
+
+def classify(method: str, path: str) -> str:
+    for route_method, pattern, priority_class in ROUTE_CLASSES:
+        if (route_method is None or route_method == method) and pattern.match(path):
+            return priority_class
+    return INTERACTIVE
+
+class RequestDeferred(Exception):
+    """Raised when a lower-priority request waited too long for its slot"""
+
+    def __init__(self, priority_class: str, retry_after: int = PRIORITY_RETRY_AFTER_SECONDS):
+        super().__init__(f"{priority_class} requests are deferred during peak attendance")
+        self.priority_class = priority_class
+        self.retry_after = retry_after
+
+class PriorityScheduler:
+    """
+    Per-class concurrency limits that tighten while is_peak() is true.
+
+    Critical requests pass straight through (recognition has its own admission
+    control). Interactive and batch requests take a slot of their class and
+    wait, up to their class's wait time, when the class is at its limit; limits
+    are re-read on every check so the switch at the start and end of a window
+    applies to requests already waiting. Runs on the event loop.
+    """
+
+    def __init__(
+        self,
+        is_peak: Callable[[], bool],
+        peak_limits: Optional[Dict[str, int]] = None,
+        offpeak_limits: Optional[Dict[str, int]] = None,
+        wait_seconds: Optional[Dict[str, float]] = None,
+        enabled: bool = PRIORITY_SCHEDULING != "off"
+    ):
+        self.is_peak = is_peak
+        self.enabled = enabled
+        self.peak_limits = peak_limits or {INTERACTIVE: PRIORITY_PEAK_INTERACTIVE, BATCH: PRIORITY_PEAK_BATCH}
+        self.offpeak_limits = offpeak_limits or {INTERACTIVE: PRIORITY_OFFPEAK_INTERACTIVE, BATCH: PRIORITY_OFFPEAK_BATCH}
+        self.wait_seconds = wait_seconds or {INTERACTIVE: PRIORITY_INTERACTIVE_WAIT_SECONDS, BATCH: PRIORITY_BATCH_WAIT_SECONDS}
+        self.in_flight = {priority_class: 0 for priority_class in PRIORITY_CLASSES}
+        self.waiting = {priority_class: 0 for priority_class in PRIORITY_CLASSES}
+        self.metrics = {
+            priority_class: {"requests": 0, "waited": 0, "deferred": 0, "max_wait_ms": 0.0, "total_ms": 0.0}
+            for priority_class in PRIORITY_CLASSES
+        }
+        self._condition: Optional[asyncio.Condition] = None
+
+    def limit(self, priority_class: str, peak: Optional[bool] = None) -> Optional[int]:
+        if not self.enabled or priority_class == CRITICAL:
+            return None
+        peak = self.is_peak() if peak is None else peak
+        return (self.peak_limits if peak else self.offpeak_limits).get(priority_class)
+
+    def _has_slot(self, priority_class: str) -> bool:
+        limit = self.limit(priority_class)
+        return limit is None or self.in_flight[priority_class] < limit
+
+    async def acquire(self, priority_class: str):
+        if self._condition is None:
+            self._condition = asyncio.Condition()
+        metrics = self.metrics[priority_class]
+        metrics["requests"] += 1
+        if self._has_slot(priority_class):
+            self.in_flight[priority_class] += 1
+            return
+
+        metrics["waited"] += 1
+        self.waiting[priority_class] += 1
+        started = time.perf_counter()
+        try:
+            async with self._condition:
+                await asyncio.wait_for(
+                    self._condition.wait_for(lambda: self._has_slot(priority_class)),
+                    self.wait_seconds.get(priority_class, 0)
+                )
+                self.in_flight[priority_class] += 1
+        except asyncio.TimeoutError:
+            metrics["deferred"] += 1
+            raise RequestDeferred(priority_class)
+        finally:
+            self.waiting[priority_class] -= 1
+            wait_ms = (time.perf_counter() - started) * 1000
+            metrics["max_wait_ms"] = round(max(metrics["max_wait_ms"], wait_ms), 1)
+
+    async def release(self, priority_class: str):
+        self.in_flight[priority_class] -= 1
+        if self._condition is not None and any(self.waiting.values()):
+            async with self._condition:
+                self._condition.notify_all()
+
+    @asynccontextmanager
+    async def slot(self, priority_class: str):
+        await self.acquire(priority_class)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.metrics[priority_class]["total_ms"] += (time.perf_counter() - started) * 1000
+            await self.release(priority_class)
+
+    def stats(self) -> Dict[str, Any]:
+        peak = self.is_peak()
+        classes = {}
+        for priority_class in PRIORITY_CLASSES:
+            metrics = self.metrics[priority_class]
+            finished = metrics["requests"] - metrics["deferred"] - self.in_flight[priority_class]
+            classes[priority_class] = {
+                "limit": self.limit(priority_class, peak),
+                "in_flight": self.in_flight[priority_class],
+                "waiting": self.waiting[priority_class],
+                "requests": metrics["requests"],
+                "waited": metrics["waited"],
+                "deferred": metrics["deferred"],
+                "max_wait_ms": metrics["max_wait_ms"],
+                "avg_ms": round(metrics["total_ms"] / finished, 1) if finished > 0 else 0.0,
+            }
+        return {"enabled": self.enabled, "peak": peak, "classes": classes}
+
+class PriorityMiddleware:
+    """
+    Pure ASGI middleware holding each HTTP request's class slot while it runs.
+    Unlike @app.middleware("http") it passes the server's receive through
+    untouched, so endpoints still see http.disconnect (request.is_disconnected()).
+    """
+
+    def __init__(self, app, scheduler: PriorityScheduler):
+        self.app = app
+        self.scheduler = scheduler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        priority_class = CRITICAL if method == "OPTIONS" else classify(method, scope["path"])
+        try:
+            async with self.scheduler.slot(priority_class):
+                await self.app(scope, receive, send)
+        except RequestDeferred as e:
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": f"{e}; please retry shortly"},
+                headers={"Retry-After": str(e.retry_after)}
+            )
+            await response(scope, receive, send)
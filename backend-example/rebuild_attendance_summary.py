@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Rebuild Daily Attendance Summaries for ITScence
+Regenerates the attendance_daily_summary collection from raw attendance history.
+Useful after imports, manual edits, or if summaries drifted from the raw records.
+"""
+
+import sys
+import logging
+import argparse
+
+from database import db_manager, DATABASE_NAME, MONGODB_URL
+from timezone_utils import parse_local_datetime
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def main():
+    """Main function"""
+    parser = argparse.ArgumentParser(description="Rebuild daily attendance summaries from raw history")
+    parser.add_argument("--start", type=str, help="First local date to rebuild (YYYY-MM-DD), default: all history")
+    parser.add_argument("--end", type=str, help="Last local date to rebuild (YYYY-MM-DD, inclusive)")
+    parser.add_argument("--batch-size", type=int, default=1000, help="Raw records folded per bulk write")
+    parser.add_argument("--confirm", action="store_true", help="Skip confirmation prompt")
+
+    args = parser.parse_args()
+
+    logger.info("🚀 Attendance Summary Rebuild Tool")
+    logger.info(f"📍 Database: {MONGODB_URL}/{DATABASE_NAME}")
+
+    try:
+        start = parse_local_datetime(args.start) if args.start else None
+        end = parse_local_datetime(args.end, end_of_day=True) if args.end else None
+    except ValueError as e:
+        logger.error(f"❌ Invalid date: {e}")
+        sys.exit(1)
+
+    if not args.confirm:
+        scope = f"{args.start or 'beginning'} to {args.end or 'now'}"
+        logger.warning(f"⚠️ This will replace daily summaries from {scope}")
+        response = input("Are you sure you want to continue? (yes/no): ").lower().strip()
+        if response not in ['yes', 'y']:
+            logger.info("❌ Operation cancelled by user")
+            return
+
+    if not db_manager.connect():
+        logger.error("❌ Failed to connect to database")
+        sys.exit(1)
+
+    try:
+        result = db_manager.rebuild_attendance_summaries(start=start, end=end, batch_size=args.batch_size)
+        logger.info(f"🗑️ Summaries removed: {result['summaries_deleted']}")
+        logger.info(f"📊 Raw records processed: {result['records_processed']}")
+        logger.info(f"✅ Summary upserts: {result['summary_upserts']}")
+    except Exception as e:
+        logger.error(f"❌ Rebuild failed: {e}")
+        sys.exit(1)
+    finally:
+        db_manager.disconnect()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Per-request stage profiling for ITScence
+Wall time, CPU time and peak traced memory per pipeline stage, plus an optional cProfile summary
+"""
+
+import time
+import asyncio
+import cProfile
+import pstats
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+
+# Upper bound on the cProfile functions a request may ask for
+PROFILE_TOP_MAX = 100
+
+# tracemalloc and cProfile are process-global, so profile one request at a time
+profile_lock = asyncio.Lock()
+
+class StageProfiler:
+    """
+    Measures the stages of one request.
+
+    Stages may run on worker threads, and two may overlap (liveness and
+    embedding). CPU time is that of the thread running the stage
+    (time.thread_time), so it excludes other requests but also the native
+    threads a model may fan out to; compare it with wall time. Peak memory is
+    what tracemalloc sees: Python objects and numpy buffers, not allocations
+    made inside TensorFlow or OpenCV, and for overlapping stages it includes
+    the other stage's allocations. With cprofile_top each stage is profiled on
+    its own thread and the results are merged. Hold profile_lock while profiling.
+    """
+
+    def __init__(self, cprofile_top: int = 0):
+        self.stages: List[Dict[str, Any]] = []
+        self.cprofile_top = max(0, min(cprofile_top, PROFILE_TOP_MAX))
+        self._profiles: List[cProfile.Profile] = []
+        self._lock = threading.Lock()
+        self._started_tracing = False
+        self._started = 0.0
+
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._started = time.perf_counter()
+
+    def stop(self) -> Dict[str, Any]:
+        total_ms = (time.perf_counter() - self._started) * 1000
+        if self._started_tracing:
+            tracemalloc.stop()
+            self._started_tracing = False
+        with self._lock:
+            # A stage whose result was dropped (an embedding after failed liveness) may still finish later
+            result = {"total_ms": round(total_ms, 2), "stages": list(self.stages)}
+        if self.cprofile_top:
+            result["cprofile"] = self.top_functions()
+        return result
+
+    def _enable_profile(self) -> Optional[cProfile.Profile]:
+        if not self.cprofile_top:
+            return None
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active (process-wide from Python 3.12)
+            return None
+        return profile
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record one stage; the yielded dict can carry extra details into the result"""
+        details: Dict[str, Any] = {}
+        tracemalloc.reset_peak()
+        memory_before, _ = tracemalloc.get_traced_memory()
+        profile = self._enable_profile()
+        cpu_start = time.thread_time()
+        wall_start = time.perf_counter()
+        error = None
+        try:
+            yield details
+        except Exception as e:
+            error = str(e)
+            raise
+        finally:
+            wall_ms = (time.perf_counter() - wall_start) * 1000
+            cpu_ms = (time.thread_time() - cpu_start) * 1000
+            if profile is not None:
+                profile.disable()
+            _, peak = tracemalloc.get_traced_memory()
+            record = {
+                "stage": name,
+                "success": error is None,
+                "wall_ms": round(wall_ms, 2),
+                "cpu_ms": round(cpu_ms, 2),
+                "peak_alloc_kib": round(max(0, peak - memory_before) / 1024, 1),
+            }
+            if error is not None:
+                record["error"] = error
+            record.update(details)
+            with self._lock:
+                self.stages.append(record)
+                if profile is not None:
+                    self._profiles.append(profile)
+
+    def top_functions(self) -> List[Dict[str, Any]]:
+        """The most expensive functions by cumulative time, over every profiled stage"""
+        if not self._profiles:
+            return []
+        stats = pstats.Stats(*self._profiles)
+        rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:self.cprofile_top]
+        return [
+            {
+                "function": f"{filename}:{line}({function})",
+                "calls": calls,
+                "total_ms": round(total_time * 1000, 2),
+                "cumulative_ms": round(cumulative_time * 1000, 2),
+            }
+            for (filename, line, function), (_, calls, total_time, cumulative_time, _) in rows
+        ]
+
+class ProfiledTimings(dict):
+    """Stage timings dict for the recognition pipeline whose timed stages are also recorded by `profiler`"""
+
+    def __init__(self, profiler: StageProfiler):
+        super().__init__()
+        self.profiler = profiler
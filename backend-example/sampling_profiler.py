@@ -0,0 +1,146 @@
+"""
+On-demand profiling of a live ITScence worker
+A statistical stack sampler over all threads and tracemalloc top allocators
+"""
+
+import os
+import sys
+import time
+import threading
+import tracemalloc
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+# Sampling interval and the longest run one request may ask for
+PROFILER_INTERVAL_MS = float(os.getenv("PROFILER_INTERVAL_MS", "10"))
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+# Frames kept per stack (innermost frames win when a stack is deeper)
+PROFILER_MAX_DEPTH = int(os.getenv("PROFILER_MAX_DEPTH", "64"))
+
+def frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+class StackSampler:
+    """
+    Samples the stack of every thread at a fixed interval.
+
+    Stacks are counted in collapsed form ("thread;outer;...;inner" -> samples),
+    the input flamegraph.pl and speedscope read. Sampling only reads frames, so
+    the overhead is a few microseconds per thread per tick and the worker keeps
+    serving while it runs. One sampling run at a time per process.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._lock.locked()
+
+    def sample(self, seconds: float, interval_ms: float = PROFILER_INTERVAL_MS) -> Optional[Dict[str, Any]]:
+        """Block for `seconds` while sampling; returns None if another run is in progress"""
+        if not self._lock.acquire(blocking=False):
+            return None
+        try:
+            return self._sample(min(seconds, PROFILER_MAX_SECONDS), max(interval_ms, 1.0) / 1000)
+        finally:
+            self._lock.release()
+
+    def _sample(self, seconds: float, interval: float) -> Dict[str, Any]:
+        own_id = threading.get_ident()
+        stacks: Counter = Counter()
+        ticks = 0
+        started = time.perf_counter()
+        cpu_started = time.process_time()
+        deadline = started + seconds
+
+        while time.perf_counter() < deadline:
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < PROFILER_MAX_DEPTH:
+                    labels.append(frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(thread_id, f"thread-{thread_id}"))
+                stacks[";".join(reversed(labels))] += 1
+            ticks += 1
+            time.sleep(interval)
+
+        duration = time.perf_counter() - started
+        return {
+            "duration_s": round(duration, 2),
+            "interval_ms": round(interval * 1000, 2),
+            "ticks": ticks,
+            "samples": sum(stacks.values()),
+            # Whole-process CPU over the run; ~100% per busy core
+            "process_cpu_percent": round((time.process_time() - cpu_started) / duration * 100, 1) if duration else 0.0,
+            "stacks": dict(stacks.most_common()),
+        }
+
+def collapsed(profile: Dict[str, Any]) -> str:
+    """Collapsed-stack text: one "frame;frame;frame count" line per stack"""
+    return "".join(f"{stack} {count}\n" for stack, count in profile["stacks"].items())
+
+def top_functions(profile: Dict[str, Any], limit: int = 25) -> List[Dict[str, Any]]:
+    """Functions by self samples (innermost frame) and total samples (anywhere on the stack)"""
+    self_samples: Counter = Counter()
+    total_samples: Counter = Counter()
+    for stack, count in profile["stacks"].items():
+        frames = stack.split(";")[1:]
+        if not frames:
+            continue
+        self_samples[frames[-1]] += count
+        for label in set(frames):
+            total_samples[label] += count
+    samples = profile["samples"] or 1
+    return [
+        {
+            "function": label,
+            "self_percent": round(self_samples[label] / samples * 100, 1),
+            "total_percent": round(total_samples[label] / samples * 100, 1),
+        }
+        for label, _ in self_samples.most_common(limit)
+    ]
+
+def tracemalloc_top(seconds: float, limit: int = 25, group_by: str = "lineno") -> Dict[str, Any]:
+    """
+    Top allocators of the memory allocated during a `seconds` window and still
+    held at its end. Blocks for the window; tracing runs only while it is open
+    (unless it was already on, e.g. PYTHONTRACEMALLOC=1), so the worker does
+    not pay tracemalloc's per-allocation cost afterwards.
+    """
+    started_tracing = not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        time.sleep(max(0.0, min(seconds, PROFILER_MAX_SECONDS)))
+        snapshot = tracemalloc.take_snapshot().filter_traces([
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        ])
+        current, peak = tracemalloc.get_traced_memory()
+        overhead = tracemalloc.get_tracemalloc_memory()
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+    statistics = snapshot.statistics(group_by)
+    return {
+        "window_s": round(min(seconds, PROFILER_MAX_SECONDS), 2),
+        "traced_from_start": not started_tracing,
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "tracemalloc_overhead_bytes": overhead,
+        "allocators": [
+            {
+                "location": str(stat.traceback[0]) if stat.traceback else "?",
+                "size_bytes": stat.size,
+                "count": stat.count,
+            }
+            for stat in statistics[:limit]
+        ],
+    }
+
+stack_sampler = StackSampler()
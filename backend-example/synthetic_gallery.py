@@ -0,0 +1,118 @@
+"""
+Synthetic face embeddings for ITScence scale testing
+Identity vectors and probes with controllable genuine/impostor cosine distances
+"""
+
+import math
+from typing import Dict, Optional
+
+import numpy as np
+
+# Embedding sizes of the DeepFace models the app supports
+MODEL_DIMENSIONS = {
+    "VGG-Face": 4096,
+    "Facenet": 128,
+    "Facenet512": 512,
+    "OpenFace": 128,
+    "DeepFace": 4096,
+    "DeepID": 160,
+    "ArcFace": 512,
+    "Dlib": 128,
+    "SFace": 128,
+    "GhostFaceNet": 512,
+}
+
+def genuine_sigma(distance: float, dimension: int) -> float:
+    """
+    Per-dimension Gaussian noise that moves a unit vector to the given expected
+    cosine distance: cos(v, v + n) ~ 1 / sqrt(1 + sigma^2 * d).
+    """
+    similarity = 1.0 - distance
+    if not 0 < similarity <= 1:
+        raise ValueError("genuine distance must be in [0, 1)")
+    return math.sqrt((1.0 / similarity ** 2 - 1.0) / dimension)
+
+def impostor_sigma(distance: float, dimension: int) -> float:
+    """
+    Per-dimension spread around a shared unit center that gives two members the
+    expected cosine distance: cos(c + n1, c + n2) ~ 1 / (1 + sigma^2 * d).
+    """
+    similarity = 1.0 - distance
+    if not 0 < similarity <= 1:
+        raise ValueError("impostor distance must be in [0, 1)")
+    return math.sqrt((1.0 / similarity - 1.0) / dimension)
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    return vectors / np.maximum(np.linalg.norm(vectors, axis=-1, keepdims=True), 1e-12)
+
+class SyntheticIdentities:
+    """
+    Deterministic identity embeddings.
+
+    In "random" mode identities are independent directions, so impostors sit
+    near cosine distance 1. In "clustered" mode each identity is drawn around
+    one of `clusters` shared centers with a spread chosen so that two members
+    of the same cluster are `impostor_distance` apart on average, which gives
+    the hard near-miss impostors real galleries have. Probes of an identity
+    are noisy copies at `genuine_distance` on average. Row i is always the
+    same vector for a given seed, whatever the batch boundaries.
+    """
+
+    def __init__(
+        self,
+        dimension: int,
+        mode: str = "clustered",
+        clusters: int = 100,
+        impostor_distance: float = 0.6,
+        genuine_distance: float = 0.25,
+        seed: int = 0
+    ):
+        if mode not in ("random", "clustered"):
+            raise ValueError("mode must be 'random' or 'clustered'")
+        self.dimension = dimension
+        self.mode = mode
+        self.seed = seed
+        self.genuine_sigma = genuine_sigma(genuine_distance, dimension)
+        self.impostor_sigma = impostor_sigma(impostor_distance, dimension) if mode == "clustered" else None
+        self.centers = normalize(
+            np.random.default_rng([seed, 0]).standard_normal((clusters, dimension), dtype=np.float32)
+        ) if mode == "clustered" else None
+
+    def _rng(self, stream: int, index: int) -> np.random.Generator:
+        return np.random.default_rng([self.seed, stream, index])
+
+    def _draw_identity(self, rng: np.random.Generator) -> np.ndarray:
+        if self.mode == "random":
+            return normalize(rng.standard_normal(self.dimension, dtype=np.float32))
+        center = self.centers[rng.integers(len(self.centers))]
+        return normalize(center + rng.normal(0, self.impostor_sigma, self.dimension).astype(np.float32))
+
+    def _capture(self, identity: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+        return identity + rng.normal(0, self.genuine_sigma, self.dimension).astype(np.float32)
+
+    def identity(self, index: int) -> np.ndarray:
+        return self._draw_identity(self._rng(1, index))
+
+    def identities(self, start: int, count: int) -> np.ndarray:
+        if not count:
+            return np.zeros((0, self.dimension), np.float32)
+        return np.stack([self.identity(index) for index in range(start, start + count)])
+
+    def probe(self, index: int, capture: int = 0) -> np.ndarray:
+        """A genuine probe: capture number `capture` of identity `index`"""
+        return self._capture(self.identity(index), self._rng(2, index * 1000 + capture))
+
+    def impostor(self, index: int) -> np.ndarray:
+        """A probe of someone who is not enrolled, drawn from the same distribution"""
+        return self._capture(self._draw_identity(self._rng(3, index)), self._rng(4, index))
+
+def distance_summary(distances: np.ndarray) -> Dict[str, Optional[float]]:
+    if len(distances) == 0:
+        return {"count": 0, "mean": None, "p5": None, "p50": None, "p95": None}
+    return {
+        "count": int(len(distances)),
+        "mean": round(float(np.mean(distances)), 4),
+        "p5": round(float(np.percentile(distances, 5)), 4),
+        "p50": round(float(np.percentile(distances, 50)), 4),
+        "p95": round(float(np.percentile(distances, 95)), 4),
+    }
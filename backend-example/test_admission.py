@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for recognition admission control.
+Run with: python -m pytest test_admission.py
+"""
+
+import asyncio
+
+import pytest
+
+from admission import AdmissionController, AdmissionRejected
+
+def run(coro):
+    return asyncio.run(coro)
+
+async def hold(controller, client, order, gate):
+    async with controller.admit(client):
+        order.append(client)
+        await gate.wait()
+
+def test_admits_up_to_limit_then_queues_and_rejects():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=2, max_queued_per_client=2, queue_timeout=5)
+        gate, order = asyncio.Event(), []
+        tasks = [asyncio.create_task(hold(controller, client, order, gate)) for client in ("a", "b", "c")]
+        await asyncio.sleep(0)
+        assert controller.load()["in_flight"] == 1 and controller.load()["queued"] == 2
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("d")
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["a", "b", "c"]
+        assert controller.in_flight == 0 and controller.queued == 0
+        assert controller.metrics["rejected_queue_full"] == 1
+    run(scenario())
+
+def test_waiting_clients_are_served_round_robin():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=10, max_queued_per_client=3, queue_timeout=5)
+        gate, order = asyncio.Event(), []
+        clients = ["first", "noisy", "noisy", "noisy", "quiet", "other"]
+        tasks = []
+        for client in clients:
+            tasks.append(asyncio.create_task(hold(controller, client, order, gate)))
+            await asyncio.sleep(0)
+        gate.set()
+        await asyncio.gather(*tasks)
+        assert order == ["first", "noisy", "quiet", "other", "noisy", "noisy"]
+    run(scenario())
+
+def test_per_client_limit_and_queue_timeout():
+    async def scenario():
+        controller = AdmissionController(max_in_flight=1, max_queue=10, max_queued_per_client=1, queue_timeout=0.05)
+        gate, order = asyncio.Event(), []
+        holder = asyncio.create_task(hold(controller, "a", order, gate))
+        waiter = asyncio.create_task(controller.acquire("b"))
+        await asyncio.sleep(0)
+        with pytest.raises(AdmissionRejected):
+            await controller.acquire("b")
+        with pytest.raises(AdmissionRejected):
+            await waiter
+        assert controller.metrics["rejected_client_limit"] == 1
+        assert controller.metrics["shed_timeout"] == 1
+        assert controller.queued == 0
+        gate.set()
+        await holder
+        assert controller.in_flight == 0
+    run(scenario())
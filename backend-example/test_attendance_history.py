@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for attendance history cursors and local date parsing.
+Run with: python -m pytest test_attendance_history.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+from bson import ObjectId
+
+import timezone_utils
+from database import decode_attendance_cursor, encode_attendance_cursor
+from timezone_utils import parse_local_datetime
+
+@pytest.fixture(autouse=True)
+def jakarta(monkeypatch):
+    monkeypatch.setattr(timezone_utils, "DEFAULT_TIMEZONE", "Asia/Jakarta")
+
+def test_cursor_round_trips_timestamp_and_id():
+    object_id = ObjectId()
+    timestamp = datetime(2024, 3, 1, 8, 30, 15, 123456, tzinfo=pytz.UTC)
+    cursor = encode_attendance_cursor(timestamp, object_id)
+    assert "=" not in cursor and "/" not in cursor and "+" not in cursor
+    assert decode_attendance_cursor(cursor) == (timestamp, object_id)
+
+    naive = datetime(2024, 3, 1, 8, 30)
+    assert decode_attendance_cursor(encode_attendance_cursor(naive, object_id)) == (naive, object_id)
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "eyJ0IjoieCJ9", encode_attendance_cursor(datetime(2024, 1, 1), ObjectId())[:-4]])
+def test_malformed_cursor_raises_value_error(cursor):
+    with pytest.raises(ValueError, match="Invalid cursor"):
+        decode_attendance_cursor(cursor)
+
+def test_bare_date_is_local_midnight():
+    start = parse_local_datetime("2024-03-01")
+    assert start.replace(tzinfo=None) == datetime(2024, 3, 1)
+    assert start.utcoffset() == timedelta(hours=7)
+
+    end = parse_local_datetime("2024-03-01", end_of_day=True)
+    assert end.replace(tzinfo=None) == datetime(2024, 3, 2)
+    assert end - start == timedelta(days=1)
+
+def test_datetime_keeps_its_offset_or_is_localized():
+    naive = parse_local_datetime("2024-03-01T09:15:00")
+    assert naive.replace(tzinfo=None) == datetime(2024, 3, 1, 9, 15)
+    assert naive.utcoffset() == timedelta(hours=7)
+
+    utc = parse_local_datetime("2024-03-01T02:15:00Z")
+    assert utc == naive and utc.utcoffset() == timedelta(0)
+
+    # end_of_day only moves bare dates
+    assert parse_local_datetime("2024-03-01T09:15:00", end_of_day=True) == naive
+
+def test_invalid_date_raises_value_error():
+    with pytest.raises(ValueError):
+        parse_local_datetime("2024-13-01")
@@ -0,0 +1,141 @@
+#!/usr/bin/env python3
+"""
+Tests for folding attendance records into daily summaries and the summary upsert pipeline.
+Run with: python -m pytest test_attendance_summary.py
+"""
+
+from datetime import datetime
+
+import pytest
+
+import timezone_utils
+from database import ATTENDANCE_SUMMARY_COLLECTION, build_summary_update, summarize_attendance
+
+@pytest.fixture(autouse=True)
+def jakarta(monkeypatch):
+    monkeypatch.setattr(timezone_utils, "DEFAULT_TIMEZONE", "Asia/Jakarta")
+
+def event(kind, hour, employee_id="EMP001", name="Ani", day=1):
+    # Naive timestamps are UTC; 01:00 UTC is 08:00 in Jakarta
+    return {
+        "employee_id": employee_id,
+        "employee_name": name,
+        "type": kind,
+        "timestamp": datetime(2024, 3, day, hour),
+        "attendance_id": f"{employee_id}-{kind}-{day}-{hour}",
+        "confidence": hour / 100,
+    }
+
+def apply(collection, partial):
+    """Run the summary upsert through an aggregation, as the server would run the pipeline update"""
+    query, update = build_summary_update(partial)
+    current = collection.find_one(query, {"_id": 0}) or query
+    collection.delete_many(query)
+    collection.insert_one(dict(current))
+    merged = list(collection.aggregate([{"$match": query}, *update, {"$project": {"_id": 0}}]))[0]
+    collection.replace_one(query, merged)
+    return merged
+
+def test_records_fold_per_employee_and_local_day():
+    partials = summarize_attendance([
+        event("check-out", 10),
+        event("check-in", 2),
+        event("check-in", 1),
+        event("check-in", 3, employee_id="EMP002", name="Budi"),
+        # 18:00 UTC on the 1st is already the 2nd in Jakarta
+        event("check-in", 18),
+    ])
+    by_key = {(partial["employee_id"], partial["date"]): partial for partial in partials}
+    assert set(by_key) == {("EMP001", "2024-03-01"), ("EMP002", "2024-03-01"), ("EMP001", "2024-03-02")}
+
+    day = by_key[("EMP001", "2024-03-01")]
+    assert day["check_in_count"] == 2 and day["check_out_count"] == 1
+    assert day["first_check_in"] == datetime(2024, 3, 1, 1)
+    assert day["last_check_out"] == datetime(2024, 3, 1, 10)
+    assert day["last_event_type"] == "check-out" and day["last_event_at"] == datetime(2024, 3, 1, 10)
+    assert day["last_attendance_id"] == "EMP001-check-out-1-10" and day["last_confidence"] == 0.1
+
+    assert by_key[("EMP002", "2024-03-01")]["last_check_out"] is None
+
+def test_summary_update_merges_into_existing_document():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.summaries
+
+    [check_in] = summarize_attendance([event("check-in", 1)])
+    summary = apply(collection, check_in)
+    assert summary["status"] == "present" and summary["check_in_count"] == 1
+    assert summary.get("last_check_out") is None
+
+    [check_out] = summarize_attendance([event("check-out", 9, name="Ani R.")])
+    summary = apply(collection, check_out)
+    assert summary["status"] == "completed"
+    assert summary["check_in_count"] == 1 and summary["check_out_count"] == 1
+    assert summary["last_event_type"] == "check-out" and summary["employee_name"] == "Ani R."
+
+    # A late-arriving earlier check-in moves first_check_in but not the latest event
+    [late] = summarize_attendance([event("check-in", 0)])
+    summary = apply(collection, late)
+    assert summary["first_check_in"] == datetime(2024, 3, 1, 0) and summary["check_in_count"] == 2
+    assert summary["last_event_type"] == "check-out" and summary["last_event_at"] == datetime(2024, 3, 1, 9)
+    assert summary["last_attendance_id"] == "EMP001-check-out-1-9" and summary["employee_name"] == "Ani R."
+    assert summary["last_check_out"] == datetime(2024, 3, 1, 9)
+
+def test_check_out_without_check_in_has_its_own_status():
+    mongomock = pytest.importorskip("mongomock")
+    collection = mongomock.MongoClient().db.summaries
+    [check_out] = summarize_attendance([event("check-out", 9)])
+    summary = apply(collection, check_out)
+    assert summary["status"] == "checked_out_only" and summary.get("first_check_in") is None
+
+@pytest.fixture
+def summary_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.gridfs import enable_gridfs_integration
+    from database import DatabaseManager
+
+    enable_gridfs_integration()
+    db = DatabaseManager()
+    db.attach(mongomock.MongoClient(), "test")
+    failing = {"bulk_write": True, "update_one": False}
+    collection_class = type(db.db[ATTENDANCE_SUMMARY_COLLECTION])
+    original_update_one = collection_class.update_one
+
+    def bulk_write(self, operations, ordered=True):
+        raise RuntimeError("summary write lost")
+
+    def update_one(self, *args, **kwargs):
+        if failing["update_one"] and self.name == ATTENDANCE_SUMMARY_COLLECTION:
+            raise RuntimeError("still down")
+        return original_update_one(self, *args, **kwargs)
+
+    monkeypatch.setattr(collection_class, "bulk_write", bulk_write)
+    monkeypatch.setattr(collection_class, "update_one", update_one)
+    return db, failing
+
+def stored_summary(db, employee_id="EMP001", date="2024-03-01"):
+    return db.db[ATTENDANCE_SUMMARY_COLLECTION].find_one({"employee_id": employee_id, "date": date}, {"_id": 0})
+
+def test_failed_summary_update_rebuilds_the_day_from_raw_records(summary_db):
+    db, _ = summary_db
+    assert db.write_attendance_batch([event("check-in", 1), event("check-out", 9)]) == {}
+
+    summary = stored_summary(db)
+    assert summary["check_in_count"] == 1 and summary["check_out_count"] == 1 and summary["status"] == "completed"
+    assert db.summary_stats() == {"update_failures": 1, "days_repaired": 1, "repair_failures": 0, "days_pending_repair": 0}
+
+    # Rebuilding is idempotent: a second failed merge for the same day does not double count
+    db.write_attendance_batch([event("check-in", 2)])
+    assert stored_summary(db)["check_in_count"] == 2
+
+def test_days_that_cannot_be_repaired_stay_queued_for_the_next_write(summary_db):
+    db, failing = summary_db
+    failing["update_one"] = True
+    db.write_attendance_batch([event("check-in", 1)])
+    assert stored_summary(db) is None
+    assert db.summary_stats()["days_pending_repair"] == 1 and db.summary_stats()["repair_failures"] == 1
+
+    failing["update_one"] = False
+    db.write_attendance_batch([event("check-in", 2, employee_id="EMP002", name="Budi")])
+    assert stored_summary(db)["check_in_count"] == 1
+    assert stored_summary(db, "EMP002")["check_in_count"] == 1
+    assert db.summary_stats()["days_pending_repair"] == 0
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+"""
+Tests for the attendance group-commit write buffer.
+Run with: python -m pytest test_attendance_writer.py
+"""
+
+import asyncio
+import threading
+
+from bson import ObjectId
+
+from attendance_writer import AttendanceWriteBuffer
+
+class RecordingWriter:
+    """write_batch stand-in that records batch sizes and assigns _id like insert_many"""
+
+    def __init__(self, fail_indices=(), delay=0.0):
+        self.batches = []
+        self.fail_indices = set(fail_indices)
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def __call__(self, documents):
+        if self.delay:
+            threading.Event().wait(self.delay)
+        with self.lock:
+            self.batches.append(len(documents))
+        failures = {}
+        for index, document in enumerate(documents):
+            if document.get("seq") in self.fail_indices:
+                failures[index] = Exception(f"duplicate {document['seq']}")
+            else:
+                document["_id"] = ObjectId()
+        return failures
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_concurrent_submissions_are_coalesced():
+    writer = RecordingWriter()
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=50, flush_interval=0.05)
+        await buffer.start()
+        results = await asyncio.gather(*[buffer.submit({"seq": i}) for i in range(20)])
+        await buffer.stop()
+        return results, buffer.stats()
+
+    results, stats = run(scenario())
+    assert [r["seq"] for r in results] == list(range(20))
+    assert all(isinstance(r["_id"], ObjectId) for r in results)
+    assert writer.batches == [20]
+    assert stats["records_written"] == 20
+    assert stats["batches_written"] == 1
+
+def test_batches_respect_max_batch_size():
+    writer = RecordingWriter()
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=8, flush_interval=0.05)
+        await buffer.start()
+        await asyncio.gather(*[buffer.submit({"seq": i}) for i in range(20)])
+        await buffer.stop()
+
+    run(scenario())
+    assert sum(writer.batches) == 20
+    assert max(writer.batches) <= 8
+
+def test_single_record_flushes_after_interval():
+    writer = RecordingWriter()
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=50, flush_interval=0.01)
+        await buffer.start()
+        result = await asyncio.wait_for(buffer.submit({"seq": 1}), timeout=1.0)
+        await buffer.stop()
+        return result
+
+    assert run(scenario())["seq"] == 1
+    assert writer.batches == [1]
+
+def test_failed_documents_only_fail_their_own_request():
+    writer = RecordingWriter(fail_indices={3})
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=10, flush_interval=0.05)
+        await buffer.start()
+        results = await asyncio.gather(
+            *[buffer.submit({"seq": i}) for i in range(6)],
+            return_exceptions=True
+        )
+        await buffer.stop()
+        return results, buffer.stats()
+
+    results, stats = run(scenario())
+    assert isinstance(results[3], Exception)
+    assert all(not isinstance(r, Exception) for i, r in enumerate(results) if i != 3)
+    assert stats["records_failed"] == 1
+    assert stats["records_written"] == 5
+
+def test_whole_batch_failure_is_reported_to_every_caller():
+    def broken_writer(documents):
+        raise ConnectionError("cluster unavailable")
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(broken_writer, max_batch_size=10, flush_interval=0.01)
+        await buffer.start()
+        results = await asyncio.gather(
+            *[buffer.submit({"seq": i}) for i in range(3)],
+            return_exceptions=True
+        )
+        await buffer.stop()
+        return results
+
+    assert all(isinstance(r, ConnectionError) for r in run(scenario()))
+
+def test_submissions_arriving_during_a_write_form_the_next_batch():
+    writer = RecordingWriter(delay=0.05)
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=100, flush_interval=0.001)
+        await buffer.start()
+        first = asyncio.create_task(buffer.submit({"seq": 0}))
+        await asyncio.sleep(0.01)  # first batch is now being written
+        rest = [asyncio.create_task(buffer.submit({"seq": i})) for i in range(1, 11)]
+        await asyncio.gather(first, *rest)
+        await buffer.stop()
+
+    run(scenario())
+    assert writer.batches == [1, 10]
+
+def test_stop_drains_pending_records():
+    writer = RecordingWriter()
+
+    async def scenario():
+        buffer = AttendanceWriteBuffer(writer, max_batch_size=4, flush_interval=0.05)
+        await buffer.start()
+        tasks = [asyncio.create_task(buffer.submit({"seq": i})) for i in range(10)]
+        await asyncio.sleep(0)
+        await buffer.stop()
+        return [t.done() for t in tasks]
+
+    assert all(run(scenario()))
+    assert sum(writer.batches) == 10
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+Tests for the offline benchmark harness.
+Run with: python -m pytest test_benchmarks.py
+"""
+
+import asyncio
+
+from benchmarks.harness import Benchmark, SkipBenchmark, run_benchmark, compare_results, RESULTS_FORMAT_VERSION
+
+def results(**medians):
+    return {
+        "format_version": RESULTS_FORMAT_VERSION,
+        "environment": {},
+        "benchmarks": {
+            name: {"status": "ok", "median_ms": median} if median is not None else {"status": "skipped", "reason": "n/a"}
+            for name, median in medians.items()
+        },
+    }
+
+def test_run_benchmark_times_sync_and_async_cases():
+    loop = asyncio.new_event_loop()
+    calls = []
+
+    async def coroutine_case():
+        calls.append("async")
+
+    try:
+        sync_result = run_benchmark(Benchmark("sync", "group", lambda: calls.append("sync"), min_runs=4, min_time=0), loop)
+        async_result = run_benchmark(Benchmark("async", "group", coroutine_case, min_runs=3, min_time=0), loop)
+    finally:
+        loop.close()
+
+    assert sync_result["status"] == "ok" and sync_result["runs"] == 4
+    assert async_result["status"] == "ok" and async_result["runs"] == 3
+    # One warm-up call each
+    assert calls.count("sync") == 5 and calls.count("async") == 4
+    assert sync_result["min_ms"] <= sync_result["median_ms"] <= sync_result["max_ms"]
+
+def test_run_benchmark_reports_skips_and_errors():
+    def skip():
+        raise SkipBenchmark("no weights")
+
+    def fail():
+        raise RuntimeError("boom")
+
+    loop = asyncio.new_event_loop()
+    try:
+        skipped = run_benchmark(Benchmark("skip", "group", lambda: None, setup=skip), loop)
+        failed = run_benchmark(Benchmark("fail", "group", fail), loop)
+    finally:
+        loop.close()
+
+    assert skipped == {"group": "group", "status": "skipped", "reason": "no weights"}
+    assert failed["status"] == "error" and "boom" in failed["reason"]
+
+def test_compare_flags_regressions_beyond_tolerance_and_noise():
+    baseline = results(slow=10.0, fast=10.0, same=10.0, tiny=0.01, skipped=1.0, gone=1.0)
+    current = results(slow=13.0, fast=5.0, same=11.0, tiny=0.03, skipped=None, added=2.0)
+
+    comparison = compare_results(current, baseline, tolerance=0.2)
+
+    assert comparison["regressions"] == ["slow"]
+    assert comparison["improvements"] == ["fast"]
+    # 3x slower but below the absolute noise floor
+    assert {row["name"]: row["verdict"] for row in comparison["rows"]}["tiny"] == "unchanged"
+    assert comparison["not_compared"] == ["skipped", "gone"]
+    assert comparison["new"] == ["added"]
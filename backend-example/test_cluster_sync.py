@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Tests for applying cluster config and gallery changes, including gaps in the change log.
+Run with: python -m pytest test_cluster_sync.py
+"""
+
+import asyncio
+
+import cluster_sync
+from cluster_sync import ClusterSync
+from gallery import FaceGallery
+
+def run(coro):
+    return asyncio.run(coro)
+
+class FakeDatabase:
+    """The cluster_state, gallery_changes and face_embeddings reads ClusterSync makes"""
+
+    def __init__(self):
+        self.config_version = 0
+        self.config = None
+        self.changes = []
+        self.embeddings = {}
+
+    def change(self, seq, op, employee_id, embedding=None):
+        self.changes.append({"seq": seq, "op": op, "employee_id": employee_id})
+        if op == "upsert":
+            self.embeddings[employee_id] = {"employee_id": employee_id, "name": employee_id.lower(), "embedding": embedding}
+        else:
+            self.embeddings.pop(employee_id, None)
+
+    def get_cluster_config_version(self):
+        return self.config_version
+
+    def get_cluster_config(self):
+        return {"version": self.config_version, "config": self.config}
+
+    def get_gallery_version(self):
+        return max([change["seq"] for change in self.changes], default=0)
+
+    def get_gallery_changes(self, after_seq, limit=1000):
+        return sorted((change for change in self.changes if change["seq"] > after_seq), key=lambda change: change["seq"])[:limit]
+
+    def get_face_embeddings(self, model_name, employee_ids=None):
+        return [dict(self.embeddings[employee_id]) for employee_id in employee_ids or [] if employee_id in self.embeddings]
+
+def make_sync(db, gallery):
+    events = {"configs": [], "reloads": 0}
+
+    async def on_config(config):
+        events["configs"].append(config)
+
+    async def on_gallery_reload():
+        events["reloads"] += 1
+        gallery.replace(db.embeddings.values(), db.get_gallery_version())
+
+    return ClusterSync(db, lambda: gallery, on_config, on_gallery_reload), events
+
+def test_newer_config_is_applied_once():
+    db = FakeDatabase()
+    sync, events = make_sync(db, None)
+    db.config_version, db.config = 3, {"confidence_threshold": 0.8}
+
+    async def scenario():
+        await sync.check()
+        await sync.check()
+
+    run(scenario())
+    assert events["configs"] == [{"confidence_threshold": 0.8}]
+    assert sync.config_version == 3 and sync.metrics["config_reloads"] == 1
+
+def test_contiguous_changes_are_applied_incrementally():
+    db = FakeDatabase()
+    gallery = FaceGallery("Facenet", "cosine")
+    sync, events = make_sync(db, gallery)
+    db.change(1, "upsert", "EMP001", [1.0, 0.0, 0.0])
+    db.change(2, "upsert", "EMP002", [0.0, 1.0, 0.0])
+    db.change(3, "upsert", "EMP003", [0.0, 0.0, 1.0])
+    db.change(4, "delete", "EMP002")
+    db.change(5, "upsert", "EMP001", [0.0, 0.6, 0.8])
+
+    run(sync.check())
+    assert gallery.version == 5 and sorted(gallery.ids) == ["EMP001", "EMP003"]
+    assert gallery.match([0.0, 0.6, 0.8])[0] == "EMP001"
+    assert sync.metrics["gallery_changes_applied"] == 5 and events["reloads"] == 0
+
+def test_gap_waits_then_falls_back_to_a_full_reload(monkeypatch):
+    monkeypatch.setattr(cluster_sync, "GALLERY_GAP_TIMEOUT_SECONDS", 0.05)
+    db = FakeDatabase()
+    gallery = FaceGallery("Facenet", "cosine")
+    sync, events = make_sync(db, gallery)
+    db.change(1, "upsert", "EMP001", [1.0, 0.0])
+    db.change(3, "upsert", "EMP003", [0.0, 1.0])
+
+    async def scenario():
+        # Seq 1 applies; seq 2 is missing, so seq 3 waits
+        await sync.check()
+        assert gallery.version == 1 and gallery.ids == ["EMP001"]
+        await sync.check()
+        assert events["reloads"] == 0
+
+        # The missing change shows up within the timeout: applied incrementally
+        db.change(2, "upsert", "EMP002", [0.7, 0.7])
+        await sync.check()
+        assert gallery.version == 3 and sorted(gallery.ids) == ["EMP001", "EMP002", "EMP003"]
+
+        # A hole that never fills (a trimmed log) reloads the gallery after the timeout
+        db.change(5, "delete", "EMP001")
+        await sync.check()
+        await sync.check()
+        assert events["reloads"] == 0
+        await asyncio.sleep(0.06)
+        await sync.check()
+
+    run(scenario())
+    assert events["reloads"] == 1 and sync.metrics["gallery_full_reloads"] == 1
+    assert gallery.version == 5 and sorted(gallery.ids) == ["EMP002", "EMP003"]
+
+def test_upsert_whose_embedding_is_gone_removes_the_row():
+    db = FakeDatabase()
+    gallery = FaceGallery("Facenet", "cosine")
+    gallery.replace([{"employee_id": "EMP001", "name": "ani", "embedding": [1.0, 0.0]}], 0)
+    sync, _ = make_sync(db, gallery)
+    db.changes.append({"seq": 1, "op": "upsert", "employee_id": "EMP001"})
+
+    run(sync.check())
+    assert gallery.version == 1 and gallery.size == 0
@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Tests for CPU thread tuning and calibration selection.
+Run with: python -m pytest test_cpu_tuning.py
+"""
+
+import json
+
+import cv2
+
+import cpu_tuning
+from cpu_tuning import apply_cpu_tuning, cgroup_cpu_quota, plan_threads, thread_plan
+from calibrate_cpu import pick_best, thread_options
+
+def proc_cgroup(tmp_path, text):
+    path = tmp_path / "proc-self-cgroup"
+    path.write_text(text)
+    return str(path)
+
+def test_cgroup_quota_v2_and_v1(tmp_path):
+    namespaced = proc_cgroup(tmp_path, "0::/\n")
+    v2 = tmp_path / "v2"
+    v2.mkdir()
+    (v2 / "cpu.max").write_text("max 100000\n")
+    assert cgroup_cpu_quota(str(v2), namespaced) is None
+    (v2 / "cpu.max").write_text("250000 100000\n")
+    assert cgroup_cpu_quota(str(v2), namespaced) == 2.5
+
+    v1_namespaced = proc_cgroup(tmp_path, "4:memory:/\n3:cpu,cpuacct:/\n")
+    v1 = tmp_path / "v1" / "cpu"
+    v1.mkdir(parents=True)
+    (v1 / "cpu.cfs_quota_us").write_text("-1\n")
+    (v1 / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_quota(str(tmp_path / "v1"), v1_namespaced) is None
+    (v1 / "cpu.cfs_quota_us").write_text("150000\n")
+    assert cgroup_cpu_quota(str(tmp_path / "v1"), v1_namespaced) == 1.5
+    assert cgroup_cpu_quota(str(tmp_path / "missing"), namespaced) is None
+
+def test_cgroup_quota_follows_the_process_path(tmp_path):
+    # A systemd service on a host: its quota is on its own cgroup, not the mount root
+    root = tmp_path / "cgroup"
+    service = root / "system.slice" / "itscence.service"
+    service.mkdir(parents=True)
+    (service / "cpu.max").write_text("200000 100000\n")
+    assert cgroup_cpu_quota(str(root), proc_cgroup(tmp_path, "0::/system.slice/itscence.service\n")) == 2.0
+    # A tighter limit on a parent slice applies too
+    (root / "system.slice" / "cpu.max").write_text("150000 100000\n")
+    assert cgroup_cpu_quota(str(root), proc_cgroup(tmp_path, "0::/system.slice/itscence.service\n")) == 1.5
+
+    v1_service = root / "cpu,cpuacct" / "system.slice" / "itscence.service"
+    v1_service.mkdir(parents=True)
+    (v1_service / "cpu.cfs_quota_us").write_text("100000\n")
+    (v1_service / "cpu.cfs_period_us").write_text("100000\n")
+    assert cgroup_cpu_quota(str(root), proc_cgroup(tmp_path, "5:cpu,cpuacct:/system.slice/itscence.service\n")) == 1.0
+
+def test_plan_shares_cpus_between_processes_and_inferences():
+    plan = plan_threads(8, processes=4, inference_threads=2)
+    assert plan["cpus_per_process"] == 2 and plan["tf_intra_op"] == 2 and plan["tf_inter_op"] == 1
+    assert plan["opencv"] == 1 and plan["blas"] == 1
+    assert plan_threads(2, processes=4)["cpus_per_process"] == 1
+    assert plan_threads(16, processes=2)["opencv"] == 8
+
+def test_matching_profile_overrides_plan(tmp_path, monkeypatch):
+    monkeypatch.setattr(cpu_tuning, "CPU_TUNING", "auto")
+    monkeypatch.setattr(cpu_tuning, "available_cpus", lambda *args: {"host": 8, "affinity": 8, "quota": None, "effective": 8})
+    for var in cpu_tuning.BLAS_THREAD_VARS + ("TF_NUM_INTRAOP_THREADS", "TF_NUM_INTEROP_THREADS"):
+        monkeypatch.delenv(var, raising=False)
+    monkeypatch.setattr(cpu_tuning, "_applied", None)
+    monkeypatch.setattr(cv2, "setNumThreads", lambda threads: None)
+    profile = tmp_path / "cpu_profile.json"
+    profile.write_text(json.dumps({"cpus_per_process": 4, "tf_intra_op": 2, "tf_inter_op": 2, "opencv": 1, "blas": 1}))
+
+    result = apply_cpu_tuning(processes=2, pin=False, profile_path=str(profile))
+    assert result["profile"] == str(profile)
+    assert thread_plan()["tf_intra_op"] == 2 and thread_plan()["tf_inter_op"] == 2
+    assert cpu_tuning.os.environ["OMP_NUM_THREADS"] == "1"
+
+    # Calibrated for 4 CPUs per process; with 4 processes each gets 2, so the default plan applies
+    result = apply_cpu_tuning(processes=4, pin=False, profile_path=str(profile))
+    assert "profile" not in result and result["threads"]["tf_intra_op"] == 2 and result["threads"]["tf_inter_op"] == 1
+
+def test_tuning_off_leaves_library_defaults(monkeypatch):
+    monkeypatch.setattr(cpu_tuning, "CPU_TUNING", "off")
+    monkeypatch.setattr(cpu_tuning, "_applied", None)
+    assert apply_cpu_tuning() == {"mode": "off"}
+    assert thread_plan()["tf_intra_op"] == 0
+
+def test_calibration_prefers_throughput_then_latency():
+    assert thread_options(6) == [1, 2, 4, 6] and thread_options(1) == [1]
+    results = [
+        {"throughput_per_second": 10.0, "p95_ms": 400},
+        {"throughput_per_second": 9.9, "p95_ms": 250},
+        {"throughput_per_second": 7.0, "p95_ms": 150},
+    ]
+    assert pick_best(results)["p95_ms"] == 250
+    assert pick_best(results, max_p95_ms=200)["p95_ms"] == 150
+    assert pick_best(results, max_p95_ms=50)["p95_ms"] == 250
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Tests for recognition request deadlines.
+Run with: python -m pytest test_deadline.py
+"""
+
+import asyncio
+
+import pytest
+
+from deadline import Deadline, DeadlineExceeded, DeadlineMetrics, RECOGNITION_DEADLINE_SECONDS, RECOGNITION_MAX_DEADLINE_SECONDS
+
+def run(coro):
+    return asyncio.run(coro)
+
+def test_budget_from_header():
+    assert Deadline.from_header(None).seconds == RECOGNITION_DEADLINE_SECONDS
+    assert Deadline.from_header("abc").seconds == RECOGNITION_DEADLINE_SECONDS
+    assert Deadline.from_header("2500").seconds == 2.5
+    assert Deadline.from_header("99999999").seconds == RECOGNITION_MAX_DEADLINE_SECONDS
+
+def test_guard_cancels_work_when_deadline_passes():
+    async def scenario():
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(5)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        deadline = Deadline(0.05)
+        assert await deadline.guard(asyncio.sleep(0, "ok"), "fast") == "ok"
+        with pytest.raises(DeadlineExceeded) as error:
+            await deadline.guard(slow(), "embedding")
+        assert error.value.stage == "embedding" and error.value.reason == "deadline"
+        await asyncio.sleep(0)
+        assert cancelled.is_set()
+        with pytest.raises(DeadlineExceeded):
+            await deadline.check("employee_lookup")
+    run(scenario())
+
+def test_guard_stops_when_client_disconnects():
+    async def scenario():
+        state = {"gone": False}
+
+        async def is_disconnected():
+            return state["gone"]
+
+        async def leave_soon():
+            await asyncio.sleep(0.05)
+            state["gone"] = True
+
+        deadline = Deadline(10, is_disconnected)
+        asyncio.get_running_loop().create_task(leave_soon())
+        with pytest.raises(DeadlineExceeded) as error:
+            await deadline.guard(asyncio.sleep(5), "queue")
+        assert error.value.reason == "disconnected"
+
+        metrics = DeadlineMetrics()
+        metrics.record_drop(error.value)
+        assert metrics.stats()["dropped"] == {"deadline": {}, "disconnected": {"queue": 1}}
+    run(scenario())
+
+def test_guard_undoes_result_it_abandons():
+    async def scenario():
+        released = []
+        state = {"calls": 0}
+
+        async def is_disconnected():
+            # Give the guarded work time to finish while we decide to give up
+            state["calls"] += 1
+            if state["calls"] > 1:
+                await asyncio.sleep(0.2)
+                return True
+            return False
+
+        deadline = Deadline(10, is_disconnected)
+        with pytest.raises(DeadlineExceeded):
+            await deadline.guard(asyncio.sleep(0.3, "slot"), "queue", undo=released.append)
+        assert released == ["slot"]
+    run(scenario())
+
+def test_disconnect_reaches_endpoint_through_app_middleware():
+    """A kiosk that hangs up must cancel the guarded work behind the app's real middleware stack"""
+    import main
+    outcome = {}
+
+    async def wait_for_client(request: main.Request):
+        deadline = Deadline(10, request.is_disconnected)
+        try:
+            await deadline.guard(asyncio.sleep(5), "embedding")
+        except DeadlineExceeded as e:
+            outcome["reason"] = e.reason
+        return {}
+
+    main.app.add_api_route("/api/test-disconnect", wait_for_client, methods=["POST"])
+
+    async def scenario():
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        hang_up = asyncio.get_running_loop().time() + 0.05
+
+        async def receive():
+            # Like uvicorn: the body first, then block until the client goes away
+            if messages:
+                return messages.pop(0)
+            wait = hang_up - asyncio.get_running_loop().time()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            return {"type": "http.disconnect"}
+
+        async def send(message):
+            pass
+
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+            "scheme": "http", "path": "/api/test-disconnect", "raw_path": b"/api/test-disconnect",
+            "root_path": "", "query_string": b"", "headers": [], "client": ("127.0.0.1", 1), "server": ("test", 80),
+        }
+        await asyncio.wait_for(main.app(scope, receive, send), 3)
+
+    run(scenario())
+    assert outcome == {"reason": "disconnected"}
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for device-computed probe embeddings and batch matching.
+Run with: python -m pytest test_embedding_probe.py
+"""
+
+import numpy as np
+import pytest
+
+from embedding_probe import (
+    ProbeError, check_model_tag, decode_raw_probes, decode_base64_probes, encode_probe
+)
+from gallery import FaceGallery
+
+def test_raw_and_base64_probes_decode_to_the_same_vectors():
+    probes = np.random.default_rng(0).normal(size=(3, 8)).astype(np.float32)
+    assert np.array_equal(decode_raw_probes(probes.astype("<f4").tobytes(), 8), probes)
+    assert np.array_equal(decode_base64_probes([encode_probe(row) for row in probes], 8), probes)
+
+def test_malformed_probes_are_rejected():
+    with pytest.raises(ProbeError):
+        decode_raw_probes(b"\0" * 30, 8)
+    with pytest.raises(ProbeError):
+        decode_raw_probes(b"", 8)
+    with pytest.raises(ProbeError):
+        decode_raw_probes(np.full(8, np.nan, dtype="<f4").tobytes(), 8)
+    with pytest.raises(ProbeError):
+        decode_raw_probes(np.zeros((3, 8), dtype="<f4").tobytes(), 8, max_probes=2)
+    with pytest.raises(ProbeError):
+        decode_base64_probes(["not base64!"], 8)
+    with pytest.raises(ProbeError):
+        decode_base64_probes([encode_probe(np.zeros(4))], 8)
+
+def test_model_tag_must_match_the_gallery():
+    check_model_tag("Facenet", "deepface-0.0.93", "Facenet", "deepface-0.0.93")
+    with pytest.raises(ProbeError) as error:
+        check_model_tag("ArcFace", "deepface-0.0.93", "Facenet", "deepface-0.0.93")
+    assert error.value.status_code == 409
+    with pytest.raises(ProbeError) as error:
+        check_model_tag("Facenet", "deepface-0.0.80", "Facenet", "deepface-0.0.93")
+    assert error.value.status_code == 409
+    with pytest.raises(ProbeError) as error:
+        check_model_tag("Facenet", None, "Facenet", "deepface-0.0.93")
+    assert error.value.status_code == 400
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "euclidean_l2"])
+def test_match_many_agrees_with_match(metric):
+    rng = np.random.default_rng(1)
+    matrix = rng.normal(size=(50, 16))
+    gallery = FaceGallery("Facenet", metric)
+    gallery.replace([{"employee_id": f"EMP{row:03d}", "name": "", "embedding": matrix[row]} for row in range(50)], 1)
+    probes = matrix[[3, 7, 9]] + rng.normal(scale=0.01, size=(3, 16))
+    batch = gallery.match_many(probes)
+    for probe, (employee_id, _, distance) in zip(probes, batch):
+        single = gallery.match(probe)
+        assert employee_id == single[0]
+        assert distance == pytest.approx(single[2], abs=1e-4)
+    assert [match[0] for match in batch] == ["EMP003", "EMP007", "EMP009"]
+    assert FaceGallery("Facenet", metric).match_many(probes) == [None, None, None]
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Tests for the atomic employee ID allocator.
+Run with: python -m pytest test_employee_ids.py
+"""
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from database import DatabaseManager, COUNTERS_COLLECTION, EMPLOYEES_COLLECTION, EMPLOYEE_ID_COUNTER
+
+mongomock = pytest.importorskip("mongomock")
+from mongomock.gridfs import enable_gridfs_integration
+
+enable_gridfs_integration()
+
+def run(coro):
+    return asyncio.run(coro)
+
+def manager(employee_ids=()):
+    client = mongomock.MongoClient()
+    if employee_ids:
+        client.test[EMPLOYEES_COLLECTION].insert_many([{"employee_id": employee_id} for employee_id in employee_ids])
+    db = DatabaseManager()
+    db.attach(client, "test")
+    return db
+
+def counter(db):
+    return db.db[COUNTERS_COLLECTION].find_one({"_id": EMPLOYEE_ID_COUNTER})["seq"]
+
+def test_counter_is_seeded_from_the_highest_existing_id():
+    db = manager(["EMP002", "EMP017", "EMP9", "CONTRACTOR42", "EMPabc"])
+    assert counter(db) == 17
+    assert run(db.allocate_employee_id()) == "EMP018"
+
+def test_seeding_runs_once_and_never_lowers_the_counter():
+    db = manager(["EMP005"])
+    run(db.allocate_employee_ids(3))
+    db.db[EMPLOYEES_COLLECTION].insert_one({"employee_id": "EMP500"})
+    db.seed_employee_id_counter()
+    assert counter(db) == 8
+
+def test_blocks_are_contiguous_and_never_reused():
+    db = manager()
+    assert run(db.allocate_employee_ids(3)) == ["EMP001", "EMP002", "EMP003"]
+    assert run(db.allocate_employee_id()) == "EMP004"
+
+    # Deleting an employee does not free its ID
+    db.db[EMPLOYEES_COLLECTION].delete_many({})
+    assert run(db.allocate_employee_ids(2)) == ["EMP005", "EMP006"]
+    assert run(db.allocate_employee_ids(1000))[-1] == "EMP1006"
+
+def test_concurrent_allocations_get_distinct_ids():
+    db = manager()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        blocks = list(pool.map(lambda _: run(db.allocate_employee_ids(5)), range(10)))
+    ids = [employee_id for block in blocks for employee_id in block]
+    assert len(set(ids)) == 50 and counter(db) == 50
+
+def test_rejects_bad_requests():
+    db = manager()
+    with pytest.raises(ValueError):
+        run(db.allocate_employee_ids(0))
+    with pytest.raises(Exception, match="not connected"):
+        run(DatabaseManager().allocate_employee_ids(1))
@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Tests for client-supplied face hints.
+Run with: python -m pytest test_face_hint.py
+"""
+
+import json
+
+import numpy as np
+import pytest
+
+from face_hint import (
+    FaceHintError, parse_face_box, scale_area, offset_area, padded_region,
+    check_face_region, whole_frame_area
+)
+
+def textured_frame(height=480, width=640):
+    return np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+
+def box(**overrides):
+    data = {"x": 200, "y": 100, "w": 200, "h": 240, "left_eye": [340, 190], "right_eye": [260, 190]}
+    data.update(overrides)
+    return json.dumps(data)
+
+def rejection(image, raw):
+    with pytest.raises(FaceHintError) as error:
+        check_face_region(image, parse_face_box(raw))
+    return error.value.reason
+
+def test_parse_and_scale_box():
+    area = scale_area(parse_face_box(box()), 0.5)
+    assert (area["x"], area["y"], area["w"], area["h"]) == (100, 50, 100, 120)
+    assert area["left_eye"] == (170, 95)
+    assert parse_face_box(json.dumps({"x": 1, "y": 2, "w": 3, "h": 4}))["right_eye"] is None
+
+@pytest.mark.parametrize("raw", ["not json", "[1, 2]", json.dumps({"x": 1, "y": 2, "w": 3}), box(left_eye=[1, 2, 3]), box(w="wide")])
+def test_malformed_boxes_are_rejected(raw):
+    with pytest.raises(FaceHintError) as error:
+        parse_face_box(raw)
+    assert error.value.reason == "malformed"
+
+def test_valid_box_passes_and_is_clipped():
+    area = check_face_region(textured_frame(), parse_face_box(box(x=-10, left_eye=[120, 190], right_eye=[40, 190])))
+    assert area["x"] == 0 and area["w"] == 190
+    assert area["left_eye"] == (120, 190)
+
+def test_sanity_check_rejections():
+    frame = textured_frame()
+    assert rejection(frame, box(w=0)) == "empty_box"
+    assert rejection(frame, box(w=600, h=100, left_eye=None, right_eye=None)) == "bad_aspect"
+    assert rejection(frame, box(x=560, left_eye=None, right_eye=None)) == "outside_frame"
+    assert rejection(frame, box(w=20, h=20, left_eye=None, right_eye=None)) == "too_small"
+    assert rejection(frame, box(left_eye=[50, 50])) == "eyes_outside_box"
+    assert rejection(np.full((480, 640, 3), 128, dtype=np.uint8), box()) == "flat_region"
+
+def test_pre_cropped_frame_is_checked_as_a_whole():
+    crop = textured_frame(224, 224)
+    assert check_face_region(crop, whole_frame_area(crop))["w"] == 224
+    with pytest.raises(FaceHintError):
+        check_face_region(textured_frame(40, 300), whole_frame_area(textured_frame(40, 300)))
+
+def test_padded_region_and_offset_round_trip():
+    area = {"x": 200, "y": 100, "w": 200, "h": 240}
+    x0, y0, x1, y1 = padded_region(area, 640, 480, margin=0.25)
+    assert (x0, y0, x1, y1) == (150, 40, 450, 400)
+    assert padded_region({"x": 10, "y": 10, "w": 200, "h": 200}, 640, 480)[:2] == (0, 0)
+    found = {"x": 50, "y": 60, "w": 200, "h": 240, "left_eye": (190, 150), "right_eye": None}
+    shifted = offset_area(found, x0, y0)
+    assert (shifted["x"], shifted["y"], shifted["left_eye"]) == (200, 100, (340, 190))
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Tests for the face quality gate.
+Run with: python -m pytest test_face_quality.py
+"""
+
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from face_quality import assess_face_quality, pose_from_eyes, QualityGateMetrics
+
+SETTINGS = SimpleNamespace(
+    quality_min_face_size=80,
+    quality_min_edge_margin=0.01,
+    quality_min_brightness=40,
+    quality_max_brightness=220,
+    quality_min_sharpness=30,
+    quality_max_roll_degrees=25,
+    quality_max_yaw_offset=0.35,
+)
+
+def textured_frame(brightness=128):
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    return cv2.addWeighted(frame, 0.5, np.full_like(frame, brightness), 0.5, 0)
+
+CENTERED = {"x": 220, "y": 120, "w": 200, "h": 220, "left_eye": (360, 200), "right_eye": (280, 200)}
+
+def test_good_face_passes():
+    result = assess_face_quality(textured_frame(), CENTERED, SETTINGS)
+    assert result["passed"] and result["reason"] is None
+    assert result["metrics"]["roll_degrees"] == 0.0
+
+def test_rejects_with_reason_and_message():
+    cases = [
+        (cv2.GaussianBlur(textured_frame(), (0, 0), 6), CENTERED, "blurry"),
+        (textured_frame() // 8, CENTERED, "too_dark"),
+        (textured_frame(), {**CENTERED, "w": 60, "h": 60}, "face_too_small"),
+        (textured_frame(), {**CENTERED, "x": 0}, "face_at_edge"),
+        (textured_frame(), {**CENTERED, "left_eye": (330, 150), "right_eye": (260, 220)}, "face_tilted"),
+        (textured_frame(), {**CENTERED, "left_eye": (410, 200), "right_eye": (370, 200)}, "face_turned"),
+    ]
+    for frame, area, reason in cases:
+        result = assess_face_quality(frame, area, SETTINGS)
+        assert result["reason"] == reason, (reason, result)
+        assert not result["passed"] and result["message"]
+
+def test_pose_needs_landmarks():
+    assert pose_from_eyes({"x": 0, "y": 0, "w": 10, "h": 10}) is None
+    assert pose_from_eyes({**CENTERED, "left_eye": None}) is None
+
+def test_metrics_credit_rejects_with_downstream_cost():
+    metrics = QualityGateMetrics()
+    metrics.record_check(False, "blurry", 1.0)
+    metrics.record_downstream(200.0)
+    metrics.record_check(True, None, 1.0)
+    metrics.record_check(False, "too_dark", 1.0)
+    stats = metrics.stats()
+    assert stats["rejected"] == 2 and stats["reject_rate"] == 0.667
+    assert stats["rejected_by_reason"] == {"blurry": 1, "too_dark": 1}
+    assert stats["estimated_saved_ms"] == 200.0
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Tests for per-kiosk face tracking.
+Run with: python -m pytest test_face_tracking.py
+"""
+
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+from face_tracking import FaceTracker, appearance_signature, appearance_similarity, box_iou
+
+SETTINGS = SimpleNamespace(
+    confidence_threshold=0.7,
+    tracking_reembed_every=3,
+    tracking_min_iou=0.5,
+    tracking_min_appearance=0.8,
+    tracking_max_gap_seconds=2.0,
+    tracking_uncertainty_margin=0.05,
+)
+EMPLOYEE = SimpleNamespace(id="EMP001", name="Ani")
+BOX = {"x": 200, "y": 100, "w": 200, "h": 240}
+
+def frame(seed=0):
+    """Smooth random texture; like a face, it changes little under a small shift"""
+    noise = np.random.default_rng(seed).integers(0, 255, (480, 640, 3), dtype=np.uint8)
+    return cv2.GaussianBlur(noise, (0, 0), 8)
+
+def tracker():
+    clock = {"now": 100.0}
+    return FaceTracker(lambda: SETTINGS, clock=lambda: clock["now"]), clock
+
+def test_box_iou_and_appearance():
+    assert box_iou(BOX, BOX) == 1.0
+    assert box_iou(BOX, dict(BOX, x=600)) == 0.0
+    image = frame()
+    same = appearance_signature(image, BOX)
+    assert appearance_similarity(same, appearance_signature(image, dict(BOX, x=204))) > 0.8
+    assert appearance_similarity(same, appearance_signature(frame(1), BOX)) < 0.5
+    assert appearance_signature(image, dict(BOX, x=700)) is None
+
+def test_continuing_track_reuses_identity_until_refresh_is_due():
+    faces, clock = tracker()
+    image = frame()
+    signature = appearance_signature(image, BOX)
+    assert faces.continue_track("kiosk-1", BOX, signature) is None
+    faces.update("kiosk-1", BOX, signature, EMPLOYEE, 0.9, 0.8, [0.1] * 8)
+
+    for step in (1, 2):
+        clock["now"] += 0.5
+        track = faces.continue_track("kiosk-1", dict(BOX, x=BOX["x"] + 4 * step), signature)
+        assert track["employee"] is EMPLOYEE and track["frames_since_embedding"] == step
+    # Third frame since the full recognition: re-embed
+    assert faces.continue_track("kiosk-1", BOX, signature) is None
+    faces.update("kiosk-1", BOX, signature, EMPLOYEE, 0.9, 0.8, [0.1] * 8)
+    assert faces.tracks["kiosk-1"]["frames"] == 4
+    assert faces.continue_track("kiosk-1", BOX, signature) is not None
+    assert faces.stats()["reused"] == 3 and faces.stats()["refreshed"] == 1
+
+def test_track_breaks_on_gap_motion_appearance_and_uncertainty():
+    faces, clock = tracker()
+    image = frame()
+    signature = appearance_signature(image, BOX)
+    faces.update("kiosk-1", BOX, signature, EMPLOYEE, 0.9, 0.8, None)
+
+    assert faces.continue_track("kiosk-1", dict(BOX, x=420), signature) is None
+    assert faces.continue_track("kiosk-1", BOX, appearance_signature(frame(1), BOX)) is None
+    assert faces.continue_track("kiosk-2", BOX, signature) is None
+    clock["now"] += 3
+    assert faces.continue_track("kiosk-1", BOX, signature) is None
+    assert "kiosk-1" not in faces.tracks
+
+    faces.update("kiosk-1", BOX, signature, EMPLOYEE, 0.72, 0.8, None)
+    assert faces.continue_track("kiosk-1", BOX, signature) is None
+    assert faces.stats()["missed"] == {"moved": 1, "appearance": 1, "gap": 1, "uncertain": 1}
+
+def test_end_and_kiosk_limit():
+    faces = FaceTracker(lambda: SETTINGS, max_kiosks=2)
+    signature = appearance_signature(frame(), BOX)
+    for kiosk in ("a", "b", "c"):
+        faces.update(kiosk, BOX, signature, EMPLOYEE, 0.9, 0.8, None)
+    assert list(faces.tracks) == ["b", "c"]
+    faces.end("b")
+    assert list(faces.tracks) == ["c"] and faces.stats()["ended"] == 1
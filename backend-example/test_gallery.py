@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-memory face gallery.
+Run with: python -m pytest test_gallery.py
+"""
+
+import numpy as np
+
+import pytest
+
+from gallery import FaceGallery, distance_to_confidence
+
+def make_gallery(metric="cosine", size=10, dimension=8, seed=0):
+    matrix = np.random.default_rng(seed).normal(size=(size, dimension))
+    gallery = FaceGallery("Facenet", metric)
+    gallery.replace([{"employee_id": f"EMP{row:03d}", "name": f"Name {row}", "embedding": matrix[row]} for row in range(size)], 1)
+    return gallery, matrix
+
+def brute_force_distances(metric, matrix, probe):
+    if metric == "cosine":
+        return np.array([1 - row @ probe / (np.linalg.norm(row) * np.linalg.norm(probe)) for row in matrix])
+    if metric == "euclidean_l2":
+        matrix = matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+        probe = probe / np.linalg.norm(probe)
+    return np.linalg.norm(matrix - probe, axis=1)
+
+@pytest.mark.parametrize("metric", ["cosine", "euclidean", "euclidean_l2"])
+def test_match_agrees_with_brute_force(metric):
+    gallery, matrix = make_gallery(metric, size=50)
+    probes = np.random.default_rng(2).normal(size=(5, 8))
+    expected = [brute_force_distances(metric, matrix, probe) for probe in probes]
+
+    for probe, distances in zip(probes, expected):
+        assert np.allclose(gallery.distances(probe), distances, atol=1e-5)
+        employee_id, name, distance = gallery.match(probe)
+        best = int(np.argmin(distances))
+        assert employee_id == f"EMP{best:03d}" and name == f"Name {best}"
+        assert distance == pytest.approx(distances[best], abs=1e-5)
+    assert [result[0] for result in gallery.match_many(probes)] == [f"EMP{int(np.argmin(d)):03d}" for d in expected]
+
+def test_empty_gallery_and_wrong_dimension():
+    gallery = FaceGallery("Facenet", "cosine")
+    assert gallery.match([1.0, 0.0]) is None and gallery.match_many([[1.0, 0.0], [0.0, 1.0]]) == [None, None]
+    gallery, _ = make_gallery()
+    with pytest.raises(ValueError, match="does not match"):
+        gallery.match(np.ones(4))
+
+def test_distance_to_confidence_is_clamped_per_metric():
+    assert distance_to_confidence(0.25, "cosine") == 0.75
+    assert distance_to_confidence(1.5, "cosine") == 0.0
+    assert distance_to_confidence(1.0, "euclidean_l2") == 0.5
+    assert distance_to_confidence(5.0, "euclidean") == 0.0
+    assert distance_to_confidence(-0.1, "cosine") == 1.0
+
+def test_apply_many_matches_one_by_one_updates():
+    rng = np.random.default_rng(1)
+    batched, _ = make_gallery("euclidean")
+    single, _ = make_gallery("euclidean")
+    upserts = [("EMP002", "", rng.normal(size=8)), ("EMP004", "Renamed", rng.normal(size=8)), ("NEW001", "New", rng.normal(size=8))]
+    removals = ["EMP007", "EMP009", "MISSING"]
+
+    for employee_id, name, embedding in upserts:
+        single.upsert(employee_id, name, embedding)
+    for employee_id in removals:
+        single.remove(employee_id)
+    batched.apply_many(upserts, removals, version=7)
+
+    assert sorted(batched.ids) == sorted(single.ids) and batched.size == 9
+    for employee_id in single.ids:
+        row, other = batched.ids.index(employee_id), single.ids.index(employee_id)
+        assert np.allclose(batched.matrix[row], single.matrix[other])
+        assert batched.names[row] == single.names[other]
+    assert batched.names[batched.ids.index("EMP002")] == "Name 2"
+    assert batched.version == 7
+    assert batched.match(upserts[2][2])[0] == "NEW001"
+    assert not batched.contains("EMP007")
+
+def test_apply_many_keeps_the_previous_arrays_intact():
+    gallery, _ = make_gallery()
+    before_ids, before_matrix = gallery.ids, gallery.matrix
+    snapshot = before_matrix.copy()
+    gallery.apply_many([("EMP001", "", np.ones(8))], ["EMP005"])
+    assert len(before_ids) == 10 and np.array_equal(before_matrix, snapshot)
+    assert gallery.matrix is not before_matrix
+
+def test_apply_many_from_empty_and_down_to_empty():
+    gallery = FaceGallery("Facenet", "cosine")
+    gallery.apply_many([("A", "a", [1, 0, 0]), ("B", "b", [0, 1, 0]), ("A", "a2", [0, 0, 1])])
+    assert gallery.ids == ["A", "B"] and gallery.names == ["a2", "b"]
+    assert gallery.match([0, 0, 1])[0] == "A"
+    gallery.apply_many([], ["A", "B"], version=3)
+    assert gallery.size == 0 and gallery.match([0, 0, 1]) is None and gallery.version == 3
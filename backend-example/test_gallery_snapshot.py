@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+"""
+Tests for memory-mapped face gallery snapshots.
+Run with: python -m pytest test_gallery_snapshot.py
+"""
+
+import argparse
+
+import numpy as np
+import pytest
+
+from gallery import FaceGallery
+from gallery_snapshot import write_snapshot, read_snapshot, load_snapshot, snapshot_entries, snapshot_path
+
+def make_gallery(count=5, dimension=8, metric="cosine", version=7):
+    rng = np.random.default_rng(0)
+    gallery = FaceGallery("Facenet", metric)
+    gallery.replace(
+        [{"employee_id": f"EMP{i:03d}", "name": f"Employee {i}", "embedding": rng.normal(size=dimension)} for i in range(count)],
+        version
+    )
+    return gallery
+
+def test_round_trip_maps_matrix_read_only(tmp_path):
+    source = make_gallery()
+    path = str(tmp_path / "gallery.itsgal")
+    write_snapshot(path, source)
+
+    header, matrix = read_snapshot(path)
+    assert header["version"] == 7
+    assert isinstance(matrix, np.memmap)
+    assert not matrix.flags.writeable
+    np.testing.assert_array_equal(matrix, source.matrix)
+
+    restored = FaceGallery("Facenet", "cosine")
+    assert load_snapshot(path, restored)
+    assert restored.ids == source.ids and restored.names == source.names
+    assert restored.version == 7
+    probe = source.matrix[3] + 0.01
+    assert restored.match(probe)[0] == "EMP003"
+    np.testing.assert_allclose(restored.distances(probe), source.distances(probe), rtol=1e-6)
+
+def test_updates_copy_mapped_matrix(tmp_path):
+    path = str(tmp_path / "gallery.itsgal")
+    write_snapshot(path, make_gallery())
+    gallery = FaceGallery("Facenet", "cosine")
+    load_snapshot(path, gallery)
+
+    gallery.upsert("EMP001", "Renamed", np.ones(8), version=8)
+    gallery.remove("EMP002", version=9)
+    gallery.upsert("EMP999", "New", np.ones(8))
+    assert not isinstance(gallery.matrix, np.memmap)
+    assert gallery.version == 9
+    assert gallery.match(np.ones(8))[0] in ("EMP001", "EMP999")
+    # The file on disk is untouched
+    assert read_snapshot(path)[0]["ids"] == [f"EMP{i:03d}" for i in range(5)]
+
+def test_mismatched_or_newer_snapshot_is_ignored(tmp_path):
+    path = str(tmp_path / "gallery.itsgal")
+    write_snapshot(path, make_gallery(version=7))
+
+    assert not load_snapshot(path, FaceGallery("VGG-Face", "cosine"))
+    assert not load_snapshot(path, FaceGallery("Facenet", "euclidean"))
+    assert not load_snapshot(path, FaceGallery("Facenet", "cosine"), max_version=6)
+    assert load_snapshot(path, FaceGallery("Facenet", "cosine"), max_version=7)
+    assert not load_snapshot(str(tmp_path / "missing.itsgal"), FaceGallery("Facenet", "cosine"))
+
+def test_truncated_snapshot_is_rejected(tmp_path):
+    path = str(tmp_path / "gallery.itsgal")
+    write_snapshot(path, make_gallery())
+    with open(path, "r+b") as f:
+        f.truncate(f.seek(0, 2) - 4)
+
+    with pytest.raises(ValueError):
+        read_snapshot(path)
+    assert not load_snapshot(path, FaceGallery("Facenet", "cosine"))
+
+def test_empty_gallery_and_entries(tmp_path):
+    path = str(tmp_path / "empty.itsgal")
+    write_snapshot(path, FaceGallery("Facenet", "cosine"))
+    gallery = FaceGallery("Facenet", "cosine")
+    assert load_snapshot(path, gallery)
+    assert gallery.size == 0 and gallery.match(np.ones(8)) is None
+
+    path = str(tmp_path / "full.itsgal")
+    write_snapshot(path, make_gallery(count=3, metric="euclidean"))
+    header, entries = snapshot_entries(path)
+    assert header["normalized"] is False
+    assert [entry["employee_id"] for entry in entries] == ["EMP000", "EMP001", "EMP002"]
+    assert len(entries[0]["embedding"]) == 8
+
+def test_snapshot_path_is_filesystem_safe():
+    assert snapshot_path("VGG-Face", "euclidean_l2", "snapshots") == "snapshots/gallery_vgg-face_euclidean_l2.itsgal"
+
+def test_snapshot_from_another_database_is_ignored(tmp_path):
+    path = str(tmp_path / "gallery.itsgal")
+    write_snapshot(path, make_gallery(version=3), database_id="db-a")
+
+    assert read_snapshot(path)[0]["database_id"] == "db-a"
+    assert not load_snapshot(path, FaceGallery("Facenet", "cosine"), max_version=7, database_id="db-b")
+    assert load_snapshot(path, FaceGallery("Facenet", "cosine"), max_version=7, database_id="db-a")
+
+    # Files written before snapshots carried an id are rebuilt rather than trusted
+    write_snapshot(path, make_gallery(version=3))
+    assert not load_snapshot(path, FaceGallery("Facenet", "cosine"), max_version=7, database_id="db-a")
+
+@pytest.fixture
+def transfer_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    from mongomock.gridfs import enable_gridfs_integration
+    import gallery_transfer
+    from database import DatabaseManager, EMPLOYEES_COLLECTION
+
+    enable_gridfs_integration()
+    db = DatabaseManager()
+    db.attach(mongomock.MongoClient(), "test")
+    db.db[EMPLOYEES_COLLECTION].insert_many([{"employee_id": f"EMP{i:03d}"} for i in range(3)])
+    monkeypatch.setattr(gallery_transfer, "db_manager", db)
+    return db
+
+def transfer_args(**kwargs):
+    return argparse.Namespace(**{"model": "Facenet", "include_unknown": False, "allow_normalized": False, "confirm": True, "batch_size": 500, **kwargs})
+
+def test_export_keeps_raw_embeddings(tmp_path, transfer_db):
+    import gallery_transfer
+    from database import FACE_EMBEDDINGS_COLLECTION
+
+    raw = [[3.0, 4.0], [0.0, 2.0], [1.0, 1.0]]
+    transfer_db.db[FACE_EMBEDDINGS_COLLECTION].insert_many([
+        {"model_name": "Facenet", "employee_id": f"EMP{i:03d}", "name": f"E{i}", "embedding": row} for i, row in enumerate(raw)
+    ])
+    path = str(tmp_path / "export.itsgal")
+    gallery_transfer.export_gallery(transfer_args(output=path))
+
+    header, entries = snapshot_entries(path)
+    assert header["normalized"] is False and header["database_id"] == transfer_db.get_database_id()
+    assert [entry["embedding"] for entry in entries] == raw
+    gallery_transfer.check_normalization(header)
+
+def test_import_refuses_normalized_rows_for_a_raw_metric(tmp_path, transfer_db):
+    import gallery_transfer
+
+    # A worker's cosine snapshot holds unit rows
+    path = str(tmp_path / "worker.itsgal")
+    header = write_snapshot(path, make_gallery(count=3))
+    with pytest.raises(ValueError, match="L2-normalised"):
+        gallery_transfer.check_normalization(header)
+
+    transfer_db.publish_cluster_config({"distance_metric": "euclidean"})
+    with pytest.raises(ValueError, match="this cluster uses euclidean"):
+        gallery_transfer.import_gallery(transfer_args(input=path))
+    gallery_transfer.check_normalization(header, allow_normalized=True)
+
+    transfer_db.publish_cluster_config({"distance_metric": "euclidean_l2"})
+    gallery_transfer.check_normalization(header)
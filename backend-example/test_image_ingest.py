@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Tests for downscale-on-decode image ingest.
+Run with: python -m pytest test_image_ingest.py
+"""
+
+import io
+import os
+
+import cv2
+import numpy as np
+import pytest
+from PIL import Image
+
+from image_ingest import decode_image, decode_scale, image_size
+
+PHOTO = os.path.join(os.path.dirname(__file__), "..", "laporan", "foto.jpg")
+
+def jpeg_bytes(image, orientation=None):
+    buffer = io.BytesIO()
+    exif = Image.Exif()
+    if orientation:
+        exif[0x0112] = orientation
+    Image.fromarray(cv2.cvtColor(image, cv2.COLOR_BGR2RGB)).save(buffer, "JPEG", quality=92, exif=exif)
+    return buffer.getvalue()
+
+def frame_with_face(width=4000, height=3000, box=(1500, 900, 1000, 1300)):
+    """Textured frame with a bright elliptical 'face' at a known box"""
+    rng = np.random.default_rng(0)
+    frame = rng.integers(0, 60, (height, width, 3), dtype=np.uint8)
+    x, y, w, h = box
+    cv2.ellipse(frame, (x + w // 2, y + h // 2), (w // 2, h // 2), 0, 0, 360, (230, 230, 230), -1)
+    return frame
+
+def largest_bright_box(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, mask = cv2.threshold(gray, 150, 255, cv2.THRESH_BINARY)
+    contours, _ = cv2.findContours(mask, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return cv2.boundingRect(max(contours, key=cv2.contourArea))
+
+def test_large_jpeg_uses_reduced_decode_and_cap():
+    data = jpeg_bytes(frame_with_face())
+    assert image_size(data) == (4000, 3000)
+    image, details = decode_image(data, max_side=1280)
+    assert details["decode_scale"] == 2
+    assert details["original_size"] == [4000, 3000]
+    assert image.shape[:2] == (960, 1280)
+    assert details["processed_size"] == [1280, 960]
+
+def test_decode_scale_never_goes_below_cap():
+    assert decode_scale((4000, 3000), 1280) == 2
+    assert decode_scale((12000, 9000), 1280) == 8
+    assert decode_scale((1000, 800), 1280) == 1
+    assert decode_scale((4000, 3000), 0) == 1
+    assert decode_scale(None, 1280) == 1
+
+def test_small_frames_and_disabled_cap_keep_full_resolution():
+    small = jpeg_bytes(frame_with_face(640, 480, (200, 100, 200, 260)))
+    image, details = decode_image(small, max_side=1280)
+    assert image.shape[:2] == (480, 640) and details["decode_scale"] == 1
+    image, _ = decode_image(jpeg_bytes(frame_with_face()), max_side=0)
+    assert image.shape[:2] == (3000, 4000)
+
+def test_exif_orientation_is_applied():
+    # Orientation 6: stored landscape, displayed rotated 90 degrees clockwise
+    image, _ = decode_image(jpeg_bytes(frame_with_face(2000, 1500, (200, 100, 400, 500)), orientation=6), max_side=1280)
+    assert image.shape[:2] == (1280, 960)
+
+def test_unreadable_bytes_return_none():
+    image, details = decode_image(b"not an image", max_side=1280)
+    assert image is None
+    assert details["original_size"] is None
+
+def test_face_geometry_is_kept_at_the_cap():
+    box = (1500, 900, 1000, 1300)
+    full, _ = decode_image(jpeg_bytes(frame_with_face(box=box)), max_side=0)
+    capped, _ = decode_image(jpeg_bytes(frame_with_face(box=box)), max_side=1280)
+    scale = full.shape[1] / capped.shape[1]
+    full_box = largest_bright_box(full)
+    capped_box = [round(value * scale) for value in largest_bright_box(capped)]
+    # Within 1% of the face size after mapping back to full resolution
+    assert all(abs(a - b) <= 0.01 * box[2] for a, b in zip(full_box, capped_box))
+
+def test_detection_is_kept_at_the_cap():
+    DeepFace = pytest.importorskip("deepface").DeepFace
+    photo = cv2.imread(PHOTO)
+    # Simulate a 12 MP-class upload of the sample photo
+    large = cv2.resize(photo, (photo.shape[1] * 4, photo.shape[0] * 4), interpolation=cv2.INTER_CUBIC)
+    full, _ = decode_image(jpeg_bytes(large), max_side=0)
+    capped, _ = decode_image(jpeg_bytes(large), max_side=1280)
+
+    def largest_face(image):
+        faces = DeepFace.extract_faces(img_path=image, detector_backend="opencv", enforce_detection=True)
+        area = max((face["facial_area"] for face in faces), key=lambda a: a["w"] * a["h"])
+        return area["x"], area["y"], area["w"], area["h"]
+
+    scale = full.shape[1] / capped.shape[1]
+    fx, fy, fw, fh = largest_face(full)
+    cx, cy, cw, ch = [value * scale for value in largest_face(capped)]
+    overlap_w = max(0, min(fx + fw, cx + cw) - max(fx, cx))
+    overlap_h = max(0, min(fy + fh, cy + ch) - max(fy, cy))
+    intersection = overlap_w * overlap_h
+    iou = intersection / (fw * fh + cw * ch - intersection)
+    assert iou > 0.8
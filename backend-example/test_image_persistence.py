@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Tests for background attendance image persistence and JPEG re-encoding.
+Run with: python -m pytest test_image_persistence.py
+"""
+
+import io
+import time
+import asyncio
+import threading
+
+import numpy as np
+from PIL import Image
+
+from image_persistence import AttendanceImageQueue, reencode_jpeg
+
+def run(coro):
+    return asyncio.run(coro)
+
+def jpeg(width=800, height=600, quality=95):
+    pixels = np.random.default_rng(0).integers(0, 255, (height, width, 3), dtype=np.uint8)
+    output = io.BytesIO()
+    Image.fromarray(pixels).save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+def test_reencode_downscales_and_keeps_aspect_ratio():
+    original = jpeg()
+    smaller = reencode_jpeg(original, max_side=400, quality=70)
+    assert len(smaller) < len(original)
+    with Image.open(io.BytesIO(smaller)) as img:
+        assert img.format == "JPEG" and img.size == (400, 300)
+
+def test_reencode_keeps_the_original_when_disabled_or_not_smaller():
+    original = jpeg(quality=20)
+    assert reencode_jpeg(original) is original
+    # Already small: re-encoding at high quality would grow it
+    assert reencode_jpeg(original, quality=100) is original
+
+class Store:
+    """Blocking store/attach callables that record what was persisted"""
+
+    def __init__(self, delay=0.0, fail_for=()):
+        self.delay = delay
+        self.fail_for = set(fail_for)
+        self.release = threading.Event()
+        self.release.set()
+        self.stored = []
+        self.attached = {}
+
+    def store_image(self, employee_id, attendance_type, image_bytes):
+        self.release.wait(5)
+        time.sleep(self.delay)
+        if employee_id in self.fail_for:
+            raise RuntimeError("gridfs down")
+        self.stored.append((employee_id, attendance_type, len(image_bytes)))
+        return f"image-{len(self.stored)}"
+
+    def attach_image(self, attendance_id, image_id):
+        self.attached[attendance_id] = image_id
+
+def test_images_are_stored_and_attached_before_stop_returns():
+    store = Store(delay=0.01)
+
+    async def scenario():
+        queue = AttendanceImageQueue(store.store_image, store.attach_image, max_queue=8, workers=2)
+        assert not await queue.enqueue("ATT0", "EMP000", "check-in", b"x")
+        await queue.start()
+        for number in range(5):
+            assert await queue.enqueue(f"ATT{number}", f"EMP00{number}", "check-in", b"image")
+        await queue.stop()
+        return queue
+
+    queue = run(scenario())
+    assert len(store.stored) == 5 and set(store.attached) == {f"ATT{number}" for number in range(5)}
+    assert queue.metrics["stored"] == 5 and queue.metrics["enqueued"] == 5
+    assert queue.metrics["bytes_received"] == queue.metrics["bytes_stored"] == 25
+    assert not queue.running and queue.stats()["queue_depth"] == 0
+
+def test_failed_store_is_counted_and_does_not_stop_the_worker():
+    store = Store(fail_for={"EMP001"})
+
+    async def scenario():
+        queue = AttendanceImageQueue(store.store_image, store.attach_image, max_queue=8, workers=1)
+        await queue.start()
+        await queue.enqueue("ATT1", "EMP001", "check-in", b"image")
+        await queue.enqueue("ATT2", "EMP002", "check-out", b"image")
+        await queue.stop()
+        return queue
+
+    queue = run(scenario())
+    assert queue.metrics["failed"] == 1 and queue.metrics["stored"] == 1
+    assert store.attached == {"ATT2": "image-1"}
+
+def test_full_queue_applies_backpressure_then_drops():
+    store = Store()
+    store.release.clear()
+
+    async def scenario():
+        queue = AttendanceImageQueue(store.store_image, store.attach_image, max_queue=2, workers=1, enqueue_timeout=0.05)
+        await queue.start()
+        # The worker picks up the first image and blocks on the store; two more fill the queue
+        results = [await queue.enqueue("ATT0", "EMP001", "check-in", b"image")]
+        await asyncio.sleep(0.01)
+        results += [await queue.enqueue(f"ATT{number}", "EMP001", "check-in", b"image") for number in (1, 2)]
+        started = time.perf_counter()
+        results.append(await queue.enqueue("ATT3", "EMP001", "check-in", b"image"))
+        waited = time.perf_counter() - started
+        store.release.set()
+        await queue.stop()
+        return queue, results, waited
+
+    queue, results, waited = run(scenario())
+    assert results == [True, True, True, False] and waited >= 0.04
+    assert queue.metrics["dropped"] == 1 and queue.metrics["backpressure_waits"] == 1
+    assert queue.metrics["queue_high_water"] == 2 and queue.metrics["stored"] == 3
+    assert set(store.attached) == {"ATT0", "ATT1", "ATT2"}
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process presence table: newest-event merging, day rollover and the duplicate window.
+Run with: python -m pytest test_presence.py
+"""
+
+from datetime import datetime, timedelta
+
+import pytest
+import pytz
+
+import presence
+import timezone_utils
+from presence import PresenceTable
+from timezone_utils import get_local_date_start
+
+@pytest.fixture(autouse=True)
+def jakarta(monkeypatch):
+    monkeypatch.setattr(timezone_utils, "DEFAULT_TIMEZONE", "Asia/Jakarta")
+
+def attendance(kind, at, employee_id="EMP001", attendance_id=None):
+    return {
+        "employee_id": employee_id,
+        "employee_name": "Ani",
+        "type": kind,
+        "timestamp": at,
+        "attendance_id": attendance_id or f"{employee_id}-{kind}",
+        "confidence": 0.9,
+    }
+
+def now():
+    return datetime.now(pytz.UTC)
+
+def test_newest_event_wins_and_stats_count_it():
+    table = PresenceTable()
+    table.record(attendance("check-in", now() - timedelta(seconds=30)))
+    table.record(attendance("check-out", now(), attendance_id="latest"))
+    # An older event arriving late does not replace the newer one
+    table.record(attendance("check-in", now() - timedelta(seconds=60), attendance_id="late"))
+    table.record(attendance("check-in", now(), employee_id="EMP002"))
+
+    entry = table.get("EMP001")
+    assert entry["last_event_type"] == "check-out" and entry["attendance_id"] == "latest"
+    assert entry["last_event_at"].utcoffset() == timedelta(hours=7)
+    assert table.get("EMP404") is None
+    assert table.stats() == {
+        "date": get_local_date_start().date().isoformat(),
+        "seen_today": 2,
+        "checked_in": 1,
+        "checked_out": 1,
+    }
+
+def test_events_from_earlier_days_are_ignored():
+    table = PresenceTable()
+    yesterday = get_local_date_start() - timedelta(minutes=1)
+    table.merge([{
+        "employee_id": "EMP001",
+        "employee_name": "Ani",
+        "last_event_type": "check-in",
+        "last_event_at": yesterday,
+    }])
+    assert table.get("EMP001") is None and table.snapshot() == []
+
+def test_table_clears_at_local_midnight(monkeypatch):
+    table = PresenceTable()
+    table.record(attendance("check-in", now()))
+    assert table.get("EMP001") is not None
+
+    tomorrow = get_local_date_start() + timedelta(days=1)
+    monkeypatch.setattr(presence, "get_local_date_start", lambda: tomorrow)
+    assert table.get("EMP001") is None
+    assert table.stats()["date"] == tomorrow.date().isoformat() and table.stats()["seen_today"] == 0
+
+def test_duplicate_window_matches_same_type_only():
+    table = PresenceTable()
+    table.record(attendance("check-in", now() - timedelta(seconds=20)))
+
+    duplicate = table.find_duplicate("EMP001", "check-in", window_seconds=60)
+    assert duplicate["attendance_id"] == "EMP001-check-in"
+    assert table.find_duplicate("EMP001", "check-in", window_seconds=10) is None
+    assert table.find_duplicate("EMP001", "check-out", window_seconds=60) is None
+    assert table.find_duplicate("EMP002", "check-in", window_seconds=60) is None
+    assert table.find_duplicate("EMP001", "check-in", window_seconds=0) is None
+
+def test_naive_timestamps_are_treated_as_utc():
+    table = PresenceTable()
+    table.record(attendance("check-in", datetime.utcnow() - timedelta(seconds=5)))
+    assert table.find_duplicate("EMP001", "check-in", window_seconds=30) is not None
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Tests for schedule-driven pre-warming.
+Run with: python -m pytest test_prewarm.py
+"""
+
+import asyncio
+
+from prewarm import PrewarmScheduler, in_range
+
+def run(coro):
+    return asyncio.run(coro)
+
+def make_scheduler(clock, calls, fail_step=None):
+    def step(name):
+        async def action():
+            calls.append(name)
+            if name == fail_step:
+                raise RuntimeError("boom")
+            return name
+        return action
+    return PrewarmScheduler(
+        lambda: [("check-in", 7 * 60, 9 * 60), ("check-out", 17 * 60, 18 * 60)],
+        lambda: clock["minute"],
+        ramp_up=[("grow", step("grow")), ("warm", step("warm"))],
+        ramp_down=[("shrink", step("shrink"))],
+        lead_minutes=15,
+        cooldown_minutes=10
+    )
+
+def test_in_range_wraps_midnight():
+    assert in_range(10, 23 * 60 + 50, 20)
+    assert in_range(23 * 60 + 55, -10, 20)
+    assert not in_range(12 * 60, 23 * 60, 30)
+
+def test_ramps_up_before_window_and_down_after_cooldown():
+    async def scenario():
+        clock, calls = {"minute": 6 * 60 + 40}, []
+        scheduler = make_scheduler(clock, calls)
+        await scheduler.check()
+        assert calls == [] and not scheduler.stats()["ramped_up"]
+
+        clock["minute"] = 6 * 60 + 45
+        await scheduler.check()
+        clock["minute"] = 8 * 60
+        await scheduler.check()
+        assert calls == ["grow", "warm"] and scheduler.active_window == "check-in"
+
+        clock["minute"] = 9 * 60 + 10
+        await scheduler.check()
+        assert calls == ["grow", "warm"]
+        clock["minute"] = 9 * 60 + 11
+        await scheduler.check()
+        assert calls == ["grow", "warm", "shrink"] and scheduler.active_window is None
+
+        plan = scheduler.stats()["plan"]
+        assert plan[1] == {"window": "check-out", "opens": "17:00", "closes": "18:00", "ramp_up_at": "16:45", "ramp_down_at": "18:10"}
+        assert [action["action"] for action in scheduler.stats()["actions"]] == ["ramp_up", "ramp_down"]
+    run(scenario())
+
+def test_failing_step_is_recorded_and_others_still_run():
+    async def scenario():
+        clock, calls = {"minute": 8 * 60}, []
+        scheduler = make_scheduler(clock, calls, fail_step="grow")
+        await scheduler.check()
+        assert calls == ["grow", "warm"]
+        steps = scheduler.stats()["actions"][0]["steps"]
+        assert steps[0]["success"] is False and steps[0]["error"] == "boom"
+        assert steps[1]["success"] is True and steps[1]["detail"] == "warm"
+    run(scenario())
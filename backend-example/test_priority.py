@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Tests for schedule-aware request priorities.
+Run with: python -m pytest test_priority.py
+"""
+
+import asyncio
+
+import pytest
+
+from priority import (
+    PriorityScheduler, PriorityMiddleware, RequestDeferred, classify, CRITICAL, INTERACTIVE, BATCH, PRIORITY_RETRY_AFTER_SECONDS
+)
+
+def run(coro):
+    return asyncio.run(coro)
+
+def make_scheduler(peak, **kwargs):
+    state = {"peak": peak}
+    scheduler = PriorityScheduler(
+        lambda: state["peak"],
+        peak_limits={INTERACTIVE: 2, BATCH: 1},
+        offpeak_limits={INTERACTIVE: 10, BATCH: 5},
+        wait_seconds={INTERACTIVE: 1, BATCH: 0.05},
+        enabled=True,
+        **kwargs
+    )
+    return scheduler, state
+
+def test_classifies_routes():
+    assert classify("POST", "/api/recognize-face") == CRITICAL
+    assert classify("POST", "/api/recognize-embeddings") == CRITICAL
+    assert classify("POST", "/api/attendance") == CRITICAL
+    assert classify("GET", "/api/attendance") == INTERACTIVE
+    assert classify("GET", "/api/attendance/abc/photo") == BATCH
+    assert classify("POST", "/api/debug-face") == BATCH
+    assert classify("GET", "/api/admin/profile/cpu") == BATCH
+
+def test_peak_limits_defer_batch_but_never_critical():
+    async def scenario():
+        scheduler, _ = make_scheduler(peak=True)
+        await scheduler.acquire(BATCH)
+        with pytest.raises(RequestDeferred):
+            await scheduler.acquire(BATCH)
+        for _ in range(20):
+            await scheduler.acquire(CRITICAL)
+        assert scheduler.stats()["classes"][BATCH]["deferred"] == 1
+        assert scheduler.stats()["classes"][CRITICAL]["limit"] is None
+    run(scenario())
+
+def test_waiters_get_slots_when_released_or_peak_ends():
+    async def scenario():
+        scheduler, state = make_scheduler(peak=True)
+        await scheduler.acquire(INTERACTIVE)
+        await scheduler.acquire(INTERACTIVE)
+        waiter = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        await asyncio.sleep(0.01)
+        assert scheduler.waiting[INTERACTIVE] == 1
+        await scheduler.release(INTERACTIVE)
+        await asyncio.wait_for(waiter, 1)
+        assert scheduler.in_flight[INTERACTIVE] == 2
+
+        waiter = asyncio.create_task(scheduler.acquire(INTERACTIVE))
+        await asyncio.sleep(0.01)
+        state["peak"] = False
+        await scheduler.release(INTERACTIVE)
+        await asyncio.wait_for(waiter, 1)
+        assert scheduler.waiting[INTERACTIVE] == 0
+    run(scenario())
+
+def test_disabled_scheduler_does_not_limit():
+    async def scenario():
+        scheduler = PriorityScheduler(lambda: True, enabled=False)
+        for _ in range(50):
+            await scheduler.acquire(BATCH)
+        assert scheduler.stats()["classes"][BATCH]["limit"] is None
+    run(scenario())
+
+def test_middleware_holds_slot_and_passes_receive_through():
+    async def scenario():
+        scheduler, _ = make_scheduler(peak=True)
+        release = asyncio.Event()
+        seen = {}
+
+        async def app(scope, receive, send):
+            seen["receive"] = receive
+            await release.wait()
+
+        async def receive():
+            return {"type": "http.disconnect"}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message)
+
+        middleware = PriorityMiddleware(app, scheduler)
+        scope = {"type": "http", "method": "GET", "path": "/api/debug-face", "headers": []}
+        first = asyncio.create_task(middleware(scope, receive, send))
+        await asyncio.sleep(0.01)
+        assert seen["receive"] is receive and scheduler.in_flight[BATCH] == 1
+
+        await middleware(scope, receive, send)
+        assert sent[0]["status"] == 503
+        assert (b"retry-after", str(PRIORITY_RETRY_AFTER_SECONDS).encode()) in sent[0]["headers"]
+        release.set()
+        await first
+        assert scheduler.in_flight[BATCH] == 0
+    run(scenario())
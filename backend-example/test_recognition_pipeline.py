@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Tests for the recognize-face pipeline with stubbed detection, liveness and embedding stages.
+Run with: python -m pytest test_recognition_pipeline.py
+"""
+
+import time
+import asyncio
+
+import cv2
+import numpy as np
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+import main
+from deadline import Deadline
+from face_tracking import FaceTracker
+from gallery import FaceGallery
+
+AREA = {"x": 10, "y": 10, "w": 40, "h": 40}
+EMBEDDING = [1.0, 0.0, 0.0, 0.0]
+
+def run(coro):
+    return asyncio.run(coro)
+
+class Upload:
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def read(self) -> bytes:
+        return self.data
+
+def upload():
+    # Smooth texture, so consecutive frames pass the face tracker's appearance check
+    noise = np.random.default_rng(0).integers(0, 255, (64, 64, 3), dtype=np.uint8)
+    return Upload(cv2.imencode(".png", cv2.GaussianBlur(noise, (0, 0), 4))[1].tobytes())
+
+@pytest.fixture
+def pipeline(monkeypatch):
+    """Stubbed stages; `stages` controls how long liveness/embedding take and what they return"""
+    stages = {"liveness_seconds": 0.1, "embedding_seconds": 0.1, "live": True, "embedding_error": None, "liveness_checks": 0}
+
+    def compute_embedding(image, detector_backend=None):
+        time.sleep(stages["embedding_seconds"])
+        if stages["embedding_error"]:
+            raise stages["embedding_error"]
+        return EMBEDDING
+
+    def detect_liveness_features(image):
+        stages["liveness_checks"] += 1
+        time.sleep(stages["liveness_seconds"])
+        return {"live": stages["live"]}
+
+    def calculate_liveness_score(features):
+        return {"liveness_score": 0.9 if features["live"] else 0.1, "is_live": features["live"], "reason": "stub"}
+
+    async def get_employee(employee_id):
+        return {"employee_id": employee_id, "name": "Ani", "face_enrolled": True}
+
+    gallery = FaceGallery("Facenet", "cosine")
+    gallery.replace([{"employee_id": "EMP001", "name": "Ani", "embedding": EMBEDDING}], 1)
+    monkeypatch.setattr(main, "DEEPFACE_AVAILABLE", True)
+    monkeypatch.setattr(main, "gallery", gallery)
+    monkeypatch.setattr(main, "detect_face_quality", lambda image, hint=None: {"face_found": True, "area": AREA, "face": None, "quality": None, "gate_ms": 0.0})
+    monkeypatch.setattr(main, "compute_embedding", compute_embedding)
+    monkeypatch.setattr(main, "detect_liveness_features", detect_liveness_features)
+    monkeypatch.setattr(main, "calculate_liveness_score", calculate_liveness_score)
+    monkeypatch.setattr(main.db_manager, "get_employee", get_employee)
+    monkeypatch.setattr(main.config, "enable_liveness_detection", True)
+    monkeypatch.setattr(main.config, "confidence_threshold", 0.7)
+    monkeypatch.setattr(main, "face_tracker", FaceTracker(lambda: main.config))
+    monkeypatch.setattr(main.config, "enable_face_tracking", True)
+    monkeypatch.setattr(main, "pipeline_metrics", {"runs": 0, "overlap_ms_total": 0.0, "embeddings_dropped": 0})
+    return stages
+
+def test_liveness_and_embedding_overlap_and_timings_are_recorded(pipeline):
+    result = run(main.run_recognition(upload(), Deadline(10)))
+    assert result.success and result.employee.id == "EMP001" and result.is_live
+    stages = result.timings["stages"]
+    assert {"decode", "detection", "liveness", "embedding", "matching"} <= set(stages)
+    assert result.timings["liveness_embedding_overlap_ms"] > 50
+    assert main.pipeline_metrics["runs"] == 1 and main.pipeline_metrics["overlap_ms_total"] > 50
+
+def test_failed_liveness_discards_the_embedding(pipeline):
+    pipeline["live"] = False
+    pipeline["liveness_seconds"] = 0.02
+    pipeline["embedding_seconds"] = 0.5
+    started = time.perf_counter()
+    result = run(main.run_recognition(upload(), Deadline(10)))
+    assert not result.success and result.is_live is False
+    assert result.message.startswith("Anti-spoofing failed")
+    # Returned without waiting for the embedding, which is dropped
+    assert time.perf_counter() - started < 0.45
+    assert "embedding" not in result.timings["stages"]
+    assert main.pipeline_metrics["embeddings_dropped"] == 1 and main.pipeline_metrics["runs"] == 0
+
+def test_embedding_error_is_surfaced(pipeline):
+    pipeline["embedding_error"] = ValueError("embedding exploded")
+    result = run(main.run_recognition(upload(), Deadline(10)))
+    assert not result.success
+    assert result.message == "Recognition failed: embedding exploded"
+
+def test_tracked_frames_still_get_a_liveness_check(pipeline):
+    first = run(main.run_recognition(upload(), Deadline(10), kiosk="kiosk-1"))
+    assert first.success and "kiosk-1" in main.face_tracker.tracks
+
+    tracked = run(main.run_recognition(upload(), Deadline(10), kiosk="kiosk-1"))
+    assert tracked.success and tracked.message.startswith("Tracked face")
+    assert tracked.is_live and tracked.liveness_score == 0.9
+    assert pipeline["liveness_checks"] == 2 and "embedding" not in tracked.timings["stages"]
+
+    # A spoof at the same spot does not inherit the previous pass, and ends the track
+    pipeline["live"] = False
+    spoof = run(main.run_recognition(upload(), Deadline(10), kiosk="kiosk-1"))
+    assert not spoof.success and spoof.is_live is False
+    assert "kiosk-1" not in main.face_tracker.tracks
+
+def test_liveness_texture_variance_matches_per_pixel_definition():
+    gray = np.random.default_rng(1).integers(0, 255, (24, 32), dtype=np.uint8)
+    expected = np.mean([
+        np.var(np.delete(gray[y - 1:y + 2, x - 1:x + 2].astype(np.float64).ravel(), 4))
+        for y in range(1, 23) for x in range(1, 31)
+    ])
+    features = main.detect_liveness_features(cv2.cvtColor(gray, cv2.COLOR_GRAY2BGR))
+    assert features["texture_variance"] == pytest.approx(expected)
+
+def test_liveness_is_cheap_at_the_decode_cap():
+    image = np.random.default_rng(2).integers(0, 255, (960, 1280, 3), dtype=np.uint8)
+    main.detect_liveness_features(image)
+    started = time.perf_counter()
+    assert "error" not in main.detect_liveness_features(image)
+    assert time.perf_counter() - started < 0.5
+
+def test_face_tracking_is_opt_in():
+    assert main.DeepFaceConfig().enable_face_tracking is False
+
+def debug_request(headers=()):
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+    scope = {"type": "http", "method": "POST", "path": "/api/debug-face", "headers": list(headers), "client": ("10.0.0.9", 5000)}
+    return Request(scope, receive)
+
+def test_profile_runs_the_real_pipeline_off_the_event_loop(pipeline, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_API_TOKEN", "secret")
+    pipeline["embedding_seconds"] = 0.2
+    request = debug_request([(b"x-admin-token", b"secret")])
+    result = run(main.debug_face_recognition(request, upload(), None, False, True, 0, "secret"))
+
+    assert result["outcome"] == "recognized" and result["recognition"]["employee"]["id"] == "EMP001"
+    stages = {stage["stage"]: stage for stage in result["profile"]["stages"]}
+    assert {"decode", "detection", "liveness", "embedding", "matching"} <= set(stages)
+    # Liveness and embedding still overlap, and CPU time is the stage's own thread (the stub sleeps)
+    assert result["recognition"]["timings"]["liveness_embedding_overlap_ms"] > 50
+    assert stages["embedding"]["wall_ms"] >= 190 and stages["embedding"]["cpu_ms"] < 100
+
+def test_profile_requires_the_admin_token(pipeline, monkeypatch):
+    monkeypatch.setattr(main, "ADMIN_API_TOKEN", "secret")
+    for token in (None, "wrong"):
+        with pytest.raises(HTTPException) as error:
+            run(main.debug_face_recognition(debug_request(), upload(), None, False, True, 0, token))
+        assert error.value.status_code == 401
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Tests for per-request stage profiling.
+Run with: python -m pytest test_request_profiler.py
+"""
+
+import tracemalloc
+
+import pytest
+
+from request_profiler import StageProfiler
+
+def test_stages_record_time_memory_and_details():
+    profiler = StageProfiler(cprofile_top=5)
+    profiler.start()
+    with profiler.stage("allocate") as details:
+        buffer = bytearray(2 * 1024 * 1024)
+        details["size"] = len(buffer)
+    with pytest.raises(RuntimeError):
+        with profiler.stage("fail"):
+            raise RuntimeError("boom")
+    result = profiler.stop()
+
+    allocate, fail = result["stages"]
+    assert allocate["success"] and allocate["size"] == 2 * 1024 * 1024
+    assert allocate["peak_alloc_kib"] >= 2048
+    assert allocate["wall_ms"] >= 0 and allocate["cpu_ms"] >= 0
+    assert fail == {**fail, "stage": "fail", "success": False, "error": "boom"}
+    assert 0 < len(result["cprofile"]) <= 5
+    assert not tracemalloc.is_tracing()
+
+def test_leaves_existing_tracing_running():
+    tracemalloc.start()
+    try:
+        profiler = StageProfiler()
+        profiler.start()
+        with profiler.stage("noop"):
+            pass
+        assert "cprofile" not in profiler.stop()
+        assert tracemalloc.is_tracing()
+    finally:
+        tracemalloc.stop()
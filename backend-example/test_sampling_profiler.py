@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-demand sampling profiler.
+Run with: python -m pytest test_sampling_profiler.py
+"""
+
+import threading
+import time
+import tracemalloc
+
+from sampling_profiler import StackSampler, collapsed, top_functions, tracemalloc_top
+
+def busy_loop(stop: threading.Event):
+    while not stop.is_set():
+        sum(i * i for i in range(1000))
+
+def test_samples_other_threads_in_collapsed_form():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy")
+    worker.start()
+    try:
+        profile = StackSampler().sample(0.3, interval_ms=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile["ticks"] > 0 and profile["samples"] >= profile["ticks"]
+    busy = [stack for stack in profile["stacks"] if stack.startswith("busy;")]
+    assert busy and any("busy_loop (test_sampling_profiler.py" in stack for stack in busy)
+    lines = collapsed(profile).splitlines()
+    assert len(lines) == len(profile["stacks"])
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+def test_one_run_at_a_time():
+    sampler = StackSampler()
+    results = []
+    first = threading.Thread(target=lambda: results.append(sampler.sample(0.3)))
+    first.start()
+    time.sleep(0.05)
+    assert sampler.running
+    assert sampler.sample(0.1) is None
+    first.join()
+    assert results[0] is not None and not sampler.running
+
+def test_top_functions_split_self_and_total():
+    profile = {"samples": 4, "stacks": {"main;outer (a.py:1);inner (a.py:5)": 3, "main;outer (a.py:1)": 1}}
+    top = {row["function"]: row for row in top_functions(profile)}
+    assert top["inner (a.py:5)"]["self_percent"] == 75.0
+    assert top["outer (a.py:1)"] == {"function": "outer (a.py:1)", "self_percent": 25.0, "total_percent": 100.0}
+
+def test_tracemalloc_window_reports_allocations_and_stops_tracing():
+    held = []
+
+    def allocate(stop: threading.Event):
+        while not stop.is_set():
+            held.append(bytearray(64 * 1024))
+            time.sleep(0.01)
+
+    stop = threading.Event()
+    worker = threading.Thread(target=allocate, args=(stop,))
+    worker.start()
+    try:
+        result = tracemalloc_top(0.2, limit=5)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert not tracemalloc.is_tracing()
+    assert result["window_s"] == 0.2 and not result["traced_from_start"]
+    assert result["traced_bytes"] >= 64 * 1024
+    assert any("test_sampling_profiler.py" in allocator["location"] for allocator in result["allocators"])
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Tests for the stale-while-revalidate stats cache.
+Run with: python -m pytest test_stats_cache.py
+"""
+
+import asyncio
+
+from database import StatsCache
+
+def run(coro):
+    return asyncio.run(coro)
+
+class Loader:
+    """Counts calls; each call waits for `delay` and returns the next value"""
+
+    def __init__(self, delay=0.0, error=None):
+        self.calls = 0
+        self.delay = delay
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {"connected": True, "total_employees": self.calls}
+
+def age(cache, seconds):
+    cache.updated_at -= seconds
+
+def test_fresh_value_is_cached():
+    async def scenario():
+        loader = Loader()
+        cache = StatsCache(loader, ttl=10, stale_ttl=60)
+        first = await cache.get()
+        second = await cache.get()
+        return loader.calls, first, second
+
+    calls, first, second = run(scenario())
+    assert calls == 1
+    assert first["total_employees"] == second["total_employees"] == 1
+    assert "cache_age_seconds" in second
+
+def test_stale_value_is_served_while_one_refresh_runs():
+    async def scenario():
+        loader = Loader()
+        cache = StatsCache(loader, ttl=10, stale_ttl=60)
+        await cache.get()
+        age(cache, 30)
+        loader.delay = 0.05
+        stale = await asyncio.gather(*(cache.get() for _ in range(5)))
+        await cache._refresh_task
+        refreshed = await cache.get()
+        return loader.calls, stale, refreshed
+
+    calls, stale, refreshed = run(scenario())
+    assert calls == 2
+    assert all(value["total_employees"] == 1 and value["cache_age_seconds"] >= 30 for value in stale)
+    assert refreshed["total_employees"] == 2 and refreshed["cache_age_seconds"] < 1
+
+def test_expired_or_empty_cache_waits_for_one_shared_refresh():
+    async def scenario():
+        loader = Loader(delay=0.05)
+        cache = StatsCache(loader, ttl=10, stale_ttl=60)
+        cold = await asyncio.gather(*(cache.get() for _ in range(5)))
+        age(cache, 120)
+        expired = await cache.get()
+        return loader.calls, cold, expired
+
+    calls, cold, expired = run(scenario())
+    assert calls == 2
+    assert all(value["total_employees"] == 1 for value in cold)
+    assert expired["total_employees"] == 2
+
+def test_invalidate_forces_a_refresh():
+    async def scenario():
+        loader = Loader()
+        cache = StatsCache(loader, ttl=10, stale_ttl=60)
+        await cache.get()
+        cache.invalidate()
+        value = await cache.get()
+        return loader.calls, value
+
+    calls, value = run(scenario())
+    assert calls == 2 and value["total_employees"] == 2
+
+def test_loader_errors_keep_the_last_value():
+    async def scenario():
+        loader = Loader(error=RuntimeError("mongo down"))
+        cache = StatsCache(loader, ttl=10, stale_ttl=60)
+        failed = await cache.get()
+
+        loader.error = None
+        cache.invalidate()
+        recovered = await cache.get()
+
+        loader.error = RuntimeError("mongo down again")
+        cache.invalidate()
+        kept = await cache.get()
+        return failed, recovered, kept
+
+    failed, recovered, kept = run(scenario())
+    assert failed["connected"] is False and failed["error"] == "mongo down"
+    assert recovered["connected"] is True
+    assert kept["connected"] is True and kept["total_employees"] == recovered["total_employees"]
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Tests for synthetic gallery embeddings.
+Run with: python -m pytest test_synthetic_gallery.py
+"""
+
+import numpy as np
+import pytest
+
+from gallery import FaceGallery
+from synthetic_gallery import SyntheticIdentities
+
+def cosine_distance(a, b):
+    return 1.0 - float(a @ b / (np.linalg.norm(a) * np.linalg.norm(b)))
+
+def test_identities_do_not_depend_on_batch_boundaries():
+    identities = SyntheticIdentities(64, seed=3)
+    whole = identities.identities(0, 10)
+    split = np.vstack([identities.identities(0, 4), identities.identities(4, 6)])
+    assert np.array_equal(whole, split)
+    assert np.array_equal(SyntheticIdentities(64, seed=3).probe(5), identities.probe(5))
+    assert not np.array_equal(SyntheticIdentities(64, seed=4).identity(5), identities.identity(5))
+
+@pytest.mark.parametrize("dimension", [128, 512])
+def test_distances_match_requested_distributions(dimension):
+    identities = SyntheticIdentities(dimension, clusters=1, genuine_distance=0.3, impostor_distance=0.5, seed=1)
+    genuine = [cosine_distance(identities.identity(i), identities.probe(i)) for i in range(200)]
+    impostor = [cosine_distance(identities.identity(i), identities.identity(i + 1)) for i in range(200)]
+    assert np.mean(genuine) == pytest.approx(0.3, abs=0.03)
+    assert np.mean(impostor) == pytest.approx(0.5, abs=0.03)
+
+def test_random_mode_probes_match_their_identity():
+    identities = SyntheticIdentities(128, mode="random", seed=2)
+    gallery = FaceGallery("Facenet", "cosine")
+    gallery.load_arrays([f"EMP{i:03d}" for i in range(500)], [""] * 500, identities.identities(0, 500), 1)
+    assert all(gallery.match(identities.probe(i))[0] == f"EMP{i:03d}" for i in range(0, 500, 25))
+    assert gallery.match(identities.impostor(0))[2] > 0.6
+
+def test_rejects_bad_arguments():
+    with pytest.raises(ValueError):
+        SyntheticIdentities(128, mode="uniform")
+    with pytest.raises(ValueError):
+        SyntheticIdentities(128, genuine_distance=1.0)
@@ -1,4 +1,4 @@
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 import pytz
 import os
 
@@ -44,4 +44,23 @@ def format_local_datetime(dt):
         dt = datetime.fromisoformat(dt.replace('Z', '+00:00'))
     
     local_dt = convert_utc_to_local(dt)
-    return local_dt.isoformat() 
\ No newline at end of file
+    return local_dt.isoformat()
+
+def parse_local_datetime(value, end_of_day=False):
+    """Parse an ISO date or datetime string, assuming local timezone when none is given.
+
+    A bare date (YYYY-MM-DD) resolves to local midnight, or to the following
+    local midnight when end_of_day is set so it can be used as an exclusive
+    upper bound.
+    """
+    local_tz = get_local_timezone()
+    if len(value) == 10:
+        day = datetime.strptime(value, "%Y-%m-%d")
+        if end_of_day:
+            day += timedelta(days=1)
+        return local_tz.localize(day)
+
+    dt = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if dt.tzinfo is None:
+        dt = local_tz.localize(dt)
+    return dt
@@ -0,0 +1,3 @@
+"""
+Scenario-based load testing support for ITScence (used by laporan/locustfile.py)
+"""
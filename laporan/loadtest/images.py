@@ -0,0 +1,100 @@
+"""
+Image pool for load testing
+Distinct JPEG frames so no two requests send the same bytes
+"""
+
+import io
+import os
+import glob
+import random
+from typing import List, Optional
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance, ImageFilter, ImageOps
+
+# Source photos to augment (anonymised captures); defaults to the laporan folder (foto.jpg)
+LOADTEST_IMAGE_DIR = os.getenv("LOADTEST_IMAGE_DIR", os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+LOADTEST_POOL_SIZE = int(os.getenv("LOADTEST_POOL_SIZE", "200"))
+# Draw synthetic faces instead of augmenting photos (exercises the no-face path)
+LOADTEST_SYNTHETIC_FACES = os.getenv("LOADTEST_SYNTHETIC_FACES", "false").lower() == "true"
+LOADTEST_SEED = int(os.getenv("LOADTEST_SEED", "2025"))
+
+FRAME_SIZE = (640, 480)
+
+def find_source_images(directory: str) -> List[str]:
+    paths = []
+    for pattern in ("*.jpg", "*.jpeg", "*.png"):
+        paths += glob.glob(os.path.join(directory, pattern))
+    return sorted(paths)
+
+def encode_jpeg(img: Image.Image, quality: int) -> bytes:
+    output = io.BytesIO()
+    img.save(output, format="JPEG", quality=quality)
+    return output.getvalue()
+
+def augment(source: Image.Image, rng: random.Random) -> bytes:
+    """A webcam-like variant of a photo: random crop and scale, lighting, mirror, blur, sensor noise"""
+    width, height = source.size
+    scale = rng.uniform(0.8, 1.0)
+    crop_w, crop_h = int(width * scale), int(height * scale)
+    left, top = rng.randint(0, width - crop_w), rng.randint(0, height - crop_h)
+    img = source.crop((left, top, left + crop_w, top + crop_h))
+
+    # Place the crop on a 4:3 frame like a kiosk camera would
+    img.thumbnail(FRAME_SIZE)
+    frame = Image.new("RGB", FRAME_SIZE, tuple(rng.randint(40, 200) for _ in range(3)))
+    frame.paste(img, ((FRAME_SIZE[0] - img.width) // 2, (FRAME_SIZE[1] - img.height) // 2))
+
+    if rng.random() < 0.5:
+        frame = ImageOps.mirror(frame)
+    frame = ImageEnhance.Brightness(frame).enhance(rng.uniform(0.7, 1.3))
+    frame = ImageEnhance.Contrast(frame).enhance(rng.uniform(0.8, 1.2))
+    if rng.random() < 0.3:
+        frame = frame.filter(ImageFilter.GaussianBlur(rng.uniform(0.5, 1.5)))
+
+    pixels = np.asarray(frame, dtype=np.float32)
+    noise = np.random.default_rng(rng.getrandbits(32)).normal(0, rng.uniform(2, 8), pixels.shape)
+    frame = Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8))
+    return encode_jpeg(frame, rng.randint(75, 92))
+
+def synthetic_face(rng: random.Random) -> bytes:
+    """A drawn face-like frame; cheap, but detectors usually reject it"""
+    frame = Image.new("RGB", FRAME_SIZE, tuple(rng.randint(40, 200) for _ in range(3)))
+    draw = ImageDraw.Draw(frame)
+    cx, cy = FRAME_SIZE[0] // 2 + rng.randint(-60, 60), FRAME_SIZE[1] // 2 + rng.randint(-40, 40)
+    rx, ry = rng.randint(70, 110), rng.randint(95, 140)
+    skin = (rng.randint(150, 235), rng.randint(110, 190), rng.randint(80, 160))
+    draw.ellipse((cx - rx, cy - ry, cx + rx, cy + ry), fill=skin)
+    for side in (-1, 1):
+        ex, ey = cx + side * rx // 2, cy - ry // 4
+        draw.ellipse((ex - 12, ey - 7, ex + 12, ey + 7), fill=(30, 30, 30))
+    draw.arc((cx - rx // 2, cy + ry // 4, cx + rx // 2, cy + ry // 2 + 20), 20, 160, fill=(120, 40, 40), width=5)
+    pixels = np.asarray(frame, dtype=np.float32)
+    noise = np.random.default_rng(rng.getrandbits(32)).normal(0, 6, pixels.shape)
+    return encode_jpeg(Image.fromarray(np.clip(pixels + noise, 0, 255).astype(np.uint8)), rng.randint(75, 92))
+
+class ImagePool:
+    """A fixed pool of distinct frames, built once per load generator process"""
+
+    def __init__(
+        self,
+        size: int = LOADTEST_POOL_SIZE,
+        directory: str = LOADTEST_IMAGE_DIR,
+        synthetic: bool = LOADTEST_SYNTHETIC_FACES,
+        seed: int = LOADTEST_SEED
+    ):
+        rng = random.Random(seed)
+        sources = [] if synthetic else [Image.open(path).convert("RGB") for path in find_source_images(directory)]
+        if sources:
+            self.images = [augment(rng.choice(sources), rng) for _ in range(size)]
+            self.kind = f"augmented from {len(sources)} photo(s)"
+        else:
+            self.images = [synthetic_face(rng) for _ in range(size)]
+            self.kind = "synthetic"
+        self._rng = random.Random(seed + 1)
+
+    def pick(self, rng: Optional[random.Random] = None) -> bytes:
+        return (rng or self._rng).choice(self.images)
+
+    def __len__(self) -> int:
+        return len(self.images)
@@ -0,0 +1,142 @@
+"""
+Load test reports: per-endpoint percentiles and throughput, per-step results,
+written as stable JSON and CSV so runs can be diffed between versions.
+
+Compare two runs with: python -m loadtest.report results/v1.json results/v2.json
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+LOADTEST_REPORT_DIR = os.getenv(
+    "LOADTEST_REPORT_DIR", os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "loadtest-results")
+)
+LOADTEST_LABEL = os.getenv("LOADTEST_LABEL", "")
+
+PERCENTILES = (0.5, 0.9, 0.95, 0.99)
+REPORT_FORMAT_VERSION = 1
+
+# Scenario outcomes that are not HTTP failures (e.g. recognize returned success=false)
+outcomes: Counter = Counter()
+
+def entry_summary(entry) -> Dict[str, Any]:
+    """Percentiles (ms) and throughput for one locust StatsEntry"""
+    summary = {
+        "requests": entry.num_requests,
+        "failures": entry.num_failures,
+        "rps": round(entry.total_rps, 2),
+        "avg_ms": round(entry.avg_response_time, 1),
+        "max_ms": round(entry.max_response_time or 0, 1),
+    }
+    for percentile in PERCENTILES:
+        summary[f"p{int(percentile * 100)}_ms"] = round(entry.get_response_time_percentile(percentile) or 0, 1)
+    return summary
+
+class StageRecorder:
+    """Records requests, throughput and latency for each load step as the shape moves through them"""
+
+    def __init__(self):
+        self.environment = None
+        self.stages: List[Dict[str, Any]] = []
+        self._current: Optional[Dict[str, Any]] = None
+
+    def on_stage(self, index: int, users: Optional[int]):
+        if self.environment is None:
+            return
+        total = self.environment.stats.total
+        now = time.time()
+        if self._current:
+            duration = now - self._current["started"]
+            requests = total.num_requests - self._current["requests_at_start"]
+            self.stages.append({
+                "stage": self._current["stage"],
+                "users": self._current["users"],
+                "duration_s": round(duration, 1),
+                "requests": requests,
+                "failures": total.num_failures - self._current["failures_at_start"],
+                "rps": round(requests / duration, 2) if duration > 0 else 0.0,
+                # Locust's rolling window covers the last seconds of the step, i.e. steady state
+                "p50_ms": round(total.get_current_response_time_percentile(0.5) or 0, 1),
+                "p95_ms": round(total.get_current_response_time_percentile(0.95) or 0, 1),
+            })
+        self._current = None if users is None else {
+            "stage": index,
+            "users": users,
+            "started": now,
+            "requests_at_start": total.num_requests,
+            "failures_at_start": total.num_failures,
+        }
+
+def build_report(environment, stages: List[Dict[str, Any]], extra: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    stats = environment.stats
+    endpoints = {
+        f"{entry.method} {entry.name}": entry_summary(entry)
+        for entry in sorted(stats.entries.values(), key=lambda entry: (entry.name, entry.method))
+    }
+    return {
+        "format_version": REPORT_FORMAT_VERSION,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "host": environment.host,
+        "run": extra or {},
+        "total": entry_summary(stats.total),
+        "endpoints": endpoints,
+        "stages": stages,
+        "outcomes": dict(sorted(outcomes.items())),
+        "errors": sorted(
+            ({"endpoint": f"{error.method} {error.name}", "error": str(error.error), "count": error.occurrences}
+             for error in stats.errors.values()),
+            key=lambda error: (error["endpoint"], error["error"])
+        ),
+    }
+
+def write_report(report: Dict[str, Any], label: str = LOADTEST_LABEL, directory: str = LOADTEST_REPORT_DIR) -> str:
+    """Write <label>.json and <label>.csv (one row per endpoint); returns the JSON path"""
+    label = label or datetime.now().strftime("run-%Y%m%d-%H%M%S")
+    os.makedirs(directory, exist_ok=True)
+    json_path = os.path.join(directory, f"{label}.json")
+    with open(json_path, "w") as f:
+        json.dump(report, f, indent=2)
+
+    columns = ["endpoint", "requests", "failures", "rps", "avg_ms"] + [f"p{int(p * 100)}_ms" for p in PERCENTILES] + ["max_ms"]
+    with open(os.path.join(directory, f"{label}.csv"), "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        for name, summary in list(report["endpoints"].items()) + [("Aggregated", report["total"])]:
+            writer.writerow([name] + [summary[column] for column in columns[1:]])
+    return json_path
+
+def diff_reports(old: Dict[str, Any], new: Dict[str, Any]) -> List[str]:
+    """Human-readable p95 and throughput changes per endpoint"""
+    lines = [f"{'endpoint':<48} {'p95 old':>9} {'p95 new':>9} {'Δ%':>7} {'rps old':>8} {'rps new':>8} {'fail old':>8} {'fail new':>8}"]
+    names = list(old["endpoints"]) + [name for name in new["endpoints"] if name not in old["endpoints"]]
+    for name in names + ["Aggregated"]:
+        before = old["total"] if name == "Aggregated" else old["endpoints"].get(name)
+        after = new["total"] if name == "Aggregated" else new["endpoints"].get(name)
+        if not before or not after:
+            lines.append(f"{name:<48} {'only in ' + ('new' if after else 'old'):>20}")
+            continue
+        change = (after["p95_ms"] - before["p95_ms"]) / before["p95_ms"] * 100 if before["p95_ms"] else 0.0
+        lines.append(
+            f"{name:<48} {before['p95_ms']:>9} {after['p95_ms']:>9} {change:>+6.0f}% "
+            f"{before['rps']:>8} {after['rps']:>8} {before['failures']:>8} {after['failures']:>8}"
+        )
+    return lines
+
+def main():
+    if len(sys.argv) != 3:
+        print("Usage: python -m loadtest.report OLD.json NEW.json")
+        sys.exit(2)
+    with open(sys.argv[1]) as f:
+        old = json.load(f)
+    with open(sys.argv[2]) as f:
+        new = json.load(f)
+    print("\n".join(diff_reports(old, new)))
+
+if __name__ == "__main__":
+    main()
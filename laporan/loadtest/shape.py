@@ -0,0 +1,54 @@
+"""
+Step-load profile modelled on the morning check-in window
+"""
+
+import os
+from typing import List, Optional, Tuple
+
+from locust import LoadTestShape
+
+# Peak concurrent users; the README's largest measured step was 30
+LOADTEST_PEAK_USERS = int(os.getenv("LOADTEST_PEAK_USERS", "30"))
+# Seconds per step (one step stands in for ~10 minutes of the real window)
+LOADTEST_STEP_SECONDS = int(os.getenv("LOADTEST_STEP_SECONDS", "60"))
+# Fraction of peak per step: early arrivals, the rush just before start time, stragglers
+LOADTEST_PROFILE = os.getenv("LOADTEST_PROFILE", "0.1,0.25,0.5,0.8,1.0,1.0,0.6,0.3,0.1")
+
+def parse_profile(profile: str, peak_users: int) -> List[int]:
+    return [max(1, round(float(fraction) * peak_users)) for fraction in profile.split(",") if fraction.strip()]
+
+class CheckInWindowShape(LoadTestShape):
+    """
+    Steps through the check-in profile, holding each user count for one step.
+
+    Subclasses may set on_stage(index, users); it is called once when each
+    step starts (and with users=None after the last one), so the report can
+    record per-step throughput and latency.
+    """
+
+    abstract = True  # locust only runs the concrete subclass in the locustfile
+    on_stage = None
+
+    def __init__(self):
+        super().__init__()
+        self.stages = parse_profile(LOADTEST_PROFILE, LOADTEST_PEAK_USERS)
+        self.step_seconds = LOADTEST_STEP_SECONDS
+        self._stage: Optional[int] = None
+
+    def tick(self) -> Optional[Tuple[int, float]]:
+        stage = int(self.get_run_time() // self.step_seconds)
+        if stage >= len(self.stages):
+            if self.on_stage and self._stage is not None:
+                self.on_stage(len(self.stages), None)
+                self._stage = None
+            return None
+
+        users = self.stages[stage]
+        if stage != self._stage:
+            if self.on_stage:
+                self.on_stage(stage, users)
+            self._stage = stage
+        previous = self.stages[stage - 1] if stage else 0
+        # Reach each step within ~10 s so most of the step is at steady state
+        spawn_rate = max(1.0, abs(users - previous) / 10)
+        return users, spawn_rate
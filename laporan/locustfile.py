@@ -1,28 +1,200 @@
-from locust import HttpUser, task, between
+"""
+Load test ITScence dengan skenario berbobot.
+
+Skenario:
+- KioskUser: kiosk absen (recognize-face lalu catat attendance) dengan think time
+- AdminUser: paging riwayat absensi, foto, summary, presence, baca config
+- EnrollmentUser: burst pendaftaran karyawan (dihapus lagi saat test selesai)
+
+Gambar diambil dari pool frame yang berbeda-beda (augmentasi foto di folder ini,
+atau wajah sintetis), bukan satu foto.jpg yang sama. Beban mengikuti profil
+step-load jendela check-in pagi (loadtest/shape.py); set LOADTEST_SHAPE=off
+untuk memakai -u/-r biasa. Laporan persentil dan throughput ditulis ke
+loadtest-results/<LOADTEST_LABEL>.json dan .csv.
+
+Jalankan: locust -f locustfile.py --host http://localhost:8000 --headless
+Bandingkan: python -m loadtest.report loadtest-results/v1.json loadtest-results/v2.json
+"""
+
+import os
+import random
+
+from locust import HttpUser, task, between, events
+from locust.runners import WorkerRunner
+
+from loadtest import report, shape
+from loadtest.images import ImagePool
+
+# Scenario mix and pacing
+LOADTEST_KIOSK_WEIGHT = int(os.getenv("LOADTEST_KIOSK_WEIGHT", "20"))
+LOADTEST_ADMIN_WEIGHT = int(os.getenv("LOADTEST_ADMIN_WEIGHT", "3"))
+# Enrollment is a fixed number of HR users rather than a share of the mix
+LOADTEST_ENROLL_USERS = int(os.getenv("LOADTEST_ENROLL_USERS", "1"))
+LOADTEST_KIOSK_THINK_MIN = float(os.getenv("LOADTEST_KIOSK_THINK_MIN", "3"))
+LOADTEST_KIOSK_THINK_MAX = float(os.getenv("LOADTEST_KIOSK_THINK_MAX", "8"))
+LOADTEST_HISTORY_PAGES = int(os.getenv("LOADTEST_HISTORY_PAGES", "5"))
+LOADTEST_ENROLL_BURST = int(os.getenv("LOADTEST_ENROLL_BURST", "3"))
+LOADTEST_SHAPE = os.getenv("LOADTEST_SHAPE", "checkin").lower()
+
+image_pool = ImagePool()
+stage_recorder = report.StageRecorder()
+
+@events.init.add_listener
+def on_init(environment, **kwargs):
+    stage_recorder.environment = environment
+    print(f"[LOADTEST] Image pool: {len(image_pool)} frames ({image_pool.kind})")
+
+@events.test_stop.add_listener
+def on_test_stop(environment, **kwargs):
+    if isinstance(environment.runner, WorkerRunner):
+        return
+    stage_recorder.on_stage(-1, None)
+    result = report.build_report(environment, stage_recorder.stages, {
+        "shape": LOADTEST_SHAPE,
+        "profile": shape.LOADTEST_PROFILE if LOADTEST_SHAPE == "checkin" else None,
+        "peak_users": shape.LOADTEST_PEAK_USERS if LOADTEST_SHAPE == "checkin" else None,
+        "step_seconds": shape.LOADTEST_STEP_SECONDS if LOADTEST_SHAPE == "checkin" else None,
+        "image_pool": f"{len(image_pool)} frames ({image_pool.kind})",
+        "weights": {"kiosk": LOADTEST_KIOSK_WEIGHT, "admin": LOADTEST_ADMIN_WEIGHT, "enroll_users": LOADTEST_ENROLL_USERS},
+    })
+    path = report.write_report(result)
+    print(f"[LOADTEST] Report written to {path}")
+
+def upload(image: bytes):
+    return {"file": ("capture.jpg", image, "image/jpeg")}
+
+class KioskUser(HttpUser):
+    """A kiosk: recognize the person in front of the camera, then record their attendance"""
+    weight = LOADTEST_KIOSK_WEIGHT
+    wait_time = between(LOADTEST_KIOSK_THINK_MIN, LOADTEST_KIOSK_THINK_MAX)
+
+    def on_start(self):
+        self.client.get("/api/attendance/mode", name="/api/attendance/mode")
+
+    @task(10)
+    def recognize_and_record(self):
+        image = image_pool.pick()
+        with self.client.post("/api/recognize-face", files=upload(image), name="/api/recognize-face", catch_response=True) as response:
+            if response.status_code != 200:
+                response.failure(f"HTTP {response.status_code}")
+                return
+            result = response.json()
+            if not (result.get("success") and result.get("employee")):
+                report.outcomes["recognize_unmatched"] += 1
+                return
+            report.outcomes["recognize_matched"] += 1
+
+        # Check out if today's last event was a check-in, like a person leaving
+        presence = result.get("presence") or {}
+        attendance_type = "check-out" if presence.get("checked_in") else "check-in"
+        with self.client.post(
+            "/api/attendance",
+            data={"employee_id": result["employee"]["id"], "type": attendance_type, "confidence": result.get("confidence") or 0},
+            files=upload(image),
+            name="/api/attendance [record]",
+            catch_response=True
+        ) as response:
+            # A repeat within the duplicate window also returns 200 (the existing record)
+            if response.status_code != 200:
+                response.failure(f"HTTP {response.status_code}")
+            else:
+                report.outcomes[f"attendance_{attendance_type}"] += 1
+
+    @task(1)
+    def refresh_mode(self):
+        # The kiosk UI refetches the attendance mode every minute
+        self.client.get("/api/attendance/mode", name="/api/attendance/mode")
+
+class AdminUser(HttpUser):
+    """The admin dashboard: history paging, photos, summaries and settings"""
+    weight = LOADTEST_ADMIN_WEIGHT
+    wait_time = between(2, 6)
+
+    def on_start(self):
+        self.attendance_ids = []
+        self.employee_ids = []
+
+    @task(4)
+    def page_history(self):
+        cursor = None
+        for page in range(LOADTEST_HISTORY_PAGES):
+            params = {"limit": 50}
+            if cursor:
+                params["cursor"] = cursor
+            response = self.client.get("/api/attendance", params=params, name="/api/attendance [page]" if cursor else "/api/attendance [first]")
+            if response.status_code != 200:
+                return
+            records = response.json()
+            self.attendance_ids = [record["id"] for record in records if record.get("image_url")][:50] or self.attendance_ids
+            cursor = response.headers.get("X-Next-Cursor")
+            if not cursor:
+                return
+
+    @task(3)
+    def fetch_photos(self):
+        for attendance_id in random.sample(self.attendance_ids, min(3, len(self.attendance_ids))):
+            with self.client.get(f"/api/attendance/{attendance_id}/photo", name="/api/attendance/[id]/photo", catch_response=True) as response:
+                # Images are stored in the background; a 404 just means not stored yet
+                if response.status_code == 404:
+                    response.success()
+        for employee_id in random.sample(self.employee_ids, min(2, len(self.employee_ids))):
+            with self.client.get(f"/api/employees/{employee_id}/photo", name="/api/employees/[id]/photo", catch_response=True) as response:
+                if response.status_code == 404:
+                    response.success()
+
+    @task(2)
+    def list_employees(self):
+        response = self.client.get("/api/employees", name="/api/employees")
+        if response.status_code == 200:
+            self.employee_ids = [employee["id"] for employee in response.json()]
+
+    @task(2)
+    def read_config(self):
+        self.client.get("/api/config", name="/api/config")
+        self.client.get("/api/models", name="/api/models")
+
+    @task(2)
+    def summaries(self):
+        self.client.get("/api/attendance/summary", params={"period": random.choice(["day", "week", "month"])}, name="/api/attendance/summary")
+        self.client.get("/api/presence", name="/api/presence")
+
+    @task(1)
+    def health(self):
+        self.client.get("/health", name="/health")
+
+class EnrollmentUser(HttpUser):
+    """HR enrolling several new hires back to back, then idling; enrolled test employees are deleted on stop"""
+    fixed_count = LOADTEST_ENROLL_USERS
+    wait_time = between(60, 120)
+
+    def on_start(self):
+        self.enrolled = []
 
-class FaceRecognitionUser(HttpUser):
     @task
-    def recognize_face(self):
-        """Mengirim gambar ke endpoint recognize-face"""
-        try:
-            with open("foto.jpg", "rb") as image:
-                files = {
-                    "file": ("foto.jpg", image, "image/jpeg")
-                }
-                print("[RECOGNIZE] Sending request to /api/recognize-face")
-                response = self.client.post(
-                    "/api/recognize-face", 
-                    files=files, 
-                    name="/api/recognize-face"
-                )
+    def enrollment_burst(self):
+        for _ in range(LOADTEST_ENROLL_BURST):
+            suffix = random.randrange(10 ** 6)
+            with self.client.post(
+                "/api/employees/enroll",
+                data={"name": f"Loadtest {suffix:06d}", "department": "Loadtest", "email": f"loadtest{suffix}@example.com"},
+                files=upload(image_pool.pick()),
+                name="/api/employees/enroll",
+                catch_response=True
+            ) as response:
                 if response.status_code == 200:
-                    result = response.json()
-                    if result.get("success") and result.get("employee"):
-                        confidence = result.get("confidence", 0.0)
-                        print(f"[RECOGNIZE] Recognized: {result['employee']['name']} with confidence {confidence}")
-                    else:
-                        print(f"[RECOGNIZE] Not recognized or failed: {result.get('message', 'No message')}")
+                    self.enrolled.append(response.json()["id"])
+                elif response.status_code == 400:
+                    # Rejected frame (no usable face): a valid outcome for the pool
+                    report.outcomes["enroll_rejected"] += 1
+                    response.success()
                 else:
-                    print(f"[RECOGNIZE] Error: {response.status_code} - {response.text}")
-        except Exception as e:
-            print(f"[RECOGNIZE] Exception: {str(e)}")
+                    response.failure(f"HTTP {response.status_code}")
+
+    def on_stop(self):
+        for employee_id in self.enrolled:
+            self.client.delete(f"/api/employees/{employee_id}", name="/api/employees/[id] [cleanup]")
+        self.enrolled = []
+
+if LOADTEST_SHAPE == "checkin":
+    class CheckInShape(shape.CheckInWindowShape):
+        on_stage = stage_recorder.on_stage
@@ -17,6 +17,7 @@ export const API_CONFIG = {
   
   // Timeouts
   requestTimeout: 30000, // 30 seconds
+  recognitionTimeout: 10000, // 10 seconds; sent to the backend so it stops work the kiosk gave up on
   
   // Retry configuration
   maxRetries: 3,
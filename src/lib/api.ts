@@ -19,6 +19,21 @@ export interface RecognitionResult {
   timestamp: string;
 }
 
+// Face found by a kiosk-side detector, in pixels of the uploaded image
+export interface FaceBox {
+  x: number;
+  y: number;
+  w: number;
+  h: number;
+  left_eye?: [number, number];
+  right_eye?: [number, number];
+}
+
+export interface FaceHint {
+  faceBox?: FaceBox;
+  preCropped?: boolean; // the image is already an aligned face crop
+}
+
 export interface AttendanceRecord {
   id: string;
   employeeId: string;
@@ -50,6 +65,18 @@ export interface DeepFaceConfig {
   saturation_std_threshold: number;
   illumination_gradient_min: number;
   illumination_gradient_max: number;
+  // Quality gate (defaults applied by the backend)
+  enable_quality_gate?: boolean;
+  quality_min_face_size?: number;
+  quality_min_edge_margin?: number;
+  quality_min_brightness?: number;
+  quality_max_brightness?: number;
+  quality_min_sharpness?: number;
+  quality_max_roll_degrees?: number;
+  quality_max_yaw_offset?: number;
+  // Client face hints (defaults applied by the backend)
+  accept_client_face_hints?: boolean;
+  client_face_box_mode?: 'narrow' | 'skip';
   // Attendance timing settings - Range-based
   check_in_start: string;
   check_in_end: string;
@@ -81,6 +108,24 @@ export interface AttendanceMode {
   message: string;
 }
 
+// Stable per-browser id: the backend keeps face tracks and queue fairness per kiosk
+const KIOSK_ID_KEY = 'itscence-kiosk-id';
+const pageKioskId = `kiosk-${Date.now().toString(36)}-${Math.random().toString(36).slice(2, 10)}`;
+
+const getKioskId = (): string => {
+  try {
+    let kioskId = localStorage.getItem(KIOSK_ID_KEY);
+    if (!kioskId) {
+      kioskId = pageKioskId;
+      localStorage.setItem(KIOSK_ID_KEY, kioskId);
+    }
+    return kioskId;
+  } catch {
+    // Storage unavailable (private mode): keep one id for this page
+    return pageKioskId;
+  }
+};
+
 class FaceRecognitionAPI {
   private baseUrl: string;
 
@@ -156,7 +201,7 @@ class FaceRecognitionAPI {
     }
   }
 
-  async recognizeFace(imageData: string): Promise<RecognitionResult> {
+  async recognizeFace(imageData: string, hint?: FaceHint): Promise<RecognitionResult> {
     try {
       // Convert base64 to blob
       const response = await fetch(imageData);
@@ -164,12 +209,28 @@ class FaceRecognitionAPI {
       
       const formData = new FormData();
       formData.append('file', blob, 'face-capture.jpg');
+      if (hint?.faceBox) {
+        formData.append('face_box', JSON.stringify(hint.faceBox));
+      }
+      if (hint?.preCropped) {
+        formData.append('pre_cropped', 'true');
+      }
 
       const apiResponse = await fetch(`${this.baseUrl}/api/recognize-face`, {
         method: 'POST',
         body: formData,
+        headers: {
+          'X-Request-Timeout-Ms': String(API_CONFIG.recognitionTimeout),
+          'X-Kiosk-Id': getKioskId(),
+        },
+        signal: AbortSignal.timeout(API_CONFIG.recognitionTimeout),
       });
 
+      if (apiResponse.status === 503) {
+        // Server busy (load shedding): the body carries a "try again" result
+        return await apiResponse.json();
+      }
+
       if (!apiResponse.ok) {
         throw new Error(`HTTP error! status: ${apiResponse.status}`);
       }